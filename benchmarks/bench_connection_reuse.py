@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Connection reuse benchmark for client/http_transport.py.
+
+Starts a local HTTPS server with a throwaway self-signed certificate and times
+sequential requests in three modes:
+
+- new-client: a fresh httpx.AsyncClient per request (the old token-exchange path)
+- shared-pool: create_http_client() per request (the LangChain per-call session
+  pattern, now backed by the loop-wide pool)
+- long-lived: one create_http_client() for all requests (the boto3 backend session)
+
+Usage:
+    python benchmarks/bench_connection_reuse.py [--requests 200]
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"jsonrpc": "2.0", "id": 1, "result": {}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _write_self_signed_cert(directory: str) -> tuple[str, str]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return cert_path, key_path
+
+
+def _start_server(cert_path: str, key_path: str) -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return f"https://127.0.0.1:{server.server_address[1]}/mcp"
+
+
+async def _time_requests(url: str, n: int, make_client, reuse: bool) -> list[float]:
+    timings = []
+    client = make_client() if reuse else None
+    for _ in range(n):
+        start = time.perf_counter()
+        if reuse:
+            await client.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "ping"})
+        else:
+            async with make_client() as per_request:
+                await per_request.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "ping"})
+        timings.append((time.perf_counter() - start) * 1000)
+    if client is not None:
+        await client.aclose()
+    return timings
+
+
+async def _run(n: int, cert_path: str, url: str) -> None:
+    # Imported late so http_transport picks up MCP_* env overrides set by the caller.
+    from client.http_transport import create_http_client
+
+    verify = ssl.create_default_context(cafile=cert_path)
+    modes = [
+        ("new-client", lambda: httpx.AsyncClient(verify=verify), False),
+        ("shared-pool", lambda: create_http_client(), False),
+        ("long-lived", lambda: create_http_client(), True),
+    ]
+    print(f"{'mode':<12} {'requests':>8} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, make_client, reuse in modes:
+        timings = await _time_requests(url, n, make_client, reuse)
+        p95 = statistics.quantiles(timings, n=20)[18]
+        print(f"{name:<12} {n:>8} {statistics.mean(timings):>9.2f} {statistics.median(timings):>8.2f} {p95:>8.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path, key_path = _write_self_signed_cert(tmp)
+        # The shared pool builds its own SSL context; point it at the throwaway CA.
+        os.environ["SSL_CERT_FILE"] = cert_path
+        url = _start_server(cert_path, key_path)
+        asyncio.run(_run(args.requests, cert_path, url))
+
+
+if __name__ == "__main__":
+    main()
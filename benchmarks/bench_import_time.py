@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Import-time and startup-time benchmark.
+
+For each AGENT_BACKEND, starts a fresh interpreter with `python -X importtime`,
+imports client.client and creates the selected MCPClientBackend (no network
+traffic), then reports:
+
+- import: total cumulative time of all top-level imports, from -X importtime
+- startup: wall-clock time of the whole interpreter run
+- the slowest top-level imports
+
+The best of --runs runs is reported so a cold disk cache does not skew it.
+With --budget-ms / --startup-budget-ms the script exits with status 1 when a
+backend exceeds the budget, which is how CI checks for import regressions.
+
+Usage:
+    python benchmarks/bench_import_time.py [--backends langchain boto3] [--runs 3]
+        [--top 10] [--budget-ms 2500] [--startup-budget-ms 4000]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dummy settings: client.client reads these at import time; nothing connects.
+_DUMMY_ENV = {
+    "VISIER_OAUTH_CLIENT_ID": "bench-client",
+    "VISIER_OAUTH_CLIENT_SECRET": "bench-secret",
+    "VISIER_MCP_SERVER_URL": "https://localhost/visier-query-mcp",
+    "LLM_PROVIDER": "ollama",
+}
+
+_STARTUP_SNIPPET = """
+import client.client as app
+from client.mcp_client_backend import create_mcp_client_backend
+create_mcp_client_backend(app.VISIER_MCP_SERVER_URL, None, app.AGENT_BACKEND)
+"""
+
+# "import time:      self [us] |  cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _run_once(backend: str) -> tuple[float, float, list[tuple[str, float]]]:
+    """Run one cold start; return (import ms, startup ms, top-level imports as (name, ms))."""
+    env = {**os.environ, **_DUMMY_ENV, "AGENT_BACKEND": backend, "PYTHONPATH": PROJECT_ROOT}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _STARTUP_SNIPPET],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    startup_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        stderr = "\n".join(l for l in result.stderr.splitlines() if not l.startswith("import time:"))
+        raise RuntimeError(f"Startup failed for AGENT_BACKEND={backend}:\n{stderr}")
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        # Nested imports are indented by two spaces per level under their parent.
+        if match and len(match.group(3)) == 1:
+            top_level.append((match.group(4), int(match.group(2)) / 1000))
+    return sum(ms for _, ms in top_level), startup_ms, top_level
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["langchain", "boto3"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if total import time exceeds this")
+    parser.add_argument("--startup-budget-ms", type=float, default=None, help="Fail if startup time exceeds this")
+    args = parser.parse_args()
+
+    over_budget = False
+    for backend in args.backends:
+        runs = [_run_once(backend) for _ in range(max(1, args.runs))]
+        import_ms, _, top_level = min(runs, key=lambda r: r[0])
+        startup_ms = min(r[1] for r in runs)
+
+        print(f"\nAGENT_BACKEND={backend}: import {import_ms:.0f} ms, startup {startup_ms:.0f} ms (best of {len(runs)})")
+        for name, ms in sorted(top_level, key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+
+        if args.budget_ms is not None and import_ms > args.budget_ms:
+            print(f"  FAIL: import time {import_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+            over_budget = True
+        if args.startup_budget_ms is not None and startup_ms > args.startup_budget_ms:
+            print(f"  FAIL: startup time {startup_ms:.0f} ms exceeds budget {args.startup_budget_ms:.0f} ms")
+            over_budget = True
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
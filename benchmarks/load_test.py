@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the web UI server, single- or multi-process.
+
+Sends requests from --concurrency client threads for --duration seconds and
+reports throughput and latency percentiles. Each request opens its own
+connection, so with VISIER_WORKERS > 1 the kernel spreads them across workers.
+
+Two ways to run it:
+
+- Against a running deployment (--url): start `VISIER_WORKERS=4 python main.py`
+  yourself, then load it.
+- Scaling sweep (--workers 1,2,4): for each count, launches `main.py` with that
+  VISIER_WORKERS using the current environment (so it needs working Visier and
+  LLM settings, and VISIER_USERNAME/VISIER_PASSWORD to skip the browser login),
+  waits until every worker is ready, loads it, stops it, and prints a table of
+  throughput relative to one worker.
+
+By default it loads GET /server-info. --ask "question" instead POSTs the question
+to /ask and reads the SSE stream to the end, which exercises the agent, LLM and
+MCP tool path that one single-threaded worker serializes.
+
+Usage:
+    python benchmarks/load_test.py [--url http://localhost:8001] [--workers 1,2,4]
+        [--concurrency 16] [--duration 20] [--ask "Give me the latest month of headcount"]
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _request(url: str, path: str, question: str | None, timeout: float) -> bool:
+    """Send one request on a fresh connection; return True on success."""
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+    try:
+        if question is None:
+            conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+            response = conn.getresponse()
+            response.read()
+            return response.status in (200, 304)
+        body = json.dumps({"question": question})
+        conn.request("POST", "/ask", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        # Read the SSE stream to the end; the run succeeded if the done event says so.
+        stream = response.read().decode("utf-8", errors="replace")
+        events = [line[5:].strip() for line in stream.splitlines() if line.startswith("data:")]
+        return response.status == 200 and bool(events) and json.loads(events[-1]).get("success") is True
+    except (OSError, http.client.HTTPException, ValueError):
+        return False
+    finally:
+        conn.close()
+
+
+def run_load(url: str, path: str, question: str | None, concurrency: int, duration: float, timeout: float) -> dict:
+    """Drive the server from *concurrency* threads for *duration* seconds."""
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            ok = _request(url, path, question, timeout)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    result = {"requests": len(latencies), "errors": errors, "rps": len(latencies) / wall}
+    if latencies:
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        result.update(p50_ms=cuts[49] * 1000, p95_ms=cuts[94] * 1000, p99_ms=cuts[98] * 1000)
+    return result
+
+
+def _get_json(url: str, path: str) -> dict | None:
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return json.loads(response.read()) if response.status == 200 else None
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+    finally:
+        conn.close()
+
+
+def _wait_ready(url: str, workers: int, timeout: float, process: subprocess.Popen) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"main.py exited with code {process.returncode} before becoming ready")
+        if workers == 1:
+            info = _get_json(url, "/server-info")
+            if info and info.get("status", {}).get("ready"):
+                return
+        else:
+            snapshot = (_get_json(url, "/metrics") or {}).get("workers") or {}
+            if sum(1 for w in snapshot.values() if w.get("state") == "ready") >= workers:
+                return
+        time.sleep(1)
+    raise RuntimeError(f"{workers} worker(s) not ready after {timeout:.0f}s")
+
+
+def _launch(workers: int) -> subprocess.Popen:
+    env = {**os.environ, "VISIER_WORKERS": str(workers), "VISIER_OPEN_UI": "false"}
+    env.pop("VISIER_WORKER_ID", None)
+    return subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, "main.py")],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, start_new_session=True,
+    )
+
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def _print_result(label: str, result: dict) -> None:
+    latency = (
+        f"p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms"
+        if result["requests"] else "no successful requests"
+    )
+    print(f"{label}: {result['requests']} ok, {result['errors']} errors, {result['rps']:.1f} req/s, {latency}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001", help="Web UI base URL")
+    parser.add_argument("--path", default="/server-info", help="GET path to load (ignored with --ask)")
+    parser.add_argument("--ask", default=None, help="POST this question to /ask instead of a GET")
+    parser.add_argument("--workers", default=None, help="Comma-separated worker counts to launch and compare")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per run")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="Seconds to wait for workers to be ready")
+    args = parser.parse_args()
+
+    target = f"POST /ask ({args.ask!r})" if args.ask else f"GET {args.path}"
+    print(f"Load: {target}, {args.concurrency} clients, {args.duration:.0f}s per run")
+
+    if not args.workers:
+        _print_result(args.url, run_load(args.url, args.path, args.ask, args.concurrency, args.duration, args.timeout))
+        return
+
+    results = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        process = _launch(workers)
+        try:
+            _wait_ready(args.url, workers, args.ready_timeout, process)
+            result = run_load(args.url, args.path, args.ask, args.concurrency, args.duration, args.timeout)
+        finally:
+            _stop(process)
+        _print_result(f"{workers} worker(s)", result)
+        results.append((workers, result))
+
+    baseline = results[0][1]["rps"] or 1e-9
+    print("\n| Workers | req/s | Speedup | p95 (ms) | Errors |")
+    print("|---|---|---|---|---|")
+    for workers, result in results:
+        print(f"| {workers} | {result['rps']:.1f} | {result['rps'] / baseline:.2f}x "
+              f"| {result.get('p95_ms', float('nan')):.0f} | {result['errors']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Soak test: thousands of /ask runs against local stand-ins, with memory tracking.
+
+Memory that grows a little with every run only shows after hours of uptime.
+Examples are per-run transcripts, Bedrock message histories, or whatever the
+MCP client keeps around. This harness compresses those hours into a few minutes,
+with no Visier tenant or LLM account needed:
+
+- a stand-in MCP server (FastMCP over streamable HTTP) with one tool,
+  `lookup_metric`, that returns a --payload-kb result, plus the OAuth password
+  grant token endpoint the client authenticates against
+- a stand-in LLM that asks for one tool call and then answers, speaking both
+  the OpenAI chat completions API (the LangChain backend, LLM_PROVIDER=openai)
+  and the Bedrock Converse API (the boto3 backend)
+
+It launches main.py with MEMORY_TRACKING=true (see client/memory.py) and sends
+--warmup-runs questions. It then takes the memory baseline and sends --runs
+more, each with a different question. Every --snapshot-every runs it reads
+/memory: RSS, the size traced by tracemalloc, and growth per module and source
+line since the baseline.
+
+Steady-state growth per run is the slope of traced memory over the second half
+of the samples, so one-off growth early on (caches filling up, pools opening)
+doesn't count. The test fails (exit code 1) when that slope is above
+--budget-kb-per-run, when the RSS slope is above --rss-budget-kb-per-run (if
+set), or when more than --max-errors runs fail.
+
+Usage:
+    python benchmarks/soak_test.py [--backend langchain|boto3] [--runs 2000]
+        [--concurrency 4] [--budget-kb-per-run 4] [--rss-budget-kb-per-run 0]
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported from the project so the stand-in LLM answers the way the agent expects.
+sys.path.insert(0, PROJECT_ROOT)
+from client.constants import FINAL_RESPONSE_MARKER  # noqa: E402
+
+MCP_PATH = "/visier-query-mcp"
+TOOL_NAME = "lookup_metric"
+MODEL_ID = "soak-model"
+UI_URL = "http://localhost:8001"
+
+# Settings of the launched client that would point it somewhere else or change what is measured.
+_CLEARED_ENV = (
+    "VISIER_WORKERS", "VISIER_WORKER_ID", "VISIER_TENANTS_FILE", "VISIER_SHARED_STORE_PATH",
+    "VISIER_TOKEN_STORE_PATH", "VISIER_TENANT_VANITY", "LLM_FALLBACK_PROVIDER", "LLM_FALLBACK_MODEL_ID",
+    "LLM_FAST_PROVIDER", "LLM_FAST_MODEL_ID", "AWS_REGION_BEDROCK_FALLBACK", "PROFILING",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# --- Stand-in MCP server ---
+
+def start_mcp_server(payload_kb: int) -> str:
+    """Serve the stand-in MCP server and token endpoint from a thread; return the MCP URL."""
+    port = _free_port()
+    mcp = FastMCP(
+        "soak-test", host="127.0.0.1", port=port, streamable_http_path=MCP_PATH, log_level="WARNING"
+    )
+    row_count = max(1, payload_kb * 1024 // 64)
+
+    @mcp.tool(name=TOOL_NAME)
+    def lookup_metric(question: str) -> str:
+        """Look up a workforce metric for a question."""
+        rows = [{"period": f"2026-{i % 12 + 1:02d}", "value": i, "question": question[:16]} for i in range(row_count)]
+        return json.dumps({"question": question, "rows": rows})
+
+    @mcp.custom_route("/hr/oauth2/token", methods=["POST"])
+    async def token(request: Request) -> JSONResponse:
+        return JSONResponse({
+            "access_token": uuid.uuid4().hex,
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "refresh_token": uuid.uuid4().hex,
+        })
+
+    server = uvicorn.Server(uvicorn.Config(mcp.streamable_http_app(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="soak-mcp", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}{MCP_PATH}"
+
+
+# --- Stand-in LLM ---
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") for part in content or [] if isinstance(part, dict))
+
+
+def _answer(question: str) -> str:
+    return f"{FINAL_RESPONSE_MARKER} Here is the answer to: {question}"
+
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    """OpenAI chat completions and Bedrock Converse, one tool call per question."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            self._send(self._chat_completion(body))
+        elif self.path.startswith("/model/") and self.path.endswith("/converse"):
+            self._send(self._converse(body))
+        else:
+            self._send({"message": f"unknown path {self.path}"}, status=404)
+
+    @staticmethod
+    def _chat_completion(body: dict) -> dict:
+        messages = body.get("messages") or []
+        question = next((_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+        tools = [t["function"]["name"] for t in body.get("tools") or []]
+        if tools and messages[-1].get("role") != "tool":
+            name = TOOL_NAME if TOOL_NAME in tools else tools[0]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps({"question": question})},
+                }],
+            }
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": _answer(question) if tools else "OK"}
+            finish_reason = "stop"
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", MODEL_ID),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        }
+
+    @staticmethod
+    def _converse(body: dict) -> dict:
+        messages = body.get("messages") or []
+        question = next(
+            (b["text"] for m in messages if m.get("role") == "user" for b in m.get("content", []) if "text" in b), ""
+        )
+        tools = [t["toolSpec"]["name"] for t in (body.get("toolConfig") or {}).get("tools", [])]
+        answered = any("toolResult" in b for b in messages[-1].get("content", []))
+        if tools and not answered:
+            name = TOOL_NAME if TOOL_NAME in tools else tools[0]
+            content = [{"toolUse": {"toolUseId": f"tooluse_{uuid.uuid4().hex[:12]}", "name": name,
+                                    "input": {"question": question}}}]
+            stop_reason = "tool_use"
+        else:
+            content = [{"text": _answer(question) if tools else "OK"}]
+            stop_reason = "end_turn"
+        return {
+            "output": {"message": {"role": "assistant", "content": content}},
+            "stopReason": stop_reason,
+            "usage": {"inputTokens": 100, "outputTokens": 20, "totalTokens": 120},
+            "metrics": {"latencyMs": 1},
+        }
+
+    def _send(self, payload: dict, status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_llm_server() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LLMHandler)
+    threading.Thread(target=server.serve_forever, name="soak-llm", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Client under test ---
+
+def _launch(backend: str, mcp_url: str, llm_url: str, log_file) -> subprocess.Popen:
+    env = {name: value for name, value in os.environ.items() if name not in _CLEARED_ENV}
+    env.update({
+        "VISIER_MCP_SERVER_URL": mcp_url,
+        "VISIER_OAUTH_CLIENT_ID": "soak-client",
+        "VISIER_OAUTH_CLIENT_SECRET": "soak-secret",
+        "VISIER_USERNAME": "soak-user",
+        "VISIER_PASSWORD": "soak-password",
+        "VISIER_OPEN_UI": "false",
+        "VISIER_CATALOG_CACHE_PATH": "",
+        "MEMORY_TRACKING": "true",
+        "AGENT_BACKEND": backend,
+        "LLM_MODEL_ID": MODEL_ID,
+    })
+    if backend == "boto3":
+        env.update({
+            "AWS_BEARER_TOKEN_BEDROCK": "soak-token",
+            "AWS_ENDPOINT_URL_BEDROCK_RUNTIME": llm_url,
+            "AWS_ACCESS_KEY_ID": "soak",
+            "AWS_SECRET_ACCESS_KEY": "soak",
+        })
+    else:
+        env.update({"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "soak-key", "OPENAI_BASE_URL": f"{llm_url}/v1"})
+    return subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, "main.py")],
+        cwd=PROJECT_ROOT, env=env, stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True,
+    )
+
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def _call(method: str, path: str, body: dict | None = None, timeout: float = 120) -> tuple[int, bytes]:
+    conn = http.client.HTTPConnection("localhost", 8001, timeout=timeout)
+    try:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        conn.request(method, path, body=data, headers={"Content-Type": "application/json"} if data else {})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def _wait_ready(process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"main.py exited with code {process.returncode} before becoming ready")
+        try:
+            if _call("GET", "/readyz", timeout=5)[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"main.py not ready after {timeout:.0f}s")
+
+
+def _ask(index: int) -> bool:
+    """One /ask run, read to the end of its SSE stream; True if it succeeded."""
+    question = f"What was the headcount of cost center {index} last month?"
+    try:
+        status, stream = _call("POST", "/ask", {"question": question})
+    except (OSError, http.client.HTTPException):
+        return False
+    events = [line[5:].strip() for line in stream.decode("utf-8", errors="replace").splitlines() if line.startswith("data:")]
+    try:
+        return status == 200 and bool(events) and json.loads(events[-1]).get("success") is True
+    except ValueError:
+        return False
+
+
+def _run_batch(pool: ThreadPoolExecutor, start: int, count: int) -> int:
+    """Run questions start..start+count-1; return the number that failed."""
+    return sum(1 for ok in pool.map(_ask, range(start, start + count)) if not ok)
+
+
+def _memory() -> dict:
+    status, body = _call("GET", "/memory")
+    if status != 200:
+        raise RuntimeError(f"GET /memory returned {status}")
+    return json.loads(body)
+
+
+def _slope_kb(points: list[tuple[int, int]]) -> float | None:
+    """Least-squares growth in KB per run of (runs, bytes) points."""
+    points = [(x, y) for x, y in points if y is not None]
+    if len(points) < 2 or len({x for x, _ in points}) < 2:
+        return None
+    slope, _ = statistics.linear_regression([x for x, _ in points], [y for _, y in points])
+    return slope / 1024
+
+
+def _mb(value: int | None) -> str:
+    return f"{value / 2**20:8.1f}" if value is not None else "       ?"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("langchain", "boto3"), default="langchain")
+    parser.add_argument("--runs", type=int, default=2000, help="Measured runs after the baseline")
+    parser.add_argument("--warmup-runs", type=int, default=50, help="Runs before the baseline is taken")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--snapshot-every", type=int, default=100, help="Runs between memory snapshots")
+    parser.add_argument("--payload-kb", type=int, default=16, help="Size of each tool result")
+    parser.add_argument("--budget-kb-per-run", type=float, default=4.0, help="Max steady-state traced growth per run")
+    parser.add_argument("--rss-budget-kb-per-run", type=float, default=0.0, help="Max steady-state RSS growth per run (0: report only)")
+    parser.add_argument("--max-errors", type=int, default=0, help="Failed runs tolerated")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--log", default=None, help="File for the client's output (default: a temp file)")
+    args = parser.parse_args()
+
+    try:
+        _call("GET", "/healthz", timeout=2)
+        sys.exit(f"Something is already listening on {UI_URL}; stop it before running the soak test")
+    except OSError:
+        pass
+
+    mcp_url = start_mcp_server(args.payload_kb)
+    llm_url = start_llm_server()
+    log_path = args.log or os.path.join(tempfile.gettempdir(), f"soak-test-{os.getpid()}.log")
+    print(f"Stand-ins: MCP {mcp_url}, LLM {llm_url}; client output in {log_path}")
+
+    samples: list[tuple[int, dict]] = []
+    errors = 0
+    with open(log_path, "w") as log_file, ThreadPoolExecutor(args.concurrency) as pool:
+        process = _launch(args.backend, mcp_url, llm_url, log_file)
+        try:
+            _wait_ready(process, args.ready_timeout)
+            print(f"Backend {args.backend}: {args.warmup_runs} warm-up runs, then {args.runs} runs "
+                  f"with {args.concurrency} clients")
+            errors += _run_batch(pool, 0, args.warmup_runs)
+            _call("POST", "/memory/baseline")
+            samples.append((0, _memory()))
+            print(f"{'runs':>6} {'RSS MB':>8} {'traced MB':>9} {'errors':>6} {'runs/s':>7}")
+            done = 0
+            while done < args.runs:
+                count = min(args.snapshot_every, args.runs - done)
+                started = time.perf_counter()
+                errors += _run_batch(pool, args.warmup_runs + done, count)
+                rate = count / (time.perf_counter() - started)
+                done += count
+                report = _memory()
+                samples.append((done, report))
+                print(f"{done:>6} {_mb(report['rss_bytes'])} {_mb(report['traced_bytes']):>9} {errors:>6} {rate:>7.1f}")
+        finally:
+            _stop(process)
+
+    final = samples[-1][1]
+    steady = samples[len(samples) // 2:] if len(samples) > 2 else samples
+    traced_slope = _slope_kb([(runs, report["traced_bytes"]) for runs, report in steady])
+    rss_slope = _slope_kb([(runs, report["rss_bytes"]) for runs, report in steady])
+
+    print("\nGrowth since the baseline by module:")
+    for entry in final.get("modules", []):
+        print(f"  {entry['size_diff'] / 1024:>10.1f} KB {entry['count_diff']:>+8} blocks  {entry['module']}")
+    print("Top growth sites:")
+    for entry in final.get("sites", []):
+        print(f"  {entry['size_diff'] / 1024:>10.1f} KB {entry['count_diff']:>+8} blocks  {entry['site']}")
+
+    failures = []
+    if traced_slope is None:
+        failures.append("not enough samples for a steady-state slope (raise --runs or lower --snapshot-every)")
+    elif traced_slope > args.budget_kb_per_run:
+        failures.append(f"traced growth {traced_slope:.2f} KB/run is over the {args.budget_kb_per_run} KB/run budget")
+    if args.rss_budget_kb_per_run and rss_slope is not None and rss_slope > args.rss_budget_kb_per_run:
+        failures.append(f"RSS growth {rss_slope:.2f} KB/run is over the {args.rss_budget_kb_per_run} KB/run budget")
+    if errors > args.max_errors:
+        failures.append(f"{errors} failed runs (max {args.max_errors}); see {log_path}")
+
+    traced = f"{traced_slope:.2f}" if traced_slope is not None else "?"
+    rss = f"{rss_slope:.2f}" if rss_slope is not None else "?"
+    print(f"\nSteady-state growth per run: traced {traced} KB, RSS {rss} KB (budget {args.budget_kb_per_run} KB)")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
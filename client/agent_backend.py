@@ -4,12 +4,18 @@ Agent backend abstraction.
 Defines a common streaming protocol so web_ui_server.py is decoupled from
 any specific LLM framework (LangChain/LangGraph or direct boto3).
 
-Backends yield ThinkingChunk objects for intermediate reasoning steps and a
-single FinalChunk when the agent has produced its final answer.
+Backends yield ThinkingChunk objects for intermediate reasoning steps, typed
+ToolCallChunk / ToolResultChunk / LLMTurnChunk objects for tool and model
+activity (with timings, sizes and token counts), and a single FinalChunk when
+the agent has produced its final answer. ToolProgressChunks of running tool
+calls aren't yielded by astream(); they're delivered out of band through
+client/tool_progress.py.
+
+Timestamps are Unix times in seconds (time.time()).
 """
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import AsyncIterator
+from typing import Any, AsyncIterator
 
 from client.constants import FINAL_RESPONSE_MARKER
 
@@ -24,6 +30,57 @@ class ThinkingChunk:
     content: str
 
 
+@dataclass
+class ToolCallChunk:
+    """The agent has asked for a tool call."""
+    call_id: str
+    name: str
+    args: dict[str, Any]
+    started_at: float
+    args_size: int = 0
+
+
+@dataclass
+class ToolResultChunk:
+    """A tool call has finished. *size* is the full result length in characters."""
+    call_id: str
+    name: str
+    started_at: float
+    ended_at: float
+    size: int
+    is_error: bool = False
+    preview: str = ""
+
+
+@dataclass
+class ToolProgressChunk:
+    """A running tool call reported progress or sent a log message (MCP notifications)."""
+    call_id: str | None
+    name: str
+    at: float
+    elapsed_seconds: float
+    progress: float | None = None
+    total: float | None = None
+    percent: float | None = None
+    eta_seconds: float | None = None
+    message: str | None = None
+    # Log level for log messages; None for progress updates.
+    level: str | None = None
+
+
+@dataclass
+class LLMTurnChunk:
+    """One model call of the agent loop has finished."""
+    turn_id: str
+    model: str | None
+    requested_at: float
+    ended_at: float
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    stop_reason: str | None = None
+    tool_calls: int = 0
+
+
 @dataclass
 class FinalChunk:
     """Terminal chunk carrying the agent's final answer."""
@@ -33,7 +90,7 @@ class FinalChunk:
     error: str | None = None
 
 
-AgentChunk = ThinkingChunk | FinalChunk
+AgentChunk = ThinkingChunk | ToolCallChunk | ToolResultChunk | LLMTurnChunk | FinalChunk
 
 
 # ---------------------------------------------------------------------------
@@ -47,7 +104,15 @@ class AgentBackend(ABC):
     async def astream(self, question: str) -> AsyncIterator[AgentChunk]:
         """Stream agent chunks for *question*.
 
-        Yields zero or more ThinkingChunks followed by exactly one FinalChunk.
+        Yields zero or more ThinkingChunks, ToolCallChunks, ToolResultChunks and
+        LLMTurnChunks followed by exactly one FinalChunk.
+        """
+
+    async def warm_up(self) -> None:
+        """Make a minimal call to every model the agent uses (see client/health.py).
+
+        Opens the provider connections (and makes Ollama load the model) before
+        the first question. Raises if any model call fails.
         """
 
 
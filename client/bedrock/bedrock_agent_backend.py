@@ -5,13 +5,24 @@ Drives the ReAct tool-calling loop directly against the Bedrock Converse API.
 Has no LangChain dependency at all.
 """
 import asyncio
+import json
+import time
+from collections.abc import Callable
+from functools import partial
 from typing import AsyncIterator
 
-import boto3
-
-from client.agent_backend import AgentBackend, AgentChunk, ThinkingChunk, FinalChunk, extract_final_response
+from client.agent_backend import (
+    AgentBackend, AgentChunk, ThinkingChunk, ToolCallChunk, ToolResultChunk, LLMTurnChunk, FinalChunk,
+    extract_final_response,
+)
+from client.bedrock.bedrock_executor import bedrock_executor
 from client.bedrock.bedrock_tool import BedrockTool
+from client.constants import FINAL_RESPONSE_MARKER, WARM_UP_PROMPT
+from client.llm_router import FAST_TIER, STRONG_TIER, HedgedRouter, classify_question, routing_stats
 from client.messages import SYSTEM_PROMPT
+from client.rate_limit import estimate_tokens, limited, llm_buckets, retry_throttled
+from client.speculation import Speculation
+from client.transcript import MODEL_TEXT, TranscriptEvent, preview
 
 
 class BedrockAgentBackend(AgentBackend):
@@ -23,33 +34,102 @@ class BedrockAgentBackend(AgentBackend):
         model_id: str,
         region: str,
         system_prompt: str = SYSTEM_PROMPT,
+        fallback_model_id: str | None = None,
+        fallback_region: str | None = None,
+        fast_model_id: str | None = None,
+        speculate: Callable[[str], Speculation | None] | None = None,
     ):
         self._tools_by_name: dict[str, BedrockTool] = {t.name: t for t in tools}
         self._bedrock_tools = self._convert_tools(tools)
         self._model_id = model_id
+        # Starts the run's speculative first tool call (client/speculation.py).
+        self._speculate = speculate
         self._system_prompt = system_prompt
-        self._client = boto3.client("bedrock-runtime", region_name=region)
+        self._router = HedgedRouter()
+        # (provider name, region, model id) in priority order; the first is the primary.
+        self._targets = [(f"bedrock:{region}:{model_id}", region, model_id)]
+        if fallback_model_id or fallback_region:
+            fallback_region = fallback_region or region
+            fallback_model_id = fallback_model_id or model_id
+            self._targets.append(
+                (f"bedrock:{fallback_region}:{fallback_model_id}", fallback_region, fallback_model_id)
+            )
+        # Create the shared clients up front rather than on the first question.
+        if not bedrock_executor.use_async:
+            for _, target_region, _ in self._targets:
+                bedrock_executor.client(target_region)
+        # Tier routing: the fast model goes first, with the strong targets behind it
+        # so a slow or throttled fast call still hedges and falls over.
+        self._tier_targets = {STRONG_TIER: self._targets}
+        if fast_model_id:
+            self._tier_targets[FAST_TIER] = [
+                (f"bedrock:{region}:{fast_model_id}", region, fast_model_id), *self._targets
+            ]
+
+    async def warm_up(self) -> None:
+        """One converse call with a single output token to each distinct model and region."""
+        targets = {(name, region, model_id) for tier in self._tier_targets.values() for name, region, model_id in tier}
+        messages = [{"role": "user", "content": [{"text": WARM_UP_PROMPT}]}]
+        results = await asyncio.gather(
+            *(
+                bedrock_executor.call(
+                    region, "converse", modelId=model_id, messages=messages, inferenceConfig={"maxTokens": 1}
+                )
+                for _, region, model_id in targets
+            ),
+            return_exceptions=True,
+        )
+        failed = [f"{name}: {r}" for (name, _, _), r in zip(targets, results) if isinstance(r, Exception)]
+        if failed:
+            raise RuntimeError("; ".join(failed))
 
     async def astream(self, question: str) -> AsyncIterator[AgentChunk]:
         """Drive the Bedrock converse loop, yielding chunks as work progresses."""
+        speculation = self._speculate(question) if self._speculate is not None else None
+        try:
+            async for chunk in self._run(question):
+                yield chunk
+        finally:
+            if speculation is not None:
+                speculation.close()
+
+    async def _run(self, question: str) -> AsyncIterator[AgentChunk]:
         messages: list[dict] = [
             {"role": "user", "content": [{"text": question}]}
         ]
-        thinking_lines: list[str] = []
+        if FAST_TIER in self._tier_targets:
+            tier, reason = classify_question(question)
+        else:
+            tier, reason = STRONG_TIER, "no_fast_model"
+        routing_stats.record_decision(tier, reason)
+        turn = 0
 
         while True:
-            # boto3 is synchronous – run in a thread to avoid blocking the loop.
-            response = await asyncio.to_thread(
-                self._client.converse,
-                modelId=self._model_id,
-                system=[{"text": self._system_prompt}],
-                messages=messages,
-                toolConfig={"tools": self._bedrock_tools},
-            )
+            requested_at = time.time()
+            response = await self._converse(messages, tier)
 
             output_msg = response["output"]["message"]
             messages.append(output_msg)
             stop_reason = response["stopReason"]
+            turn += 1
+            usage = response.get("usage") or {}
+            yield LLMTurnChunk(
+                turn_id=f"turn-{turn}",
+                model=response.get("provider"),
+                requested_at=requested_at,
+                ended_at=time.time(),
+                input_tokens=usage.get("inputTokens"),
+                output_tokens=usage.get("outputTokens"),
+                stop_reason=stop_reason,
+                tool_calls=sum(1 for block in output_msg["content"] if "toolUse" in block),
+            )
+
+            if stop_reason == "end_turn" and tier == FAST_TIER and not self._has_final_marker(output_msg):
+                # The fast model answered without the marker – redo this turn on the strong model.
+                routing_stats.record_escalation("missing_final_marker")
+                messages.pop()
+                tier = STRONG_TIER
+                continue
 
             if stop_reason == "end_turn":
                 final_text = " ".join(
@@ -60,7 +140,6 @@ class BedrockAgentBackend(AgentBackend):
                 yield FinalChunk(
                     response=extract_final_response(final_text),
                     success=True,
-                    thinking="\n\n".join(thinking_lines),
                 )
                 return
 
@@ -69,30 +148,44 @@ class BedrockAgentBackend(AgentBackend):
 
                 for block in output_msg["content"]:
                     if "text" in block:
-                        line = f"[model] {block['text'][:500]}{'...' if len(block['text']) > 500 else ''}"
-                        thinking_lines.append(line)
-                        yield ThinkingChunk(content=line)
+                        event = TranscriptEvent(kind=MODEL_TEXT, source="model", payload=block["text"])
+                        yield ThinkingChunk(content=event.format())
 
                     elif "toolUse" in block:
                         tool_name = block["toolUse"]["name"]
                         tool_input = block["toolUse"]["input"]
                         tool_use_id = block["toolUse"]["toolUseId"]
 
-                        line = f"[tools] Calling tool: {tool_name} with args: {tool_input}"
-                        thinking_lines.append(line)
-                        yield ThinkingChunk(content=line)
+                        started_at = time.time()
+                        yield ToolCallChunk(
+                            call_id=tool_use_id,
+                            name=tool_name,
+                            args=tool_input,
+                            started_at=started_at,
+                            args_size=len(json.dumps(tool_input, default=str)),
+                        )
 
-                        result_text = await self._invoke_tool(tool_name, tool_input)
+                        result_text, is_error = await self._invoke_tool(tool_name, tool_input, tool_use_id)
+                        if tier == FAST_TIER and is_error:
+                            # Let the strong model handle recovery from tool errors.
+                            routing_stats.record_escalation("tool_error")
+                            tier = STRONG_TIER
 
-                        short = result_text[:500] + ("..." if len(result_text) > 500 else "")
-                        line = f"[tools] Tool result: {short}"
-                        thinking_lines.append(line)
-                        yield ThinkingChunk(content=line)
+                        yield ToolResultChunk(
+                            call_id=tool_use_id,
+                            name=tool_name,
+                            started_at=started_at,
+                            ended_at=time.time(),
+                            size=len(result_text),
+                            is_error=is_error,
+                            preview=preview(result_text),
+                        )
 
                         tool_results.append({
                             "toolResult": {
                                 "toolUseId": tool_use_id,
                                 "content": [{"text": result_text}],
+                                **({"status": "error"} if is_error else {}),
                             }
                         })
 
@@ -103,10 +196,51 @@ class BedrockAgentBackend(AgentBackend):
                 response="",
                 success=False,
                 error=f"Unexpected stop reason from Bedrock: {stop_reason}",
-                thinking="\n\n".join(thinking_lines),
             )
             return
 
+    @staticmethod
+    def _has_final_marker(output_msg: dict) -> bool:
+        return any(FINAL_RESPONSE_MARKER in block.get("text", "") for block in output_msg["content"])
+
+    async def _converse(self, messages: list[dict], tier: str = STRONG_TIER) -> dict:
+        """Call converse through the router so slow or throttled calls hedge/fall over."""
+        # The message list is snapshotted so a losing hedge can't observe later appends.
+        snapshot = list(messages)
+        start = time.perf_counter()
+        try:
+            return await self._call_targets(snapshot, self._tier_targets[tier])
+        finally:
+            routing_stats.record_latency(tier, time.perf_counter() - start)
+
+    async def _call_targets(self, messages: list[dict], targets: list[tuple]) -> dict:
+        # A call throttled on every target is retried with backoff.
+        return await retry_throttled(lambda: self._router.call([
+            (name, partial(self._converse_with, name, region, model_id, messages))
+            for name, region, model_id in targets
+        ]))
+
+    async def _converse_with(self, name: str, region: str, model_id: str, messages: list[dict]) -> dict:
+        # Paced by the target's rate limit buckets, which also back off when it throttles.
+        # The call runs on the Bedrock executor's own threads (or its async client).
+        response = await limited(
+            llm_buckets(name),
+            partial(
+                bedrock_executor.call,
+                region,
+                "converse",
+                modelId=model_id,
+                system=[{"text": self._system_prompt}],
+                messages=messages,
+                toolConfig={"tools": self._bedrock_tools},
+            ),
+            tokens=estimate_tokens(self._system_prompt + json.dumps(messages, default=str)),
+            usage=lambda r: (r.get("usage") or {}).get("totalTokens"),
+        )
+        # Tag the response with the target that produced it (hedging may pick any of them).
+        response["provider"] = name
+        return response
+
     @staticmethod
     def _convert_tools(tools: list[BedrockTool]) -> list[dict]:
         """Convert BedrockTools to Bedrock toolSpec format."""
@@ -121,8 +255,11 @@ class BedrockAgentBackend(AgentBackend):
             for tool in tools
         ]
 
-    async def _invoke_tool(self, tool_name: str, tool_input: dict) -> str:
+    async def _invoke_tool(
+        self, tool_name: str, tool_input: dict, tool_use_id: str | None = None
+    ) -> tuple[str, bool]:
+        """Run a tool; returns (result text, is_error)."""
         tool: BedrockTool | None = self._tools_by_name.get(tool_name)
         if tool is None:
-            return f"Error: tool '{tool_name}' not found."
-        return await tool.invoke(tool_input)
+            return f"Error: tool '{tool_name}' not found.", True
+        return await tool.invoke(tool_input, tool_use_id)
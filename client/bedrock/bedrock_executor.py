@@ -0,0 +1,197 @@
+"""
+Execution layer for Bedrock runtime calls.
+
+boto3 is synchronous, so every converse call occupies a thread for its full
+duration. Run through asyncio.to_thread, those calls would share the default
+executor with everything else, and a default boto3 client allows only 10
+pooled connections. Past that, calls queue behind both limits, and the wait
+shows up as LLM latency.
+
+BedrockExecutor gives Bedrock its own thread pool (BEDROCK_MAX_CONCURRENCY
+workers) and one client per region whose connection pool matches it, with
+TCP keep-alive. botocore makes one attempt per call by default: throttled
+calls are retried by retry_throttled() in client/rate_limit.py, paced by its
+token buckets, and the router falls over to the next target. Time spent waiting for a worker and time
+spent in the call are tracked separately and reported under "bedrock" at
+/metrics.
+
+With BEDROCK_ASYNC_CLIENT=true and aiobotocore installed, calls use a native
+async client instead (one per event loop and region) and need no threads.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+from client import metrics
+from client.llm_router import LatencyTracker
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+    _HAS_AIOBOTOCORE = True
+except ImportError:
+    _HAS_AIOBOTOCORE = False
+
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get("BEDROCK_MAX_CONCURRENCY", "32"))
+# Throttling is retried by client/rate_limit.py (AIMD buckets and retry_throttled) and
+# the router's fallover; botocore makes a single attempt so the layers don't multiply.
+BEDROCK_RETRY_MODE = os.environ.get("BEDROCK_RETRY_MODE", "standard")
+BEDROCK_MAX_ATTEMPTS = int(os.environ.get("BEDROCK_MAX_ATTEMPTS", "1"))
+BEDROCK_TCP_KEEPALIVE = os.environ.get("BEDROCK_TCP_KEEPALIVE", "true").lower() == "true"
+BEDROCK_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("BEDROCK_CONNECT_TIMEOUT_SECONDS", "10"))
+BEDROCK_READ_TIMEOUT_SECONDS = float(os.environ.get("BEDROCK_READ_TIMEOUT_SECONDS", "120"))
+BEDROCK_ASYNC_CLIENT = os.environ.get("BEDROCK_ASYNC_CLIENT", "false").lower() == "true"
+
+_SERVICE = "bedrock-runtime"
+
+
+def _config_kwargs() -> dict:
+    return {
+        "max_pool_connections": BEDROCK_MAX_CONCURRENCY,
+        "retries": {"mode": BEDROCK_RETRY_MODE, "total_max_attempts": BEDROCK_MAX_ATTEMPTS},
+        "tcp_keepalive": BEDROCK_TCP_KEEPALIVE,
+        "connect_timeout": BEDROCK_CONNECT_TIMEOUT_SECONDS,
+        "read_timeout": BEDROCK_READ_TIMEOUT_SECONDS,
+    }
+
+
+class BedrockExecutor:
+    """Bounded thread pool and pooled clients shared by every Bedrock backend in the process."""
+
+    def __init__(self, max_workers: int = BEDROCK_MAX_CONCURRENCY):
+        self._max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bedrock")
+        self._clients: dict[str, object] = {}
+        # event loop -> {region: task creating (client context, client)}; aiobotocore clients are
+        # bound to their loop. Concurrent first calls await the same task, so only one client is made.
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._tracker = LatencyTracker()
+        self._queued = 0
+        self._running = 0
+        self.use_async = BEDROCK_ASYNC_CLIENT and _HAS_AIOBOTOCORE
+        if BEDROCK_ASYNC_CLIENT and not _HAS_AIOBOTOCORE:
+            print("BEDROCK_ASYNC_CLIENT is set but aiobotocore is not installed; using the thread pool")
+
+    def client(self, region: str):
+        """Return the shared boto3 client for *region*, creating it on first use."""
+        with self._lock:
+            # Client creation isn't thread-safe on the default session, hence the lock.
+            client = self._clients.get(region)
+            if client is None:
+                client = boto3.client(_SERVICE, region_name=region, config=Config(**_config_kwargs()))
+                self._clients[region] = client
+            return client
+
+    async def _async_client(self, region: str):
+        loop_clients = self._async_clients.setdefault(asyncio.get_running_loop(), {})
+        creating = loop_clients.get(region)
+        if creating is None:
+            creating = loop_clients[region] = asyncio.ensure_future(self._create_async_client(region))
+        try:
+            # Shielded: one caller being cancelled must not cancel the creation the others await.
+            return (await asyncio.shield(creating))[1]
+        except Exception:
+            if loop_clients.get(region) is creating:
+                del loop_clients[region]  # Let the next call try again.
+            raise
+
+    @staticmethod
+    async def _create_async_client(region: str) -> tuple:
+        context = get_session().create_client(_SERVICE, region_name=region, config=AioConfig(**_config_kwargs()))
+        return context, await context.__aenter__()
+
+    async def call(self, region: str, operation: str, **kwargs) -> dict:
+        """Run a bedrock-runtime *operation* (e.g. "converse") in *region*."""
+        if self.use_async:
+            client = await self._async_client(region)
+            start = time.perf_counter()
+            try:
+                return await getattr(client, operation)(**kwargs)
+            except Exception:
+                self._tracker.record_error("call")
+                raise
+            finally:
+                self._tracker.record("call", time.perf_counter() - start)
+        method = getattr(self.client(region), operation)
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+        work = self._pool.submit(context.run, self._run, submitted, method, kwargs)
+        try:
+            return await asyncio.wrap_future(work)
+        finally:
+            # Cancelling the wrapper drops a call that is still queued; once a
+            # worker has picked it up it runs to completion.
+            if work.cancelled():
+                with self._lock:
+                    self._queued -= 1
+
+    def _run(self, submitted: float, method, kwargs: dict) -> dict:
+        started = time.perf_counter()
+        self._tracker.record("queue_wait", started - submitted)
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return method(**kwargs)
+        except Exception:
+            self._tracker.record_error("call")
+            raise
+        finally:
+            self._tracker.record("call", time.perf_counter() - started)
+            with self._lock:
+                self._running -= 1
+
+    async def aclose(self) -> None:
+        """Close the async clients of every loop and stop the thread pool.
+
+        Converse runs on the web loop, not the loop calling this on shutdown,
+        so each loop's clients are closed on that loop; clients of a loop that
+        has already stopped are dropped.
+        """
+        running = asyncio.get_running_loop()
+        for loop, loop_clients in list(self._async_clients.items()):
+            self._async_clients.pop(loop, None)
+            if loop is running:
+                await _aclose_clients(loop_clients)
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_aclose_clients(loop_clients), loop))
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            queued, running = self._queued, self._running
+        return {
+            "mode": "aiobotocore" if self.use_async else "threads",
+            "max_concurrency": self._max_workers,
+            "retry_mode": BEDROCK_RETRY_MODE,
+            "max_attempts": BEDROCK_MAX_ATTEMPTS,
+            "queued": queued,
+            "running": running,
+            # Seconds waiting for a free worker vs. seconds in the Bedrock call itself.
+            **self._tracker.snapshot(),
+        }
+
+
+async def _aclose_clients(loop_clients: dict) -> None:
+    # Runs on the loop the clients belong to.
+    for creating in loop_clients.values():
+        try:
+            context, _ = await creating
+        except Exception:
+            continue
+        await context.__aexit__(None, None, None)
+
+
+bedrock_executor = BedrockExecutor()
+
+metrics.register("bedrock", bedrock_executor.snapshot)
@@ -6,26 +6,36 @@ and creates a boto3 Bedrock agent.
 """
 import asyncio
 import contextlib
+from functools import partial
 
 import httpx
 from mcp import ClientSession
 from mcp.client.streamable_http import streamable_http_client
-from mcp.types import Prompt, TextContent
+from mcp.types import CallToolResult, Prompt, TextContent
 
 from client.mcp_client_backend import MCPClientBackend
 from client.agent_backend import AgentBackend
 from client.bedrock.bedrock_tool import BedrockTool
 from client.bedrock.bedrock_agent_backend import BedrockAgentBackend
-from client.llm_provider import LLM_MODEL_ID, BEDROCK_REGION
+from client.http_transport import create_http_client
+from client.llm_provider import (
+    LLM_MODEL_ID, LLM_FALLBACK_MODEL_ID, LLM_FAST_MODEL_ID, BEDROCK_REGION, BEDROCK_FALLBACK_REGION,
+)
 from client.messages import SYSTEM_PROMPT
+from client.speculation import Speculation
+from client.tool_calls import ToolCallGuard
+from client.tool_progress import progress_callback
 
 
 class BedrockMCPClientBackend(MCPClientBackend):
     """MCP client using raw mcp.ClientSession and a boto3 Bedrock agent. No LangChain dependency."""
 
-    def __init__(self, url: str, auth: httpx.Auth) -> None:
+    def __init__(self, url: str, auth: httpx.Auth, pool: str | None = None) -> None:
+        super().__init__(url, pool)
         self._url = url
         self._auth = auth
+        self._pool = pool
+        self._guard = ToolCallGuard(url)
         self._session: ClientSession | None = None
         self._exit_stack: contextlib.AsyncExitStack | None = None
         self._main_loop: asyncio.AbstractEventLoop | None = None
@@ -38,25 +48,31 @@ class BedrockMCPClientBackend(MCPClientBackend):
         self._main_loop = asyncio.get_running_loop()
         self._exit_stack = contextlib.AsyncExitStack()
         await self._exit_stack.__aenter__()
-        # read=None disables the read timeout on the SSE stream. Without it, the
-        # background SSE reader times out after 5s waiting for a tool response,
+        # The "mcp" timeout profile disables the read timeout on the SSE stream. Without
+        # it, the background SSE reader times out waiting for a tool response,
         # crashing the session mid-agent-loop with a ReadTimeout ExceptionGroup.
-        http_client = httpx.AsyncClient(auth=self._auth, timeout=httpx.Timeout(30.0, read=None))
+        http_client = await self._exit_stack.enter_async_context(create_http_client(auth=self._auth, pool=self._pool))
         read, write, _ = await self._exit_stack.enter_async_context(
             streamable_http_client(self._url, http_client=http_client)
         )
         self._session = await self._exit_stack.enter_async_context(
-            ClientSession(read, write)
+            ClientSession(read, write, message_handler=self._handle_message)
         )
         await self._session.initialize()
-        self._tools = [self._to_tool_def(t) for t in (await self._session.list_tools()).tools]
-        self._prompts = (await self._session.list_prompts()).prompts
+        await self._load_catalog()
         return self
 
     async def __aexit__(self, *exc_info) -> None:
         if self._exit_stack:
             await self._exit_stack.__aexit__(*exc_info)
 
+    async def _load_tools(self) -> None:
+        self._tools = [self._to_tool_def(t) for t in (await self._session.list_tools()).tools]
+        self._guard.set_schemas({t.name: t.schema for t in self._tools})
+
+    async def _load_prompts(self) -> None:
+        self._prompts = (await self._session.list_prompts()).prompts
+
     def tool_definitions(self) -> list[dict]:
         return [
             {
@@ -80,9 +96,13 @@ class BedrockMCPClientBackend(MCPClientBackend):
             model_id=model_id,
             region=BEDROCK_REGION,
             system_prompt=SYSTEM_PROMPT,
+            fallback_model_id=LLM_FALLBACK_MODEL_ID,
+            fallback_region=BEDROCK_FALLBACK_REGION,
+            fast_model_id=LLM_FAST_MODEL_ID,
+            speculate=self._speculate,
         )
 
-    async def get_prompt_messages(
+    async def _fetch_prompt_messages(
         self, name: str, arguments: dict[str, str] | None = None
     ) -> list[str]:
         async def _fetch():
@@ -97,28 +117,41 @@ class BedrockMCPClientBackend(MCPClientBackend):
         fut = asyncio.run_coroutine_threadsafe(_fetch(), self._main_loop)
         return await asyncio.wrap_future(fut)
 
+    async def _call_tool(self, name: str, args: dict) -> CallToolResult:
+        # ClientSession is bound to _main_loop. If the call comes from a
+        # different event loop (e.g. the web server thread), bridge it
+        # via run_coroutine_threadsafe to avoid a cross-loop deadlock where
+        # the response arrives on _main_loop but nobody is listening there.
+        # The progress callback is looked up here, on the caller's side: the
+        # session delivers notifications from its own task on _main_loop.
+        call = self._session.call_tool(name, args, progress_callback=progress_callback())
+        if asyncio.get_running_loop() is self._main_loop:
+            return await call
+        fut = asyncio.run_coroutine_threadsafe(call, self._main_loop)
+        return await asyncio.wrap_future(fut)
+
+    async def ping(self) -> None:
+        if asyncio.get_running_loop() is self._main_loop:
+            await self._session.send_ping()
+            return
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._session.send_ping(), self._main_loop))
+
+    def _speculate(self, question: str) -> Speculation | None:
+        return self._guard.speculate(question, {t.name for t in self._tools}, self._call_tool)
+
     def _to_tool_def(self, tool) -> BedrockTool:
-        session = self._session
-        main_loop = self._main_loop
+        guard = self._guard
+        call_tool = partial(self._call_tool, tool.name)
         name = tool.name
 
-        async def invoke(args: dict) -> str:
+        async def invoke(args: dict, call_id: str | None = None) -> tuple[str, bool]:
             try:
-                # ClientSession is bound to main_loop. If invoke is called from a
-                # different event loop (e.g. the web server thread), bridge the call
-                # via run_coroutine_threadsafe to avoid a cross-loop deadlock where
-                # the response arrives on main_loop but nobody is listening there.
-                if asyncio.get_running_loop() is main_loop:
-                    result = await session.call_tool(name, args)
-                else:
-                    fut = asyncio.run_coroutine_threadsafe(
-                        session.call_tool(name, args), main_loop
-                    )
-                    result = await asyncio.wrap_future(fut)
+                # The guard paces and retries on the caller's loop; only the call itself is bridged.
+                result = await guard.call(name, args, call_tool, call_id=call_id)
                 parts = [c.text for c in result.content if isinstance(c, TextContent)]
-                return "\n".join(parts) if parts else "(no output)"
+                return ("\n".join(parts) if parts else "(no output)"), bool(result.isError)
             except Exception as exc:
-                return f"Error calling tool '{name}': {exc}"
+                return f"Error calling tool '{name}': {exc}", True
 
         return BedrockTool(
             name=name,
@@ -8,4 +8,6 @@ class BedrockTool:
     name: str
     description: str
     schema: dict
-    invoke: Callable[[dict], Awaitable[str]]
+    # invoke(args, call_id) -> (text, is_error): call_id is the model's toolUseId, used to
+    # attribute progress; is_error is the server's CallToolResult.isError (or a local failure).
+    invoke: Callable[[dict, str | None], Awaitable[tuple[str, bool]]]
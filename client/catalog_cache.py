@@ -0,0 +1,78 @@
+"""
+On-disk cache of the MCP tool and prompt catalog.
+
+The catalog (the UI-ready tool and prompt definitions) is stored per MCP server
+URL in one JSON file. On a warm start the web UI serves it from /server-info
+right away, while authentication and the live catalog fetch are still running.
+The live catalog replaces it as soon as it arrives.
+
+SharedCatalogCache offers the same interface on top of the SharedStore, for
+multi-process deployments.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from client.shared_store import SharedStore
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """JSON file of {server_url: {"tools": [...], "prompts": [...], "saved_at": ts}}."""
+
+    def __init__(self, path: str):
+        self._path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def load(self, server_url: str) -> dict | None:
+        """Return the cached {"tools", "prompts", "saved_at"} entry for *server_url*, if any."""
+        entry = self._read().get(server_url)
+        if not entry or "tools" not in entry or "prompts" not in entry:
+            return None
+        return entry
+
+    def save(self, server_url: str, tools: list[dict], prompts: list[dict]) -> None:
+        """Store the catalog for *server_url*, keeping entries for other servers."""
+        with self._lock:
+            entries = self._read()
+            entries[server_url] = {"tools": tools, "prompts": prompts, "saved_at": time.time()}
+            try:
+                os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+                tmp_path = f"{self._path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, default=str)
+                os.replace(tmp_path, self._path)
+            except OSError as exc:
+                logger.warning(f"Could not write catalog cache {self._path}: {exc}")
+
+    def _read(self) -> dict:
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Ignoring unreadable catalog cache {self._path}: {exc}")
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+
+class SharedCatalogCache:
+    """CatalogCache kept in a SharedStore, one key per MCP server URL."""
+
+    _NAMESPACE = "catalog"
+
+    def __init__(self, store: SharedStore):
+        self._store = store
+
+    def load(self, server_url: str) -> dict | None:
+        entry = self._store.get(self._NAMESPACE, server_url)
+        if not entry or "tools" not in entry or "prompts" not in entry:
+            return None
+        return entry
+
+    def save(self, server_url: str, tools: list[dict], prompts: list[dict]) -> None:
+        self._store.set(self._NAMESPACE, server_url, {"tools": tools, "prompts": prompts, "saved_at": time.time()})
@@ -6,14 +6,24 @@ import logging
 from threading import Thread
 
 import httpx
-from mcp.client.auth import OAuthClientProvider, TokenStorage
-from mcp.shared.auth import OAuthToken, OAuthClientInformationFull, ProtectedResourceMetadata
+from mcp.client.auth import OAuthClientProvider
+from mcp.shared.auth import OAuthClientInformationFull, ProtectedResourceMetadata
 from pydantic import AnyHttpUrl
 
+from client import metrics
+from client.catalog_cache import CatalogCache, SharedCatalogCache
+from client.health import health_monitor
+from client.loop_monitor import monitor_loop
+from client.memory import memory_tracker
+from client.profiling import register_loop
+from client.http_transport import aclose_shared_pool
 from client.llm_provider import LLM_PROVIDER, LLM_MODEL_ID, get_current_model_name
 from client.mcp_client_backend import create_mcp_client_backend
+from client.shared_store import get_shared_store
+from client.tenants import VISIER_TENANTS_FILE, TenantConfig, TenantRegistry, load_tenant_configs
 from web.web_ui_server import WebUIServer
-from .oauth2 import OAuthPasswordGrantClientProvider
+from .oauth2 import OAuthPasswordGrantClientProvider, SharedTokenOAuthClientProvider
+from .token_storage import ExpiringTokenStorage, FileTokenStorage, InMemoryTokenStorage, SharedTokenStorage
 
 # Check for required environment variables
 if (os.environ.get("VISIER_OAUTH_CLIENT_ID") is None or
@@ -30,6 +40,17 @@ VISIER_TENANT_VANITY = os.environ.get("VISIER_TENANT_VANITY")
 
 USE_PASSWORD_GRANT = (VISIER_USERNAME is not None and VISIER_PASSWORD is not None)
 
+# Optional encrypted on-disk token store; tokens stay in memory when unset.
+VISIER_TOKEN_STORE_PATH = os.environ.get("VISIER_TOKEN_STORE_PATH")
+VISIER_TOKEN_STORE_KEY = os.environ.get("VISIER_TOKEN_STORE_KEY")
+
+# Tool/prompt catalog cache for warm starts. Set to an empty string to disable.
+VISIER_CATALOG_CACHE_PATH = os.environ.get("VISIER_CATALOG_CACHE_PATH", "~/.cache/visier-mcp-client/catalog.json")
+
+# Set by the supervisor (client/supervisor.py) when running as one of several workers.
+VISIER_WORKER_ID = os.environ.get("VISIER_WORKER_ID")
+VISIER_OPEN_UI = os.environ.get("VISIER_OPEN_UI", "true").lower() == "true"
+
 AGENT_BACKEND = os.environ.get("AGENT_BACKEND", "langchain").lower()
 LANGCHAIN_VERBOSE = os.environ.get("LANGCHAIN_VERBOSE", "false").lower() == "true"
 
@@ -48,7 +69,17 @@ captured_state = None
 app_agent = None
 available_tools = []
 available_prompts = []
-ui_server = WebUIServer()
+# Startup state shown by the web UI: starting -> connecting -> ready (or error).
+app_status = {"state": "starting", "detail": None}
+catalog_source = None  # "cache" until the live catalog has been fetched, then "live"
+catalog_version = 0
+shared_store = get_shared_store()
+if shared_store is not None:
+    catalog_cache = SharedCatalogCache(shared_store)
+else:
+    catalog_cache = CatalogCache(VISIER_CATALOG_CACHE_PATH) if VISIER_CATALOG_CACHE_PATH else None
+# Workers share the UI port; the kernel balances connections between them.
+ui_server = WebUIServer(reuse_port=VISIER_WORKER_ID is not None)
 
 def set_captured_code(code, state):
     global captured_code, captured_state
@@ -72,24 +103,77 @@ def get_tools():
 def get_prompts():
     return available_prompts
 
+def get_status():
+    return {
+        "ready": app_agent is not None,
+        "state": app_status["state"],
+        "detail": app_status["detail"],
+        "catalogSource": catalog_source,
+        "catalogVersion": catalog_version,
+    }
+
+def set_status(state, detail=None):
+    app_status["state"] = state
+    app_status["detail"] = detail
+
+def set_catalog(tools, prompts, source):
+    """Publish a tool/prompt catalog to the web UI and, if it is live, to the on-disk cache."""
+    global catalog_source, catalog_version
+    available_tools[:] = tools
+    available_prompts[:] = prompts
+    catalog_source = source
+    catalog_version += 1
+    if source == "live" and catalog_cache is not None:
+        catalog_cache.save(VISIER_MCP_SERVER_URL, tools, prompts)
+
+def on_catalog_changed(backend, tools_changed):
+    """Republish the catalog after a list_changed refresh and rebuild the agent if tools changed."""
+    global app_agent
+    set_catalog(backend.tool_definitions(), backend.prompt_definitions(), "live")
+    print(f"\n Catalog refreshed. Available MCP Tools: {[t['name'] for t in available_tools]}")
+    if tools_changed:
+        app_agent = backend.create_agent(verbose=LANGCHAIN_VERBOSE)
 
-ui_server.set_callbacks(set_captured_code, get_agent, get_server_url, get_model_name, get_tools, get_prompts)
-
-class InMemoryTokenStorage(TokenStorage):
-    def __init__(self):
-        self.tokens = None
-
-    async def get_tokens(self) -> OAuthToken | None:
-        return self.tokens
-
-    async def set_tokens(self, tokens: OAuthToken) -> None:
-        self.tokens = tokens
 
-    async def get_client_info(self) -> OAuthClientInformationFull | None:
-        return OAUTH_CLIENT_STATIC_METADATA
+ui_server.set_callbacks(
+    set_captured_code, get_agent, get_server_url, get_model_name, get_tools, get_prompts,
+    get_status_func=get_status
+)
 
-    async def set_client_info(self, client_info: OAuthClientInformationFull) -> None:
-        self.client_info = client_info
+def _create_token_storage(
+    server_url: str = VISIER_MCP_SERVER_URL,
+    client_info: OAuthClientInformationFull = OAUTH_CLIENT_STATIC_METADATA,
+    account: str | None = VISIER_USERNAME if USE_PASSWORD_GRANT else None,
+    tenant_id: str | None = None,
+) -> ExpiringTokenStorage:
+    """Create the token storage: the shared store, an encrypted file if VISIER_TOKEN_STORE_PATH is set, else in-memory.
+
+    Tenants other than the default one get their own record in the shared store
+    or their own file next to VISIER_TOKEN_STORE_PATH.
+    """
+    if shared_store is not None:
+        return SharedTokenStorage(
+            shared_store,
+            server_url=server_url,
+            client_info=client_info,
+            key=VISIER_TOKEN_STORE_KEY,
+            account=account,
+            record_key=f"tenant:{tenant_id}" if tenant_id else "record",
+        )
+    if VISIER_TOKEN_STORE_PATH:
+        path = VISIER_TOKEN_STORE_PATH
+        if tenant_id:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{tenant_id}{ext}"
+        print(f"Persisting OAuth tokens (encrypted) to {path}")
+        return FileTokenStorage(
+            path,
+            server_url=server_url,
+            client_info=client_info,
+            key=VISIER_TOKEN_STORE_KEY,
+            account=account,
+        )
+    return InMemoryTokenStorage(client_info)
 
 def start_local_server():
     ui_server.start_oauth_server()
@@ -107,8 +191,9 @@ async def handle_redirect(auth_url: str) -> None:
     webbrowser.open(auth_url)
 
 
-def _create_oauth_provider() -> httpx.Auth:
+async def _create_oauth_provider() -> httpx.Auth:
     """Create the appropriate OAuth provider based on environment config."""
+    storage = _create_token_storage()
     if USE_PASSWORD_GRANT:
         print("Starting MCP client with OAuth Password Grant authentication...")
         return OAuthPasswordGrantClientProvider(
@@ -117,15 +202,16 @@ def _create_oauth_provider() -> httpx.Auth:
             password=VISIER_PASSWORD,
             client_id=OAUTH_CLIENT_STATIC_METADATA.client_id,
             client_secret=OAUTH_CLIENT_STATIC_METADATA.client_secret,
-            storage=InMemoryTokenStorage(),
+            storage=storage,
             visier_tenant_vanity=VISIER_TENANT_VANITY
         )
 
     print("Starting MCP client with OAuth Authorization Code Grant authentication...")
-    provider = OAuthClientProvider(
+    provider_class = SharedTokenOAuthClientProvider if isinstance(storage, SharedTokenStorage) else OAuthClientProvider
+    provider = provider_class(
         server_url=VISIER_MCP_SERVER_URL,
         client_metadata=OAUTH_CLIENT_STATIC_METADATA,
-        storage=InMemoryTokenStorage(),
+        storage=storage,
         redirect_handler=handle_redirect,
         callback_handler=automated_callback_handler
     )
@@ -134,47 +220,148 @@ def _create_oauth_provider() -> httpx.Auth:
         resource=AnyHttpUrl(VISIER_MCP_SERVER_URL),
         authorization_servers=[AnyHttpUrl(auth_server_url)]
     )
+    # OAuthClientProvider only learns a token's expiry when it receives it. Seed it
+    # for a persisted token so an expired one is refreshed instead of sent.
+    provider.context.token_expiry_time = await storage.get_token_expiry()
     return provider
 
 
+async def _create_tenant_oauth_provider(config: TenantConfig) -> httpx.Auth:
+    """Password-grant OAuth provider for a tenant from VISIER_TENANTS_FILE."""
+    client_info = OAUTH_CLIENT_STATIC_METADATA.model_copy(
+        update={"client_id": config.client_id, "client_secret": config.client_secret}
+    )
+    storage = _create_token_storage(config.server_url, client_info, config.username, config.tenant_id)
+    return OAuthPasswordGrantClientProvider(
+        server_url=config.server_url,
+        username=config.username,
+        password=config.password,
+        client_id=config.client_id,
+        client_secret=config.client_secret,
+        storage=storage,
+        visier_tenant_vanity=config.vanity,
+    )
+
+
+def _start_tenant_registry() -> TenantRegistry | None:
+    """Start serving the tenants in VISIER_TENANTS_FILE, if set, on the running loop."""
+    if not VISIER_TENANTS_FILE:
+        return None
+    registry = TenantRegistry(
+        load_tenant_configs(VISIER_TENANTS_FILE),
+        _create_tenant_oauth_provider,
+        AGENT_BACKEND,
+        get_model_name,
+        verbose=LANGCHAIN_VERBOSE,
+    )
+    registry.start()
+    metrics.register("tenants", registry.snapshot)
+    ui_server.set_tenant_resolver(registry.get)
+    print(f"Serving tenants {registry.tenant_ids} (select with X-Visier-Tenant or /t/<tenant>/)")
+    return registry
+
+
+def _token_expiry_func(oauth_provider: httpx.Auth):
+    """The token storage's get_token_expiry, for the health checks; None if the provider has no such storage."""
+    storage = getattr(oauth_provider, "storage", None) or getattr(getattr(oauth_provider, "context", None), "storage", None)
+    return storage.get_token_expiry if isinstance(storage, ExpiringTokenStorage) else None
+
+
 # --- MAIN ---
 async def main():
     global app_agent
 
+    memory_tracker.start()
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
 
-    oauth_provider = _create_oauth_provider()
+    # Serve the last known catalog while authentication and the live fetch run.
+    cached = catalog_cache.load(VISIER_MCP_SERVER_URL) if catalog_cache is not None else None
+    if cached:
+        set_catalog(cached["tools"], cached["prompts"], "cache")
+        print(f"Loaded cached catalog: {len(available_tools)} tools, {len(available_prompts)} prompts")
+
+    register_loop("main", asyncio.get_running_loop())
+    monitor_loop("main", asyncio.get_running_loop())
+    ui_thread = ui_server.start_ui_in_background()
+    await asyncio.sleep(0.1)
+
+    heartbeat_task = None
+    if VISIER_WORKER_ID is not None and shared_store is not None:
+        from client.supervisor import run_worker_heartbeat, workers_snapshot
+        heartbeat_task = asyncio.create_task(
+            run_worker_heartbeat(shared_store, VISIER_WORKER_ID, get_status, ui_thread.is_alive)
+        )
+        metrics.register("workers", lambda: workers_snapshot(shared_store))
+
+    tenant_registry = _start_tenant_registry()
+
+    set_status("connecting")
+    oauth_provider = await _create_oauth_provider()
     backend = create_mcp_client_backend(VISIER_MCP_SERVER_URL, oauth_provider, AGENT_BACKEND)
 
+    # Keep the password-grant token fresh off the request path.
+    token_refresh_task = None
+    if isinstance(oauth_provider, OAuthPasswordGrantClientProvider):
+        token_refresh_task = oauth_provider.start_background_refresh()
+    health_checks = None
+
     try:
         async with backend:
-            available_tools.extend(backend.tool_definitions())
-            available_prompts.extend(backend.prompt_definitions())
+            set_catalog(backend.tool_definitions(), backend.prompt_definitions(), "live")
 
             print(f"\n Authenticated. Available MCP Tools: {[t['name'] for t in available_tools]}")
             print(f"\n Available MCP Prompts: {[p['name'] for p in available_prompts]}")
 
             app_agent = backend.create_agent(verbose=LANGCHAIN_VERBOSE)
+            backend.add_catalog_listener(
+                lambda tools_changed, prompts_changed: on_catalog_changed(backend, tools_changed)
+            )
 
             ui_server.set_callbacks(
                 set_captured_code, get_agent, get_server_url, get_model_name, get_tools, get_prompts,
-                get_prompt_messages_async=backend.get_prompt_messages
+                get_prompt_messages_async=backend.get_prompt_messages,
+                get_status_func=get_status
             )
 
-            ui_server.start_ui_in_background()
-            await asyncio.sleep(0.1)
-            ui_server.open_ui()
+            # Warm the model and MCP connections on the loop questions run on, then
+            # keep checking them for /readyz.
+            set_status("warming_up")
+            token_expiry = _token_expiry_func(oauth_provider)
+            await asyncio.wrap_future(
+                ui_server.run_async(health_monitor.warm_up(app_agent.warm_up, backend.ping, token_expiry))
+            )
+            health_checks = ui_server.run_async(
+                health_monitor.run_checks(lambda: app_agent.warm_up(), backend.ping, token_expiry)
+            )
+            set_status("ready")
+            ui_server.prime_cache()
+            if VISIER_OPEN_UI:
+                ui_server.open_ui()
 
             while True:
                 await asyncio.sleep(5) # Longer sleep since this is just keepalive
     except KeyboardInterrupt:
         print("\nShutting down...")
-    except Exception:
+    except Exception as e:
+        set_status("error", str(e))
         print("\nDetailed Error Traceback:")
         traceback.print_exc()
+    finally:
+        if token_refresh_task is not None:
+            token_refresh_task.cancel()
+        if heartbeat_task is not None:
+            heartbeat_task.cancel()
+        if health_checks is not None:
+            health_checks.cancel()
+        if tenant_registry is not None:
+            await tenant_registry.aclose()
+        if AGENT_BACKEND == "boto3":
+            from client.bedrock.bedrock_executor import bedrock_executor
+            await bedrock_executor.aclose()
+        await aclose_shared_pool()
 
 if __name__ == "__main__":
     asyncio.run(main())
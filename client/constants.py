@@ -5,3 +5,6 @@ Shared constants for the Visier MCP client.
 # Marker the agent is instructed to prepend to its final answer.
 # Agent backends scan for this to extract the response from the full output.
 FINAL_RESPONSE_MARKER = "FINAL RESPONSE:"
+
+# Prompt of the minimal model call made at startup (see client/health.py).
+WARM_UP_PROMPT = "Reply with OK."
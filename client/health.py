@@ -0,0 +1,163 @@
+"""
+Startup warm-up and health probes.
+
+The first question after a restart used to pay for everything that happens
+lazily: Ollama loading the model, TLS handshakes to the LLM provider and the
+MCP server, and building cached responses. main() now runs warm_up() once the
+agent exists and before it reports "ready":
+
+- a tiny call to every configured model (AgentBackend.warm_up)
+- an MCP ping (MCPClientBackend.ping), which also opens the pooled connection
+- a token check
+
+It runs on the web server's event loop, where questions run, so the warmed
+connection pools are the ones questions use. main() then primes the web UI's
+response cache and only then opens the browser.
+
+HealthMonitor keeps the state of each component ("llm", "mcp", "token") and
+re-checks the MCP session and token every HEALTH_CHECK_INTERVAL_SECONDS. It
+backs the /healthz (liveness) and /readyz (readiness) endpoints of the web
+server, so a load balancer only sends traffic to warm instances.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+WARM_UP = os.environ.get("WARM_UP", "true").lower() == "true"
+WARM_UP_TIMEOUT_SECONDS = float(os.environ.get("WARM_UP_TIMEOUT_SECONDS", "120"))
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.environ.get("HEALTH_CHECK_INTERVAL_SECONDS", "30"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.environ.get("HEALTH_CHECK_TIMEOUT_SECONDS", "10"))
+
+PENDING = "pending"
+OK = "ok"
+ERROR = "error"
+SKIPPED = "skipped"
+
+COMPONENTS = ("llm", "mcp", "token")
+
+
+@dataclass
+class ComponentHealth:
+    state: str = PENDING
+    detail: str | None = None
+    checked_at: float | None = None
+    latency_seconds: float | None = None
+
+
+class HealthMonitor:
+    """Thread-safe component states behind /healthz and /readyz."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components = {name: ComponentHealth() for name in COMPONENTS}
+        self._warmed_at: float | None = None
+
+    def set(self, name: str, state: str, detail: str | None = None, latency: float | None = None) -> None:
+        with self._lock:
+            self._components[name] = ComponentHealth(
+                state=state,
+                detail=detail,
+                checked_at=time.time(),
+                latency_seconds=round(latency, 3) if latency is not None else None,
+            )
+
+    async def _check(self, name: str, check: Callable[[], Awaitable[str | None]], timeout: float) -> None:
+        """Run check(), recording ok (with the detail it returns) or the error it raised."""
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(check(), timeout)
+        except Exception as exc:
+            self.set(name, ERROR, str(exc) or type(exc).__name__, time.perf_counter() - start)
+            logger.warning(f"Health check '{name}' failed: {exc!r}")
+        else:
+            self.set(name, OK, detail, time.perf_counter() - start)
+
+    async def warm_up(
+        self,
+        warm_llm: Callable[[], Awaitable[None]],
+        ping_mcp: Callable[[], Awaitable[None]],
+        token_expiry: Callable[[], Awaitable[float | None]] | None,
+    ) -> None:
+        """Warm the LLM and MCP connections concurrently, then check the token."""
+        if not WARM_UP:
+            self.set("llm", SKIPPED, "WARM_UP=false")
+        start = time.perf_counter()
+        checks = [self._check("mcp", ping_mcp, WARM_UP_TIMEOUT_SECONDS)]
+        if WARM_UP:
+            checks.append(self._check("llm", warm_llm, WARM_UP_TIMEOUT_SECONDS))
+        await asyncio.gather(*checks)
+        await self.check_token(token_expiry)
+        with self._lock:
+            self._warmed_at = time.time()
+        print(f"Warm-up finished in {time.perf_counter() - start:.1f}s: {self._states()}")
+
+    async def check_token(self, token_expiry: Callable[[], Awaitable[float | None]] | None) -> None:
+        if token_expiry is None:
+            self.set("token", SKIPPED, "no token storage")
+            return
+
+        async def check() -> str | None:
+            expiry = await token_expiry()
+            if expiry is None:
+                return None
+            remaining = expiry - time.time()
+            if remaining <= 0:
+                raise RuntimeError(f"token expired {-remaining:.0f}s ago")
+            return f"expires in {remaining:.0f}s"
+
+        await self._check("token", check, HEALTH_CHECK_TIMEOUT_SECONDS)
+
+    async def run_checks(
+        self,
+        warm_llm: Callable[[], Awaitable[None]],
+        ping_mcp: Callable[[], Awaitable[None]],
+        token_expiry: Callable[[], Awaitable[float | None]] | None,
+    ) -> None:
+        """Re-check the MCP session and token periodically until cancelled.
+
+        The ping goes through the OAuth provider, so it also refreshes a token
+        that is about to expire before the token is checked. The LLM is only
+        called again while its warm-up call is failing.
+        """
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL_SECONDS)
+            await self._check("mcp", ping_mcp, HEALTH_CHECK_TIMEOUT_SECONDS)
+            await self.check_token(token_expiry)
+            if self._states()["llm"] == ERROR:
+                await self._check("llm", warm_llm, WARM_UP_TIMEOUT_SECONDS)
+
+    def _states(self) -> dict[str, str]:
+        with self._lock:
+            return {name: c.state for name, c in self._components.items()}
+
+    def _report(self, app_status: dict) -> dict:
+        with self._lock:
+            return {
+                "state": app_status.get("state"),
+                "warmed_at": self._warmed_at,
+                "components": {name: asdict(c) for name, c in self._components.items()},
+            }
+
+    def liveness(self, app_status: dict) -> tuple[int, dict]:
+        """/healthz: 200 unless startup failed. Component states are informational."""
+        report = self._report(app_status)
+        return (503 if app_status.get("state") == "error" else 200), report
+
+    def readiness(self, app_status: dict) -> tuple[int, dict]:
+        """/readyz: 200 once the agent is up, warm-up has run and no component is failing."""
+        report = self._report(app_status)
+        ready = (
+            app_status.get("ready")
+            and report["warmed_at"] is not None
+            and all(c["state"] in (OK, SKIPPED) for c in report["components"].values())
+        )
+        return (200 if ready else 503), {"ready": bool(ready), **report}
+
+
+health_monitor = HealthMonitor()
@@ -0,0 +1,232 @@
+"""
+Shared HTTP transport factory for MCP and OAuth traffic.
+
+Every httpx.AsyncClient the app creates for the Visier MCP server or the
+token endpoint comes from here, so both MCPClientBackend implementations and
+the OAuth provider get the same tuning:
+
+- HTTP/2 multiplexing (when the `h2` package is installed)
+- explicit keep-alive and pool sizes
+- connect/read/write/pool timeouts per operation
+- jittered exponential backoff for connection errors and 429/503 responses
+
+Clients created on the same event loop share one connection pool, so the
+LangChain adapter, which opens a fresh MCP session (and client) for every
+tool call, reuses warm TLS connections instead of handshaking each time.
+Clients can also ask for a named pool (one per tenant, see client/tenants.py)
+with its own connection limits per loop, which is closed on every loop when
+the tenant is evicted.
+"""
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import time
+import weakref
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    _HAS_H2 = True
+except ImportError:
+    _HAS_H2 = False
+
+MCP_HTTP2 = os.environ.get("MCP_HTTP2", "true").lower() == "true"
+MCP_MAX_CONNECTIONS = int(os.environ.get("MCP_MAX_CONNECTIONS", "20"))
+MCP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("MCP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+MCP_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("MCP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+MCP_RETRY_ATTEMPTS = int(os.environ.get("MCP_RETRY_ATTEMPTS", "3"))
+MCP_RETRY_BACKOFF_SECONDS = float(os.environ.get("MCP_RETRY_BACKOFF_SECONDS", "0.5"))
+MCP_RETRY_MAX_BACKOFF_SECONDS = float(os.environ.get("MCP_RETRY_MAX_BACKOFF_SECONDS", "10"))
+
+# Timeouts per operation. "mcp" keeps read=None because the streamable HTTP
+# transport holds an SSE stream open; without it the background reader times
+# out while a slow tool is still running and crashes the session.
+TIMEOUTS = {
+    "mcp": httpx.Timeout(30.0, connect=10.0, read=None, pool=30.0),
+    "token": httpx.Timeout(30.0, connect=10.0, read=30.0, pool=10.0),
+}
+
+_RETRY_STATUS_CODES = {429, 503}
+# Methods that are safe to resend after the request may have reached the server.
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "DELETE", "PUT"}
+
+
+def _backoff(attempt: int, retry_after: float | None = None) -> float:
+    """Full-jitter exponential backoff, honouring Retry-After when the server sends one."""
+    if retry_after is not None:
+        return min(retry_after, MCP_RETRY_MAX_BACKOFF_SECONDS)
+    return random.uniform(0, min(MCP_RETRY_MAX_BACKOFF_SECONDS, MCP_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """Retry connection failures and 429/503 responses with jittered backoff.
+
+    A connect failure or a 429/503 means the server did not process the request,
+    so those are retried for any method, including MCP's JSON-RPC POSTs. Read
+    and protocol errors are retried only for idempotent methods.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, attempts: int = MCP_RETRY_ATTEMPTS):
+        self._transport = transport
+        self._attempts = max(1, attempts)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self._attempts):
+            last = attempt == self._attempts - 1
+            try:
+                response = await self._transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as exc:
+                if last:
+                    raise
+                delay = _backoff(attempt)
+                logger.debug(f"{request.method} {request.url} failed to connect ({exc!r}), retrying in {delay:.2f}s")
+            except (httpx.ReadError, httpx.RemoteProtocolError) as exc:
+                if last or request.method not in _IDEMPOTENT_METHODS:
+                    raise
+                delay = _backoff(attempt)
+                logger.debug(f"{request.method} {request.url} failed ({exc!r}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in _RETRY_STATUS_CODES or last:
+                    return response
+                delay = _backoff(attempt, _parse_retry_after(response.headers.get("Retry-After")))
+                logger.debug(f"{request.method} {request.url} returned {response.status_code}, retrying in {delay:.2f}s")
+                await response.aclose()
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """Borrowed reference to a loop-wide pool; closing a client must not close the pool."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+# Pools per event loop (httpx connections are bound to the loop that opened them),
+# keyed by pool name; None is the default pool.
+_pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# Pool name -> max connections, for named pools that don't use MCP_MAX_CONNECTIONS.
+_pool_max_connections: dict[str, int] = {}
+
+
+def _http2_enabled() -> bool:
+    if MCP_HTTP2 and not _HAS_H2:
+        logger.info("MCP_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+    return MCP_HTTP2 and _HAS_H2
+
+
+def set_pool_limits(name: str, max_connections: int) -> None:
+    """Cap the connections of the named pool *name* on each loop (applies to pools created afterwards)."""
+    _pool_max_connections[name] = max(1, max_connections)
+
+
+def _shared_pool(name: str | None = None) -> httpx.AsyncBaseTransport:
+    """Return the retrying connection pool *name* for the running event loop."""
+    loop_pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    pool = loop_pools.get(name)
+    if pool is None:
+        max_connections = _pool_max_connections.get(name, MCP_MAX_CONNECTIONS) if name else MCP_MAX_CONNECTIONS
+        pool = RetryTransport(httpx.AsyncHTTPTransport(
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(MCP_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+                keepalive_expiry=MCP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        ))
+        loop_pools[name] = pool
+    return pool
+
+
+def create_http_client(
+    auth: httpx.Auth | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: httpx.Timeout | None = None,
+    operation: str = "mcp",
+    pool: str | None = None,
+) -> httpx.AsyncClient:
+    """Create an httpx.AsyncClient backed by the shared pool of the running event loop.
+
+    Args:
+        auth: Optional httpx auth (OAuth provider).
+        headers: Optional default headers.
+        timeout: Explicit timeout; defaults to TIMEOUTS[operation].
+        operation: Timeout profile to use when *timeout* is not given ("mcp" or "token").
+        pool: Named pool to use instead of the default one.
+    """
+    return httpx.AsyncClient(
+        auth=auth,
+        headers=headers,
+        timeout=timeout or TIMEOUTS[operation],
+        transport=_SharedTransport(_shared_pool(pool)),
+        follow_redirects=True,
+    )
+
+
+def mcp_http_client_factory(
+    headers: dict[str, str] | None = None,
+    timeout: httpx.Timeout | None = None,
+    auth: httpx.Auth | None = None,
+    pool: str | None = None,
+) -> httpx.AsyncClient:
+    """McpHttpClientFactory-compatible wrapper around create_http_client.
+
+    The adapter passes its own timeout (30s, 5 min SSE read); the connect and
+    pool limits of the "mcp" profile are kept. Bind *pool* with functools.partial.
+    """
+    if timeout is not None:
+        default = TIMEOUTS["mcp"]
+        timeout = httpx.Timeout(timeout.write, connect=default.connect, read=timeout.read, pool=default.pool)
+    return create_http_client(auth=auth, headers=headers, timeout=timeout, pool=pool)
+
+
+async def aclose_pool(name: str) -> None:
+    """Close the named pool on every loop that opened it.
+
+    Connections can only be closed from their own loop, so pools of other
+    loops are closed there (and awaited); a pool whose loop has already
+    stopped is just dropped.
+    """
+    running = asyncio.get_running_loop()
+    for loop, loop_pools in list(_pools.items()):
+        pool = loop_pools.pop(name, None)
+        if pool is None:
+            continue
+        try:
+            if loop is running:
+                await pool.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(pool.aclose(), loop))
+        except Exception as exc:
+            logger.warning(f"Closing HTTP pool '{name}' failed: {exc}")
+    _pool_max_connections.pop(name, None)
+
+
+async def aclose_shared_pool() -> None:
+    """Close every pool of the running event loop (call on shutdown)."""
+    for pool in (_pools.pop(asyncio.get_running_loop(), None) or {}).values():
+        await pool.aclose()
@@ -3,131 +3,189 @@ LangChain / LangGraph agent backend.
 
 Wraps a LangGraph agent (created via langchain.agents.create_agent) and
 translates its LangGraph-specific streaming format into the common
-ThinkingChunk / FinalChunk protocol.
+ThinkingChunk / ToolCallChunk / ToolResultChunk / LLMTurnChunk / FinalChunk
+protocol.
+
+LangGraph reports a node's messages when the node finishes, so a step is
+timed from the end of the previous update to the end of its own.
 """
+import asyncio
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from typing import AsyncIterator
 
-from client.agent_backend import AgentBackend, AgentChunk, ThinkingChunk, FinalChunk, extract_final_response
+from client.agent_backend import (
+    AgentBackend, AgentChunk, ThinkingChunk, ToolCallChunk, ToolResultChunk, LLMTurnChunk, FinalChunk,
+    extract_final_response,
+)
 from client.constants import FINAL_RESPONSE_MARKER
+from client.speculation import Speculation
+from client.transcript import (
+    MODEL_TEXT, TranscriptEvent, content_size, iter_text, preview,
+)
+
+
+@dataclass
+class _RunState:
+    """Per-run bookkeeping for turning stream updates into timed chunks."""
+    step_started: float = field(default_factory=time.time)
+    turns: int = 0
+    # tool call id -> (tool name, time the call was requested)
+    pending_calls: dict[str, tuple[str, float]] = field(default_factory=dict)
 
 
 class LangChainAgentBackend(AgentBackend):
     """AgentBackend backed by a LangGraph react-agent."""
 
-    def __init__(self, agent):
+    def __init__(
+        self,
+        agent,
+        speculate: Callable[[str], Speculation | None] | None = None,
+        models: list | None = None,
+    ):
         self._agent = agent
+        # Starts the run's speculative first tool call (client/speculation.py).
+        self._speculate = speculate
+        # RoutedChatModels the agent calls (strong, and fast when tier routing is on).
+        self._models = models or []
+
+    async def warm_up(self) -> None:
+        await asyncio.gather(*(model.warm_up() for model in self._models))
 
     async def astream(self, question: str) -> AsyncIterator[AgentChunk]:
         last_values = None
-        thinking_lines: list[str] = []
+        run = _RunState()
         inputs = {"messages": [{"role": "user", "content": question}]}
+        # Set before the graph runs, so the tool node's tasks inherit the run's speculation.
+        speculation = self._speculate(question) if self._speculate is not None else None
+
+        try:
+            async for chunk in self._agent.astream(inputs, stream_mode=["updates", "values"]):
+                if isinstance(chunk, tuple) and len(chunk) == 2:
+                    mode, payload = chunk
+                    if mode == "values":
+                        last_values = payload
+                    elif mode == "updates":
+                        for out in LangChainAgentBackend._update_chunks(payload, run):
+                            yield out
+                elif isinstance(chunk, dict):
+                    if "messages" in chunk and not any(k in chunk for k in ("model", "tools")):
+                        last_values = chunk
+                    else:
+                        for out in LangChainAgentBackend._update_chunks(chunk, run):
+                            yield out
+
+            response = LangChainAgentBackend._extract_final_response(last_values or {})
+            yield FinalChunk(response=response, success=True)
+        finally:
+            if speculation is not None:
+                speculation.close()
 
-        async for chunk in self._agent.astream(inputs, stream_mode=["updates", "values"]):
-            if isinstance(chunk, tuple) and len(chunk) == 2:
-                mode, payload = chunk
-                if mode == "values":
-                    last_values = payload
-                elif mode == "updates":
-                    line = LangChainAgentBackend._format_stream_update(payload)
-                    if line:
-                        thinking_lines.append(line)
-                        yield ThinkingChunk(content=line)
-            elif isinstance(chunk, dict):
-                if "messages" in chunk and not any(k in chunk for k in ("model", "tools")):
-                    last_values = chunk
-                else:
-                    line = LangChainAgentBackend._format_stream_update(chunk)
-                    if line:
-                        thinking_lines.append(line)
-                        yield ThinkingChunk(content=line)
-
-        response, thinking = LangChainAgentBackend._extract_final_response_and_thinking(last_values or {})
-        yield FinalChunk(response=response, success=True, thinking=thinking)
+    @staticmethod
+    def _msg_attr(msg, name: str, default=None):
+        if isinstance(msg, dict):
+            return msg.get(name, default)
+        return getattr(msg, name, default)
 
     @staticmethod
     def _msg_content(msg):
-        if hasattr(msg, "content"):
-            return getattr(msg, "content", None)
-        if isinstance(msg, dict):
-            return msg.get("content")
-        return None
+        return LangChainAgentBackend._msg_attr(msg, "content")
 
     @staticmethod
-    def _format_stream_update(update_dict) -> str | None:
-        """Convert a single LangGraph stream update into a human-readable line."""
-        lines = []
+    def _msg_type(msg) -> str:
+        return str(LangChainAgentBackend._msg_attr(msg, "type", "") or "")
+
+    @staticmethod
+    def _update_chunks(update_dict, run: _RunState) -> list[AgentChunk]:
+        """Convert a single LangGraph stream update into chunks."""
+        now = time.time()
+        chunks: list[AgentChunk] = []
         for node_name, state in (update_dict.items() if isinstance(update_dict, dict) else []):
             if not isinstance(state, dict):
                 continue
-            messages = state.get("messages") or []
-            for msg in messages:
-                content = LangChainAgentBackend._msg_content(msg)
-                if content:
-                    content = str(content).strip()
-                if not content:
-                    if hasattr(msg, "tool_calls") and getattr(msg, "tool_calls", None):
-                        for tc in msg.tool_calls or []:
-                            name = tc.get("name", "?") if isinstance(tc, dict) else getattr(tc, "name", "?")
-                            args = tc.get("args", {}) if isinstance(tc, dict) else getattr(tc, "args", {})
-                            lines.append(f"[{node_name}] Calling tool: {name} with args: {args}")
-                    elif isinstance(msg, dict) and msg.get("tool_calls"):
-                        for tc in msg["tool_calls"] or []:
-                            lines.append(f"[{node_name}] Calling tool: {tc.get('name', '?')} with args: {tc.get('args', {})}")
-                    continue
-                msg_type = (
-                    getattr(msg, "type", "")
-                    if hasattr(msg, "type")
-                    else (msg.get("type") if isinstance(msg, dict) else "")
-                )
-                is_tool = (
-                    "tool" in str(msg_type).lower()
-                    or (hasattr(msg, "tool_call_id") and getattr(msg, "tool_call_id", None))
-                    or (isinstance(msg, dict) and msg.get("tool_call_id"))
-                )
-                truncated = content[:500] + ("..." if len(content) > 500 else "")
-                if is_tool:
-                    lines.append(f"[{node_name}] Tool result: {truncated}")
-                else:
-                    lines.append(f"[{node_name}] {truncated}")
-        return "\n".join(lines) if lines else None
+            for msg in state.get("messages") or []:
+                chunks.extend(LangChainAgentBackend._message_chunks(node_name, msg, run, now))
+        run.step_started = now
+        return chunks
+
+    @staticmethod
+    def _message_chunks(node_name: str, msg, run: _RunState, now: float) -> list[AgentChunk]:
+        attr = LangChainAgentBackend._msg_attr
+        content = LangChainAgentBackend._msg_content(msg)
+        has_text = any(piece.strip() for piece in iter_text(content)) if content else False
+        msg_type = LangChainAgentBackend._msg_type(msg).lower()
+        chunks: list[AgentChunk] = []
+
+        if "tool" in msg_type or attr(msg, "tool_call_id"):
+            call_id = attr(msg, "tool_call_id") or ""
+            name, started_at = run.pending_calls.pop(call_id, (attr(msg, "name"), run.step_started))
+            chunks.append(ToolResultChunk(
+                call_id=call_id,
+                name=attr(msg, "name") or name or "?",
+                started_at=started_at,
+                ended_at=now,
+                size=content_size(content),
+                is_error=attr(msg, "status") == "error" or preview(content, 5).startswith("Error"),
+                preview=preview(content),
+            ))
+            return chunks
+
+        tool_calls = attr(msg, "tool_calls") or []
+        if msg_type == "ai":
+            run.turns += 1
+            usage = attr(msg, "usage_metadata") or {}
+            metadata = attr(msg, "response_metadata") or {}
+            chunks.append(LLMTurnChunk(
+                turn_id=f"turn-{run.turns}",
+                model=metadata.get("routed_provider") or metadata.get("model_name") or metadata.get("model"),
+                requested_at=run.step_started,
+                ended_at=now,
+                input_tokens=usage.get("input_tokens"),
+                output_tokens=usage.get("output_tokens"),
+                stop_reason=metadata.get("stop_reason") or metadata.get("finish_reason"),
+                tool_calls=len(tool_calls),
+            ))
+
+        if has_text:
+            event = TranscriptEvent(kind=MODEL_TEXT, source=node_name, payload=content)
+            chunks.append(ThinkingChunk(content=event.format()))
+
+        for index, tc in enumerate(tool_calls):
+            name = attr(tc, "name", "?")
+            args = attr(tc, "args", {}) or {}
+            call_id = attr(tc, "id") or f"turn-{run.turns}-call-{index}"
+            run.pending_calls[call_id] = (name, now)
+            chunks.append(ToolCallChunk(
+                call_id=call_id,
+                name=name,
+                args=args,
+                started_at=now,
+                args_size=len(json.dumps(args, default=str)),
+            ))
+        return chunks
 
     @staticmethod
-    def _extract_final_response_and_thinking(state: dict) -> tuple[str, str]:
-        """Extract final response and thinking summary from a LangGraph graph state."""
+    def _extract_final_response(state: dict) -> str:
+        """Extract the final response from a LangGraph graph state.
+
+        Only the model's messages are read; tool payloads are never stringified here.
+        """
         if not state or not isinstance(state, dict):
-            return "Response received but content was empty", ""
-
-        messages = state.get("messages") or []
-        all_content: list[str] = []
-        thinking_content: list[str] = []
-
-        for i, message in enumerate(messages):
-            if hasattr(message, "content") and message.content:
-                content_str = str(message.content).strip()
-                if not content_str:
-                    continue
-                all_content.append(content_str)
-                msg_type = getattr(message, "type", "")
-                if msg_type in ("tool", "tool_use") or "tool" in content_str.lower():
-                    thinking_content.append(f"Tool: {content_str}")
-                elif i == 0:
-                    thinking_content.append(f"User: {content_str}")
-                elif i < len(messages) - 1:
-                    thinking_content.append(f"Agent: {content_str}")
-
-        thinking = "\n\n".join(thinking_content) if thinking_content else "Agent processed the request"
-
-        final_response: str | None = None
-        for content in all_content:
+            return "Response received but content was empty"
+
+        ai_content: list[str] = []
+        for message in state.get("messages") or []:
+            if LangChainAgentBackend._msg_type(message) != "ai":
+                continue
+            content_str = "".join(iter_text(LangChainAgentBackend._msg_content(message))).strip()
+            if content_str:
+                ai_content.append(content_str)
+
+        for content in ai_content:
             if FINAL_RESPONSE_MARKER in content:
-                final_response = extract_final_response(content)
-                break
-        if not final_response:
-            for content in reversed(all_content):
-                if not any(w in content.lower() for w in ("tool", "function", "action:", "observation:")):
-                    final_response = content
-                    break
-        if not final_response and all_content:
-            final_response = all_content[-1]
-
-        return final_response or "Response received but content was empty", thinking
+                return extract_final_response(content) or "Response received but content was empty"
+        if ai_content:
+            return ai_content[-1]
+        return "Response received but content was empty"
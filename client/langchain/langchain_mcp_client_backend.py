@@ -4,17 +4,28 @@ LangChain MCP client backend.
 Connects to the MCP server via MultiServerMCPClient (langchain-mcp-adapters)
 and creates a LangChain/LangGraph agent.
 """
+import contextlib
 import json
+from functools import partial
 
 import httpx
+from langchain_mcp_adapters.callbacks import Callbacks
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
 from langchain.agents import create_agent as create_lc_agent
+from mcp.types import CallToolResult
 
 from client.mcp_client_backend import MCPClientBackend
 from client.agent_backend import AgentBackend
+from client.http_transport import mcp_http_client_factory
 from client.langchain.langchain_agent_backend import LangChainAgentBackend
-from client.llm_provider import LLM_PROVIDER, get_llm_provider
+from client.langchain.model_routing_middleware import ModelRoutingMiddleware
+from client.llm_provider import LLM_PROVIDER, get_llm_provider, get_fast_llm_provider
 from client.messages import SYSTEM_PROMPT
+from client.speculation import Speculation
+from client.tool_calls import ToolCallGuard
+from client.tool_progress import on_logging_message, on_progress, progress_callback
 
 # MultiServerMCPClient manages multiple MCP servers in a named dictionary, so every
 # subsequent call (session(), get_prompt(), etc.) needs this key to route to the right server.
@@ -24,29 +35,75 @@ _MCP_SERVER_NAME = "visier-service"
 class LangChainMCPClientBackend(MCPClientBackend):
     """MCP client using MultiServerMCPClient and a LangChain/LangGraph agent."""
 
-    def __init__(self, url: str, auth: httpx.Auth) -> None:
+    def __init__(self, url: str, auth: httpx.Auth, pool: str | None = None) -> None:
+        super().__init__(url, pool)
         self._url = url
         self._auth = auth
+        self._pool = pool
+        self._guard = ToolCallGuard(url)
         self._client = None
+        self._connection: dict = {}
+        self._session = None
+        self._exit_stack: contextlib.AsyncExitStack | None = None
         self._tools: list = []
         self._prompts: list = []
 
     async def __aenter__(self) -> "LangChainMCPClientBackend":
-        self._client = MultiServerMCPClient({
-            _MCP_SERVER_NAME: {
-                "transport": "streamable_http",
-                "url": self._url,
-                "auth": self._auth,
-            }
-        })
-        self._tools = await self._client.get_tools()
-        async with self._client.session(_MCP_SERVER_NAME) as session:
-            result = await session.list_prompts()
-            self._prompts = result.prompts
+        self._connection = {
+            "transport": "streamable_http",
+            "url": self._url,
+            "auth": self._auth,
+            # Shared, tuned pool: the adapter opens a new session per call, so
+            # this is what lets those sessions reuse warm connections.
+            "httpx_client_factory": partial(mcp_http_client_factory, pool=self._pool),
+        }
+        # Every tool call goes through the guard (rate limiting, throttling retries).
+        # Progress and log notifications go to the run that made the call.
+        self._client = MultiServerMCPClient(
+            {_MCP_SERVER_NAME: self._connection},
+            callbacks=Callbacks(on_progress=on_progress, on_logging_message=on_logging_message),
+            tool_interceptors=[self._guard.interceptor],
+        )
+        # Tool calls still get a session each from the adapter. This one long-lived
+        # session lists the catalog and stays open to receive list_changed notifications.
+        self._exit_stack = contextlib.AsyncExitStack()
+        await self._exit_stack.__aenter__()
+        self._session = await self._exit_stack.enter_async_context(create_session({
+            **self._connection,
+            "session_kwargs": {"message_handler": self._handle_message},
+        }))
+        await self._session.initialize()
+        await self._load_catalog()
         return self
 
     async def __aexit__(self, *exc_info) -> None:
-        pass  # MultiServerMCPClient manages its own session lifecycle internally
+        if self._exit_stack:
+            await self._exit_stack.__aexit__(*exc_info)
+
+    async def _load_tools(self) -> None:
+        mcp_tools, cursor = [], None
+        while True:
+            page = await self._session.list_tools(cursor=cursor)
+            mcp_tools.extend(page.tools)
+            cursor = page.nextCursor
+            if not cursor:
+                break
+        self._guard.set_schemas({tool.name: tool.inputSchema for tool in mcp_tools})
+        # session=None: each tool call opens its own session, so tools work from any event loop.
+        self._tools = [
+            convert_mcp_tool_to_langchain_tool(
+                None,
+                tool,
+                connection=self._connection,
+                callbacks=self._client.callbacks,
+                tool_interceptors=self._client.tool_interceptors,
+                server_name=_MCP_SERVER_NAME,
+            )
+            for tool in mcp_tools
+        ]
+
+    async def _load_prompts(self) -> None:
+        self._prompts = (await self._session.list_prompts()).prompts
 
     def tool_definitions(self) -> list[dict]:
         result = []
@@ -71,11 +128,33 @@ class LangChainMCPClientBackend(MCPClientBackend):
 
     def create_agent(self, verbose: bool = False) -> AgentBackend:
         llm = get_llm_provider()
-        agent = create_lc_agent(llm, self._tools, system_prompt=SYSTEM_PROMPT, debug=verbose)
+        fast_llm = get_fast_llm_provider()
+        middleware = [ModelRoutingMiddleware(fast_llm, llm)] if fast_llm is not None else []
+        agent = create_lc_agent(
+            llm, self._tools, system_prompt=SYSTEM_PROMPT, middleware=middleware, debug=verbose
+        )
         print(f"Using LangChainAgentBackend with provider '{LLM_PROVIDER}'")
-        return LangChainAgentBackend(agent)
+        models = [m for m in (llm, fast_llm) if m is not None]
+        return LangChainAgentBackend(agent, speculate=self._speculate, models=models)
+
+    async def _call_tool(self, name: str, args: dict) -> CallToolResult:
+        # Same as the adapter's own tool execution: a fresh session on the caller's loop.
+        async with create_session({
+            **self._connection, "session_kwargs": {"logging_callback": on_logging_message},
+        }) as session:
+            await session.initialize()
+            return await session.call_tool(name, args, progress_callback=progress_callback())
+
+    async def ping(self) -> None:
+        # On a fresh session like tool calls, so it also warms the caller's connection pool.
+        async with create_session(self._connection) as session:
+            await session.initialize()
+            await session.send_ping()
+
+    def _speculate(self, question: str) -> Speculation | None:
+        return self._guard.speculate(question, {t.name for t in self._tools}, self._call_tool)
 
-    async def get_prompt_messages(
+    async def _fetch_prompt_messages(
         self, name: str, arguments: dict[str, str] | None = None
     ) -> list[str]:
         messages = await self._client.get_prompt(_MCP_SERVER_NAME, name, arguments=arguments or {})
@@ -0,0 +1,62 @@
+"""
+LangChain agent middleware that routes each model turn to a fast or strong model.
+
+The first turn of a simple lookup goes to the fast model. Any turn after a tool
+error goes to the strong model, and a fast-model answer that neither calls a
+tool nor carries FINAL_RESPONSE_MARKER is retried on the strong model.
+"""
+import time
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from client.constants import FINAL_RESPONSE_MARKER
+from client.llm_router import FAST_TIER, STRONG_TIER, classify_question, routing_stats
+
+
+class ModelRoutingMiddleware(AgentMiddleware):
+    """Pick the fast or strong model per turn and escalate when the fast one struggles."""
+
+    def __init__(self, fast_model: BaseChatModel, strong_model: BaseChatModel):
+        super().__init__()
+        self._models = {FAST_TIER: fast_model, STRONG_TIER: strong_model}
+
+    async def awrap_model_call(self, request: ModelRequest, handler) -> ModelResponse:
+        tier, reason = self._choose_tier(request.messages)
+        routing_stats.record_decision(tier, reason)
+        response = await self._call(tier, request, handler)
+
+        if tier == FAST_TIER and self._needs_escalation(response):
+            routing_stats.record_escalation("missing_final_marker")
+            response = await self._call(STRONG_TIER, request, handler)
+        return response
+
+    async def _call(self, tier: str, request: ModelRequest, handler) -> ModelResponse:
+        start = time.perf_counter()
+        try:
+            return await handler(request.override(model=self._models[tier]))
+        finally:
+            routing_stats.record_latency(tier, time.perf_counter() - start)
+
+    @staticmethod
+    def _choose_tier(messages: list) -> tuple[str, str]:
+        if any(ModelRoutingMiddleware._is_tool_error(m) for m in messages):
+            return STRONG_TIER, "tool_error"
+        question = next((m for m in messages if isinstance(m, HumanMessage)), None)
+        if question is None:
+            return STRONG_TIER, "no_question"
+        return classify_question(str(question.content))
+
+    @staticmethod
+    def _is_tool_error(msg) -> bool:
+        if not isinstance(msg, ToolMessage):
+            return False
+        return msg.status == "error" or str(msg.content).lstrip().startswith("Error")
+
+    @staticmethod
+    def _needs_escalation(response: ModelResponse) -> bool:
+        ai = next((m for m in reversed(response.result) if isinstance(m, AIMessage)), None)
+        if ai is None or ai.tool_calls:
+            return False
+        return FINAL_RESPONSE_MARKER not in str(ai.content)
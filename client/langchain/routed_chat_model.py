@@ -0,0 +1,112 @@
+"""
+LangChain chat model that routes each call through a HedgedRouter.
+
+Wraps one or more concrete chat models (primary first). Every call records
+per-provider latency; when more than one model is configured, slow calls are
+hedged to the next model and throttling/5xx failures fall over to it. Each
+attempt is paced by its provider's rate limit buckets, and a call throttled
+on every provider is retried with backoff (see client/rate_limit.py).
+"""
+import asyncio
+from functools import partial
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+from client.constants import WARM_UP_PROMPT
+from client.llm_router import HedgedRouter, is_retryable_error
+from client.rate_limit import estimate_tokens, limited, llm_buckets, retry_throttled
+
+
+def _message_tokens(message: BaseMessage) -> int | None:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class RoutedChatModel(BaseChatModel):
+    """BaseChatModel that delegates to a prioritized list of chat models."""
+
+    models: list[Any]
+    """Concrete chat models (or tool-bound runnables), primary first."""
+
+    names: list[str]
+    """Provider names used for latency tracking, parallel to `models`."""
+
+    router: HedgedRouter = Field(default_factory=HedgedRouter, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def model(self) -> str:
+        # Surfaced so langchain's model-name based feature detection sees the primary.
+        return self.names[0]
+
+    def bind_tools(self, tools, **kwargs) -> "RoutedChatModel":
+        return self.model_copy(update={"models": [m.bind_tools(tools, **kwargs) for m in self.models]})
+
+    def _targets(self, messages: list[BaseMessage], stop: list[str] | None, **kwargs):
+        if stop is not None:
+            kwargs["stop"] = stop
+        return [
+            (name, partial(self._ainvoke_tagged, name, model, messages, **kwargs))
+            for name, model in zip(self.names, self.models)
+        ]
+
+    @staticmethod
+    async def _ainvoke_tagged(name: str, model: Any, messages: list[BaseMessage], **kwargs: Any) -> BaseMessage:
+        # Hedging may pick any model, so record which one produced the message.
+        message = await limited(
+            llm_buckets(name),
+            partial(model.ainvoke, messages, **kwargs),
+            tokens=estimate_tokens("".join(str(m.content) for m in messages)),
+            usage=_message_tokens,
+        )
+        message.response_metadata["routed_provider"] = name
+        return message
+
+    async def warm_up(self) -> None:
+        """Make one minimal call to each model, primary and fallback alike."""
+        messages = [HumanMessage(WARM_UP_PROMPT)]
+        results = await asyncio.gather(
+            *(self._ainvoke_tagged(name, model, messages) for name, model in zip(self.names, self.models)),
+            return_exceptions=True,
+        )
+        failed = [f"{name}: {r}" for name, r in zip(self.names, results) if isinstance(r, Exception)]
+        if failed:
+            raise RuntimeError("; ".join(failed))
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        targets = self._targets(messages, stop, **kwargs)
+        message = await retry_throttled(lambda: self.router.call(targets))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # The agent loop is async; the sync path only falls over, without hedging.
+        if stop is not None:
+            kwargs["stop"] = stop
+        last_exc: Exception | None = None
+        for model in self.models:
+            try:
+                return ChatResult(generations=[ChatGeneration(message=model.invoke(messages, **kwargs))])
+            except Exception as exc:
+                if not is_retryable_error(exc):
+                    raise
+                last_exc = exc
+        raise last_exc
@@ -1,67 +1,153 @@
-import os
+"""
+LangChain LLM provider selection.
 
-from langchain_aws import ChatBedrockConverse
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langchain_ollama import ChatOllama
-from langchain_core.language_models import BaseChatModel
+Providers are registered by name and their SDKs are imported only when the
+provider is actually created, so a process pays for the one SDK it uses.
+This module itself is cheap to import; the boto3 backend reads its settings
+from here without loading LangChain.
+"""
+import os
+from collections.abc import Callable
+from typing import TYPE_CHECKING
 
 from client.messages import SYSTEM_PROMPT
 
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
 
 LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "ollama").lower()
 LLM_MODEL_ID = os.environ.get("LLM_MODEL_ID")
 
+# Optional secondary model used for hedged requests and fallover.
+# Either variable enables it; the provider defaults to LLM_PROVIDER.
+LLM_FALLBACK_PROVIDER = os.environ.get("LLM_FALLBACK_PROVIDER", "").lower() or None
+LLM_FALLBACK_MODEL_ID = os.environ.get("LLM_FALLBACK_MODEL_ID")
+
+# Optional fast/cheap model for simple lookups. Either variable enables tier routing;
+# the provider defaults to LLM_PROVIDER.
+LLM_FAST_PROVIDER = os.environ.get("LLM_FAST_PROVIDER", "").lower() or None
+LLM_FAST_MODEL_ID = os.environ.get("LLM_FAST_MODEL_ID")
+
 HAS_ANTHROPIC = os.environ.get("ANTHROPIC_API_KEY") is not None
 
 HAS_BEDROCK = os.environ.get("AWS_BEARER_TOKEN_BEDROCK") is not None
 BEDROCK_REGION = os.environ.get("AWS_REGION_BEDROCK", "us-west-2")
+BEDROCK_FALLBACK_REGION = os.environ.get("AWS_REGION_BEDROCK_FALLBACK")
 
 HAS_OPENAI = os.environ.get("OPENAI_API_KEY") is not None
 
+# How long Ollama keeps the model loaded after a call ("30m", "-1" for forever).
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
 current_model_name = None
 
 def get_current_model_name():
     """Get the current model name."""
     return current_model_name
 
-def get_llm_provider() -> BaseChatModel:
-    """Get the LLM provider based on environment variable."""
+# name -> factory(model_id) returning (resolved model name, chat model)
+_PROVIDERS: dict[str, Callable[[str | None], tuple[str, "BaseChatModel"]]] = {}
+
+def register_llm_provider(name: str):
+    """Decorator registering a chat model factory under *name* (the LLM_PROVIDER value)."""
+    def decorator(factory: Callable[[str | None], tuple[str, "BaseChatModel"]]):
+        _PROVIDERS[name] = factory
+        return factory
+    return decorator
+
+@register_llm_provider("anthropic")
+def _create_anthropic(model_id: str | None) -> tuple[str, "BaseChatModel"]:
+    if not HAS_ANTHROPIC:
+        raise ValueError("Selected Anthropic as provider but ANTHROPIC_API_KEY environment variable is not set.")
+    from langchain_anthropic import ChatAnthropic
+    model_name = model_id or "claude-3-5-sonnet-20241022"
+    print(f"Creating Anthropic chat agent with model {model_name}")
+    return model_name, ChatAnthropic(
+        model=model_name,
+        max_tokens=4096
+    )
+
+@register_llm_provider("bedrock")
+def _create_bedrock(model_id: str | None) -> tuple[str, "BaseChatModel"]:
+    if not HAS_BEDROCK:
+        raise ValueError("Selected Bedrock as provider but AWS_BEARER_TOKEN_BEDROCK environment variable is not set.")
+    from langchain_aws import ChatBedrockConverse
+    model_name = model_id or "anthropic.claude-3-5-sonnet-20241022-v2:0"
+    print(f"Creating Bedrock chat agent with model {model_name}")
+    return model_name, ChatBedrockConverse(
+        model_id=model_name,
+        region_name=BEDROCK_REGION
+    )
+
+@register_llm_provider("openai")
+def _create_openai(model_id: str | None) -> tuple[str, "BaseChatModel"]:
+    if not HAS_OPENAI:
+        raise ValueError("Selected OpenAI as provider but OPENAI_API_KEY environment variable is not set.")
+    from langchain_openai import ChatOpenAI
+    model_name = model_id or "gpt-5.3-codex"
+    print(f"Creating OpenAI chat agent with model {model_name}")
+    return model_name, ChatOpenAI(
+        model=model_name,
+        temperature=0
+    )
+
+@register_llm_provider("ollama")
+def _create_ollama(model_id: str | None) -> tuple[str, "BaseChatModel"]:
+    from langchain_ollama import ChatOllama
+    model_name = model_id or "qwen2.5"
+    print(f"Creating Ollama chat agent with model {model_name}")
+    keep_alive = int(OLLAMA_KEEP_ALIVE) if OLLAMA_KEEP_ALIVE.lstrip("-").isdigit() else OLLAMA_KEEP_ALIVE
+    return model_name, ChatOllama(
+        model=model_name,
+        system_prompt=SYSTEM_PROMPT,
+        keep_alive=keep_alive,
+    )
+
+def _create_chat_model(provider: str, model_id: str | None) -> tuple[str, "BaseChatModel"]:
+    """Create a chat model for *provider*, returning (resolved model name, model)."""
+    factory = _PROVIDERS.get(provider)
+    if factory is None:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    return factory(model_id)
+
+def get_llm_provider() -> "BaseChatModel":
+    """Get the LLM provider based on environment variables.
+
+    The primary model comes from LLM_PROVIDER/LLM_MODEL_ID. If LLM_FALLBACK_PROVIDER
+    or LLM_FALLBACK_MODEL_ID is set, a secondary model is added for hedging and fallover.
+    """
     global current_model_name
+    from client.langchain.routed_chat_model import RoutedChatModel
+
+    current_model_name, primary = _create_chat_model(LLM_PROVIDER, LLM_MODEL_ID)
+    names = [f"{LLM_PROVIDER}:{current_model_name}"]
+    models = [primary]
+
+    if LLM_FALLBACK_PROVIDER or LLM_FALLBACK_MODEL_ID:
+        fallback_provider = LLM_FALLBACK_PROVIDER or LLM_PROVIDER
+        fallback_name, fallback = _create_chat_model(fallback_provider, LLM_FALLBACK_MODEL_ID)
+        names.append(f"{fallback_provider}:{fallback_name}")
+        models.append(fallback)
+        print(f"Hedging/fallover enabled: {names[0]} -> {names[1]}")
+
+    return RoutedChatModel(models=models, names=names)
+
+def get_fast_llm_provider() -> "BaseChatModel | None":
+    """Get the fast-tier model from LLM_FAST_PROVIDER/LLM_FAST_MODEL_ID, or None if not configured.
+
+    The strong (primary) model is added behind it so slow or throttled fast calls
+    still hedge and fall over.
+    """
+    if not (LLM_FAST_PROVIDER or LLM_FAST_MODEL_ID):
+        return None
 
-    if LLM_PROVIDER == "anthropic":
-        if not HAS_ANTHROPIC:
-            raise ValueError("Selected Anthropic as provider but ANTHROPIC_API_KEY environment variable is not set.")
-        current_model_name = LLM_MODEL_ID or "claude-3-5-sonnet-20241022"
-        print(f"Creating Anthropic chat agent with model {current_model_name}")
-        return ChatAnthropic(
-            model=current_model_name,
-            max_tokens=4096
-        )
-    if LLM_PROVIDER == "bedrock":
-        if not HAS_BEDROCK:
-            raise ValueError("Selected Bedrock as provider but AWS_BEARER_TOKEN_BEDROCK environment variable is not set.")
-        current_model_name = LLM_MODEL_ID or "anthropic.claude-3-5-sonnet-20241022-v2:0"
-        print(f"Creating Bedrock chat agent with model {current_model_name}")
-        return ChatBedrockConverse(
-            model_id=current_model_name,
-            region_name=BEDROCK_REGION
-        )
-    if LLM_PROVIDER == "openai":
-        if not HAS_OPENAI:
-            raise ValueError("Selected OpenAI as provider but OPENAI_API_KEY environment variable is not set.")
-        current_model_name = LLM_MODEL_ID or "gpt-5.3-codex"
-        print(f"Creating OpenAI chat agent with model {current_model_name}")
-        return ChatOpenAI(
-            model=current_model_name,
-            temperature=0
-        )
-    if LLM_PROVIDER == "ollama":
-        current_model_name = LLM_MODEL_ID or "qwen2.5"
-        print(f"Creating Ollama chat agent with model {current_model_name}")
-        return ChatOllama(
-            model=current_model_name, 
-            system_prompt=SYSTEM_PROMPT
-        )
-    
-    raise ValueError(f"Unsupported LLM provider: {LLM_PROVIDER}")
\ No newline at end of file
+    from client.langchain.routed_chat_model import RoutedChatModel
+    fast_provider = LLM_FAST_PROVIDER or LLM_PROVIDER
+    fast_name, fast = _create_chat_model(fast_provider, LLM_FAST_MODEL_ID)
+    strong_name, strong = _create_chat_model(LLM_PROVIDER, LLM_MODEL_ID)
+    print(f"Tier routing enabled: fast={fast_provider}:{fast_name}, strong={LLM_PROVIDER}:{strong_name}")
+    return RoutedChatModel(
+        models=[fast, strong],
+        names=[f"{fast_provider}:{fast_name}", f"{LLM_PROVIDER}:{strong_name}"],
+    )
@@ -0,0 +1,304 @@
+"""
+Provider routing for LLM calls.
+
+Tracks per-provider latency and sends a hedged duplicate request to the next
+provider (a secondary model or region) once the primary has been running
+longer than its recent latency percentile. Whichever attempt finishes first
+wins and the others are cancelled. Throttling, 5xx and connection failures
+fall over to the next provider immediately.
+
+Also classifies questions so simple lookups can be routed to a fast model
+while multi-step analyses go to the strong one.
+
+Framework-agnostic: the LangChain backend routes through RoutedChatModel and
+ModelRoutingMiddleware; the boto3 backend routes its converse calls directly.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from client import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Hedge once the primary exceeds this percentile of its recent latencies.
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", "95"))
+# Clamp the adaptive hedge delay so a few fast samples can't cause a hedge storm
+# and a few slow ones can't disable hedging altogether.
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("LLM_HEDGE_MIN_DELAY_SECONDS", "2"))
+LLM_HEDGE_MAX_DELAY_SECONDS = float(os.environ.get("LLM_HEDGE_MAX_DELAY_SECONDS", "30"))
+# Used until a provider has enough samples for a meaningful percentile.
+LLM_HEDGE_INITIAL_DELAY_SECONDS = float(os.environ.get("LLM_HEDGE_INITIAL_DELAY_SECONDS", "10"))
+
+_LATENCY_WINDOW = 200
+_MIN_SAMPLES = 20
+
+# Error codes reported by Bedrock (botocore ClientError) that are worth retrying elsewhere.
+_RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+}
+
+
+class LatencyTracker:
+    """Thread-safe rolling window of call latencies per provider."""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+        self._errors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(provider, deque(maxlen=self._window)).append(seconds)
+
+    def record_error(self, provider: str) -> None:
+        with self._lock:
+            self._errors[provider] = self._errors.get(provider, 0) + 1
+
+    def percentile(self, provider: str, pct: float, min_samples: int = _MIN_SAMPLES) -> float | None:
+        """Return the *pct* percentile latency for *provider*, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < min_samples:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[idx]
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return per-provider counts and latency percentiles (seconds)."""
+        with self._lock:
+            providers = set(self._samples) | set(self._errors)
+        return {
+            p: {
+                "count": len(self._samples.get(p, ())),
+                "errors": self._errors.get(p, 0),
+                "p50": self.percentile(p, 50, min_samples=1),
+                "p95": self.percentile(p, 95, min_samples=1),
+                "p99": self.percentile(p, 99, min_samples=1),
+            }
+            for p in sorted(providers)
+        }
+
+
+# Shared by every router so hedge thresholds learn from all runs in the process.
+latency_tracker = LatencyTracker()
+
+_counters_lock = threading.Lock()
+_hedge_counters = {"hedges": 0, "hedge_wins": 0, "fallovers": 0}
+
+
+def _bump(counter: str) -> None:
+    with _counters_lock:
+        _hedge_counters[counter] += 1
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Return True if *exc* looks like throttling, a 5xx, or a transient connection failure.
+
+    Uses duck typing so this module doesn't import any provider SDK.
+    """
+    # botocore ClientError
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        error = response.get("Error") or {}
+        if error.get("Code") in _RETRYABLE_ERROR_CODES:
+            return True
+        status = (response.get("ResponseMetadata") or {}).get("HTTPStatusCode")
+        if isinstance(status, int) and (status == 429 or status >= 500):
+            return True
+    # anthropic/openai APIStatusError and friends
+    status = getattr(exc, "status_code", None)
+    if status is None and response is not None:
+        # httpx.HTTPStatusError
+        status = getattr(response, "status_code", None)
+    if isinstance(status, int) and (status == 429 or status >= 500):
+        return True
+    name = type(exc).__name__
+    return any(marker in name for marker in ("Throttl", "RateLimit", "Overloaded", "Connection", "Timeout"))
+
+
+class HedgedRouter:
+    """Run a call against an ordered list of providers with hedging and fallover."""
+
+    def __init__(
+        self,
+        tracker: LatencyTracker = latency_tracker,
+        percentile: float = LLM_HEDGE_PERCENTILE,
+        min_delay: float = LLM_HEDGE_MIN_DELAY_SECONDS,
+        max_delay: float = LLM_HEDGE_MAX_DELAY_SECONDS,
+        initial_delay: float = LLM_HEDGE_INITIAL_DELAY_SECONDS,
+    ):
+        self._tracker = tracker
+        self._percentile = percentile
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._initial_delay = initial_delay
+
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait on *provider* before launching a hedged request."""
+        observed = self._tracker.percentile(provider, self._percentile)
+        delay = self._initial_delay if observed is None else observed
+        return max(self._min_delay, min(self._max_delay, delay))
+
+    async def call(self, targets: list[tuple[str, Callable[[], Awaitable[T]]]]) -> T:
+        """Await the first successful result from *targets*, in priority order.
+
+        Args:
+            targets: (provider name, zero-arg coroutine factory) pairs. The first is
+                     the primary; later entries are used for hedging and fallover.
+        """
+        if not targets:
+            raise ValueError("No LLM targets configured")
+
+        pending: dict[asyncio.Task, str] = {}
+        next_idx = 0
+        last_name = targets[0][0]
+        last_exc: BaseException | None = None
+        primary_exc: BaseException | None = None
+
+        def launch() -> None:
+            nonlocal next_idx, last_name
+            name, factory = targets[next_idx]
+            next_idx += 1
+            last_name = name
+            pending[asyncio.ensure_future(self._timed(name, factory))] = name
+
+        launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(last_name) if next_idx < len(targets) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"LLM call to {last_name} exceeded {timeout:.1f}s, hedging to {targets[next_idx][0]}")
+                    _bump("hedges")
+                    launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        if name != targets[0][0] and len(pending) > 0:
+                            _bump("hedge_wins")
+                        return task.result()
+                    last_exc = exc
+                    if primary_exc is None and name == targets[0][0]:
+                        primary_exc = exc
+                    if not is_retryable_error(exc):
+                        # Another attempt may still succeed (e.g. a slow primary when the
+                        # hedge is misconfigured); only give up once none is left.
+                        logger.warning(f"LLM call to {name} failed: {exc}")
+                        continue
+                    logger.warning(f"LLM call to {name} failed with retryable error: {exc}")
+                    if next_idx < len(targets) and not pending:
+                        _bump("fallovers")
+                        launch()
+            assert last_exc is not None
+            raise primary_exc or last_exc
+        finally:
+            # Cancel the losers. Work already handed to a thread (boto3) keeps running
+            # to completion in the background, but its result is discarded.
+            for task in pending:
+                task.cancel()
+
+    async def _timed(self, name: str, factory: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            # A hedged-away loser took at least this long. Recording it keeps the
+            # percentile from drifting down as slow calls stop completing.
+            self._tracker.record(name, time.perf_counter() - start)
+            raise
+        except Exception:
+            self._tracker.record_error(name)
+            raise
+        self._tracker.record(name, time.perf_counter() - start)
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Complexity-based tier routing
+# ---------------------------------------------------------------------------
+
+FAST_TIER = "fast"
+STRONG_TIER = "strong"
+
+# Questions longer than this (in words) go to the strong model.
+LLM_FAST_MAX_WORDS = int(os.environ.get("LLM_FAST_MAX_WORDS", "20"))
+
+# Phrases that signal a multi-step analysis rather than a single lookup.
+_COMPLEX_PATTERN = re.compile(
+    r"\b(trends?|compar\w*|versus|vs\.?|why|explain|breakdown|break down|by \w+|per \w+|each|"
+    r"over (the )?(last|past)|between|correlat\w*|forecast\w*|predict\w*|analy[sz]\w*|"
+    r"top \d+|rank\w*|drivers?|impact|then)\b",
+    re.IGNORECASE,
+)
+
+
+def classify_question(question: str) -> tuple[str, str]:
+    """Classify *question* as FAST_TIER or STRONG_TIER with cheap heuristics.
+
+    Returns (tier, reason).
+    """
+    words = question.split()
+    if len(words) > LLM_FAST_MAX_WORDS:
+        return STRONG_TIER, "long_question"
+    if question.count("?") > 1:
+        return STRONG_TIER, "multiple_questions"
+    match = _COMPLEX_PATTERN.search(question)
+    if match:
+        return STRONG_TIER, f"keyword:{match.group(0).lower()}"
+    return FAST_TIER, "simple_lookup"
+
+
+class RoutingStats:
+    """Thread-safe counters for tier routing decisions, escalations and per-tier latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decisions: dict[str, int] = {}
+        self._reasons: dict[str, int] = {}
+        self._escalations: dict[str, int] = {}
+        self._latency = LatencyTracker()
+
+    def record_decision(self, tier: str, reason: str) -> None:
+        with self._lock:
+            self._decisions[tier] = self._decisions.get(tier, 0) + 1
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+    def record_escalation(self, reason: str) -> None:
+        logger.info(f"Escalating to strong model: {reason}")
+        with self._lock:
+            self._escalations[reason] = self._escalations.get(reason, 0) + 1
+
+    def record_latency(self, tier: str, seconds: float) -> None:
+        self._latency.record(tier, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "decisions": dict(self._decisions),
+                "reasons": dict(self._reasons),
+                "escalations": dict(self._escalations),
+                "tier_latency": self._latency.snapshot(),
+            }
+
+
+routing_stats = RoutingStats()
+
+metrics.register("llm_providers", lambda: {**_hedge_counters, "latency": latency_tracker.snapshot()})
+metrics.register("llm_routing", routing_stats.snapshot)
@@ -0,0 +1,168 @@
+"""
+Event-loop lag watchdog.
+
+Anything that blocks an event loop, such as a synchronous SDK call, a large
+json.dumps or a blocking write, stalls every run on that loop at once. This
+module makes that visible.
+
+A small task on each monitored loop wakes every LOOP_MONITOR_INTERVAL_MS and
+records how late it woke up. That delay is the loop's scheduling lag. A
+watchdog thread notices when a loop has not ticked for LOOP_LAG_THRESHOLD_MS.
+It then captures the stack of the loop's thread, which shows the code that is
+blocking it, while the stall is still happening. A stall inside C code that
+holds the GIL (a huge json.dumps, for example) keeps the watchdog from running.
+Such a stall is still recorded, but without a stack.
+
+Lag percentiles, a lag histogram and the most recent stalls with their stacks
+are reported per loop under "event_loops" at /metrics. client.main() monitors
+the main (MCP) loop and the web server monitors its event loop.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from client import metrics
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL_MS = float(os.environ.get("LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_LAG_THRESHOLD_MS = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_LAG_MAX_STALLS = int(os.environ.get("LOOP_LAG_MAX_STALLS", "20"))
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is open-ended.
+_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+_WINDOW = 1000
+_STACK_DEPTH = 25
+
+
+class LoopMonitor:
+    """Lag measurements and stall stacks of one event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._thread_id: int | None = None
+        self._last_tick = time.monotonic()
+        self._lags: deque[float] = deque(maxlen=_WINDOW)
+        self._histogram = [0] * (len(_BUCKETS_MS) + 1)
+        self._max_lag = 0.0
+        self._stalls: deque[dict] = deque(maxlen=LOOP_LAG_MAX_STALLS)
+        self._stall_count = 0
+        # Stack captured by the watchdog during the current stall, if any.
+        self._stall_stack: list[str] | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the ticking task on *loop*; callable from any thread."""
+        def create() -> None:
+            self._task = loop.create_task(self.run(), name=f"loop-monitor-{self.name}")
+        loop.call_soon_threadsafe(create)
+
+    async def run(self) -> None:
+        """The ticking task; runs on the monitored loop until cancelled."""
+        self._thread_id = threading.get_ident()
+        interval = LOOP_MONITOR_INTERVAL_MS / 1000
+        while True:
+            expected = time.monotonic() + interval
+            with self._lock:
+                self._last_tick = time.monotonic()
+            await asyncio.sleep(interval)
+            self._record(max(0.0, time.monotonic() - expected) * 1000)
+
+    def _record(self, lag_ms: float) -> None:
+        bucket = next((i for i, bound in enumerate(_BUCKETS_MS) if lag_ms <= bound), len(_BUCKETS_MS))
+        with self._lock:
+            self._lags.append(lag_ms)
+            self._histogram[bucket] += 1
+            self._max_lag = max(self._max_lag, lag_ms)
+            if lag_ms < LOOP_LAG_THRESHOLD_MS:
+                return
+            stack, self._stall_stack = self._stall_stack, None
+            self._stall_count += 1
+            self._stalls.append({"at": time.time(), "lag_ms": round(lag_ms, 1), "stack": stack})
+        where = f" in {stack[-1]}" if stack else ""
+        logger.warning(f"Event loop '{self.name}' was blocked for {lag_ms:.0f} ms{where}")
+
+    def check(self) -> None:
+        """Called by the watchdog thread: capture the loop thread's stack if it is stalled right now."""
+        with self._lock:
+            stalled = (time.monotonic() - self._last_tick) * 1000 - LOOP_MONITOR_INTERVAL_MS
+            if self._thread_id is None or self._stall_stack is not None or stalled < LOOP_LAG_THRESHOLD_MS:
+                return
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return
+        # Without source lines: loading them would fill linecache with every file that ever stalled.
+        summary = traceback.StackSummary.extract(traceback.walk_stack(frame), limit=_STACK_DEPTH, lookup_lines=False)
+        stack = [f"{os.path.basename(f.filename)}:{f.lineno} {f.name}" for f in reversed(summary)]
+        with self._lock:
+            self._stall_stack = stack
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lags = sorted(self._lags)
+            histogram = dict(zip([f"le_{b}ms" for b in _BUCKETS_MS] + ["gt_2500ms"], self._histogram))
+            return {
+                "samples": sum(self._histogram),
+                "lag_ms": {
+                    "p50": _percentile(lags, 50),
+                    "p95": _percentile(lags, 95),
+                    "p99": _percentile(lags, 99),
+                    "max": round(self._max_lag, 1),
+                },
+                "histogram": histogram,
+                "stalls": self._stall_count,
+                "recent_stalls": list(self._stalls),
+            }
+
+
+def _percentile(samples: list[float], pct: float) -> float | None:
+    if not samples:
+        return None
+    return round(samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))], 1)
+
+
+# loop name -> monitor; all checked by one watchdog thread.
+_monitors: dict[str, LoopMonitor] = {}
+_watchdog: threading.Thread | None = None
+_watchdog_lock = threading.Lock()
+
+
+def _watch() -> None:
+    interval = min(LOOP_MONITOR_INTERVAL_MS, LOOP_LAG_THRESHOLD_MS) / 2000
+    while True:
+        time.sleep(interval)
+        for monitor in list(_monitors.values()):
+            monitor.check()
+
+
+def monitor_loop(name: str, loop: asyncio.AbstractEventLoop) -> LoopMonitor | None:
+    """Start monitoring *loop* (callable from any thread). Returns None when LOOP_MONITOR=false."""
+    global _watchdog
+    if not LOOP_MONITOR:
+        return None
+    monitor = LoopMonitor(name)
+    _monitors[name] = monitor
+    monitor.start(loop)
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = threading.Thread(target=_watch, name="loop-watchdog", daemon=True)
+            _watchdog.start()
+    return monitor
+
+
+def _snapshot() -> dict:
+    return {
+        "enabled": LOOP_MONITOR,
+        "threshold_ms": LOOP_LAG_THRESHOLD_MS,
+        "loops": {name: monitor.snapshot() for name, monitor in list(_monitors.items())},
+    }
+
+
+metrics.register("event_loops", _snapshot)
@@ -4,16 +4,25 @@ MCP client backend interface and factory.
 This is distinct from AgentBackend (which abstracts only the LLM loop):
 MCPClientBackend also owns the MCP server connection and tool/prompt loading.
 
-Implementations live in client/langchain/ and client/bedrock/.
+Implementations live in client/langchain/ and client/bedrock/. They are
+registered by AGENT_BACKEND name and imported only when selected, so the
+LangChain stack is never loaded for the boto3 backend and vice versa.
 """
+import asyncio
+import importlib
+import logging
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 
 import httpx
+from mcp import types
 from mcp.types import Prompt
 
 from client.agent_backend import AgentBackend
-from client.bedrock.bedrock_mcp_client_backend import BedrockMCPClientBackend
-from client.langchain.langchain_mcp_client_backend import LangChainMCPClientBackend
+from client.prompt_cache import PromptCache
+from client.shared_store import get_shared_store
+
+logger = logging.getLogger(__name__)
 
 
 class MCPClientBackend(ABC):
@@ -24,14 +33,30 @@ class MCPClientBackend(ABC):
         async with backend:
             agent = backend.create_agent()
             messages = await backend.get_prompt_messages("my-prompt")
+
+    Implementations pass _handle_message as the message_handler of a long-lived
+    ClientSession, so tools/list_changed and prompts/list_changed notifications
+    from the server refresh the catalog and notify catalog listeners.
     """
 
+    def __init__(self, url: str, pool: str | None = None) -> None:
+        self._catalog_listeners: list[Callable[[bool, bool], None]] = []
+        self._pending_refresh: set[str] = set()
+        self._refresh_task: asyncio.Task | None = None
+        self._prefetch_task: asyncio.Task | None = None
+        self._prompt_cache = PromptCache(f"{pool}@{url}" if pool else url, store=get_shared_store())
+
     @abstractmethod
     async def __aenter__(self) -> "MCPClientBackend": ...
 
     @abstractmethod
     async def __aexit__(self, *exc_info) -> None: ...
 
+    @abstractmethod
+    async def ping(self) -> None:
+        """Send an MCP ping from the caller's event loop; raises if the server doesn't answer."""
+        ...
+
     @abstractmethod
     def tool_definitions(self) -> list[dict]:
         """Return UI-ready tool info dicts with name, description, args, and args_schema."""
@@ -69,18 +94,114 @@ class MCPClientBackend(ABC):
         """
         ...
 
-    @abstractmethod
     async def get_prompt_messages(
         self, name: str, arguments: dict[str, str] | None = None
+    ) -> list[str]:
+        """Return a prompt's messages as strings, from the prompt cache or the MCP server."""
+        messages = self._prompt_cache.get(name, arguments)
+        if messages is None:
+            generation = self._prompt_cache.generation
+            messages = await self._fetch_prompt_messages(name, arguments)
+            self._prompt_cache.put(name, arguments, messages, generation)
+        return messages
+
+    @abstractmethod
+    async def _fetch_prompt_messages(
+        self, name: str, arguments: dict[str, str] | None = None
     ) -> list[str]:
         """Fetch a prompt by name from the MCP server and return its messages as strings."""
         ...
 
+    # --- Catalog loading and list_changed refresh ---
+
+    @abstractmethod
+    async def _load_tools(self) -> None:
+        """List tools from the MCP server and replace the backend's tool set."""
+        ...
+
+    @abstractmethod
+    async def _load_prompts(self) -> None:
+        """List prompts from the MCP server and replace the backend's prompt list."""
+        ...
+
+    async def _load_catalog(self) -> None:
+        """List tools and prompts concurrently, then warm the prompt cache in the background."""
+        await asyncio.gather(self._load_tools(), self._load_prompts())
+        self._start_prompt_prefetch()
+
+    def _start_prompt_prefetch(self) -> None:
+        if self._prompt_cache.enabled and (self._prefetch_task is None or self._prefetch_task.done()):
+            self._prefetch_task = asyncio.create_task(self._prefetch_prompts())
+
+    async def _prefetch_prompts(self) -> None:
+        """Render every prompt that takes no arguments, so loading it in the UI is instant."""
+        names = [p.name for p in self.prompts if not p.arguments]
+        results = await asyncio.gather(*(self.get_prompt_messages(name) for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Prefetching prompt '{name}' failed: {result}")
+
+    def add_catalog_listener(self, listener: Callable[[bool, bool], None]) -> None:
+        """Call listener(tools_changed, prompts_changed) after a list_changed refresh."""
+        self._catalog_listeners.append(listener)
+
+    async def _handle_message(self, message) -> None:
+        """ClientSession message_handler that schedules a refresh on list_changed notifications."""
+        if not isinstance(message, types.ServerNotification):
+            return
+        if isinstance(message.root, types.ToolListChangedNotification):
+            self._pending_refresh.add("tools")
+        elif isinstance(message.root, types.PromptListChangedNotification):
+            self._pending_refresh.add("prompts")
+        else:
+            return
+        # Refresh in a task: the handler runs inside the session's receive loop and
+        # awaiting a request on that same session from here would deadlock.
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_catalog())
+
+    async def _refresh_catalog(self) -> None:
+        # Notifications that arrive while a refresh is running are coalesced into one more pass.
+        while self._pending_refresh:
+            kinds, self._pending_refresh = self._pending_refresh, set()
+            print(f"MCP server reported {' and '.join(sorted(kinds))} changed, refreshing catalog...")
+            try:
+                await asyncio.gather(*(
+                    self._load_tools() if kind == "tools" else self._load_prompts() for kind in kinds
+                ))
+            except Exception:
+                logger.exception("Catalog refresh failed")
+                continue
+            if "prompts" in kinds:
+                self._prompt_cache.clear()
+                self._start_prompt_prefetch()
+            for listener in self._catalog_listeners:
+                try:
+                    listener("tools" in kinds, "prompts" in kinds)
+                except Exception:
+                    logger.exception("Catalog listener failed")
+
+
+# AGENT_BACKEND name -> "module:ClassName" of its MCPClientBackend implementation.
+_BACKENDS: dict[str, str] = {
+    "langchain": "client.langchain.langchain_mcp_client_backend:LangChainMCPClientBackend",
+    "boto3": "client.bedrock.bedrock_mcp_client_backend:BedrockMCPClientBackend",
+}
+
+
+def register_mcp_client_backend(name: str, import_path: str) -> None:
+    """Register an MCPClientBackend implementation under *name* as "module:ClassName"."""
+    _BACKENDS[name] = import_path
+
 
 def create_mcp_client_backend(
-    url: str, auth: httpx.Auth, agent_backend: str = "langchain"
+    url: str, auth: httpx.Auth, agent_backend: str = "langchain", pool: str | None = None
 ) -> MCPClientBackend:
-    """Instantiate the correct MCPClientBackend for the given agent_backend."""
-    if agent_backend == "boto3":
-        return BedrockMCPClientBackend(url, auth)
-    return LangChainMCPClientBackend(url, auth)
+    """Instantiate the correct MCPClientBackend for the given agent_backend.
+
+    Unknown names fall back to the LangChain backend. *pool* names the HTTP
+    connection pool (see client/http_transport.py) the backend's MCP traffic uses.
+    """
+    module_name, class_name = _BACKENDS.get(agent_backend, _BACKENDS["langchain"]).split(":")
+    backend_cls = getattr(importlib.import_module(module_name), class_name)
+    return backend_cls(url, auth, pool=pool)
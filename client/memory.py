@@ -0,0 +1,144 @@
+"""
+Process memory tracking for soak tests.
+
+With MEMORY_TRACKING=true, main() starts tracemalloc (keeping
+MEMORY_TRACEMALLOC_FRAMES frames per allocation) as its first step.
+The web server then exposes:
+
+- POST /memory/baseline: collect garbage and take the baseline snapshot,
+  usually after a few warm-up runs have filled caches and connection pools
+- GET /memory: the current RSS and traced size, and the allocation growth
+  since the baseline, summed per module and per source line
+
+Snapshots are slow with many live objects (a second or more), which the loop
+monitor will report as stalls; they are meant for soak tests
+(benchmarks/soak_test.py), not for production traffic. The cheap numbers
+(RSS, traced and peak traced size) are always reported under "memory" at
+/metrics.
+"""
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from client import metrics
+
+MEMORY_TRACKING = os.environ.get("MEMORY_TRACKING", "false").lower() == "true"
+MEMORY_TRACEMALLOC_FRAMES = int(os.environ.get("MEMORY_TRACEMALLOC_FRAMES", "1"))
+MEMORY_TOP = int(os.environ.get("MEMORY_TOP", "15"))
+
+# Allocations by the import machinery and by tracemalloc itself aren't growth of the app.
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size; the peak RSS where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _module_name(filename: str) -> str:
+    """Dotted module name of a source file, relative to the longest matching sys.path entry."""
+    path = os.path.abspath(filename)
+    roots = sorted((os.path.abspath(p) for p in sys.path if p), key=len, reverse=True)
+    for root in roots:
+        if path.startswith(root + os.sep):
+            relative = os.path.splitext(path[len(root) + 1:])[0]
+            return relative.replace(os.sep, ".").removesuffix(".__init__")
+    return filename
+
+
+class MemoryTracker:
+    """tracemalloc baseline and growth reports."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._baseline_at: float | None = None
+        self._baseline_rss: int | None = None
+
+    def start(self) -> None:
+        """Start tracemalloc if MEMORY_TRACKING is set."""
+        if MEMORY_TRACKING and not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_TRACEMALLOC_FRAMES)
+            print(f"Memory tracking enabled (tracemalloc, {MEMORY_TRACEMALLOC_FRAMES} frame(s) per allocation)")
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot | None:
+        gc.collect()
+        if not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def set_baseline(self) -> dict:
+        """Take the snapshot later reports compare against."""
+        with self._lock:
+            self._baseline = self._snapshot()
+            self._baseline_at = time.time()
+            self._baseline_rss = rss_bytes()
+        return self.snapshot()
+
+    def report(self, top: int = MEMORY_TOP) -> dict:
+        """Current memory and the *top* allocation growth sites since the baseline."""
+        with self._lock:
+            current = self._snapshot()
+            rss = rss_bytes()
+            report = {
+                **self.snapshot(),
+                "baseline_at": self._baseline_at,
+                "rss_growth_bytes": (
+                    rss - self._baseline_rss if rss is not None and self._baseline_rss is not None else None
+                ),
+            }
+            if current is None or self._baseline is None:
+                return report
+            sites = current.compare_to(self._baseline, "lineno")
+        modules: dict[str, list[int]] = {}
+        for stat in sites:
+            totals = modules.setdefault(_module_name(stat.traceback[0].filename), [0, 0])
+            totals[0] += stat.size_diff
+            totals[1] += stat.count_diff
+        report["traced_growth_bytes"] = sum(stat.size_diff for stat in sites)
+        report["modules"] = [
+            {"module": name, "size_diff": size, "count_diff": count}
+            for name, (size, count) in sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        ]
+        report["sites"] = [
+            {
+                "site": f"{_module_name(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+            }
+            for stat in sorted(sites, key=lambda stat: stat.size_diff, reverse=True)[:top]
+        ]
+        return report
+
+    def snapshot(self) -> dict:
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "rss_bytes": rss_bytes(),
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+        }
+
+
+memory_tracker = MemoryTracker()
+
+metrics.register("memory", memory_tracker.snapshot)
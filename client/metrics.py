@@ -0,0 +1,29 @@
+"""
+In-process metrics registry.
+
+Components register a zero-argument snapshot function under a name. The web
+server serves the combined snapshot as JSON at /metrics.
+"""
+import logging
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+_sources: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, source: Callable[[], dict]) -> None:
+    """Register (or replace) the snapshot function for *name*."""
+    _sources[name] = source
+
+
+def snapshot() -> dict:
+    """Return {name: snapshot} for every registered source."""
+    result = {}
+    for name, source in list(_sources.items()):
+        try:
+            result[name] = source()
+        except Exception as exc:
+            logger.warning(f"Metrics source '{name}' failed: {exc}")
+            result[name] = {"error": str(exc)}
+    return result
@@ -3,21 +3,50 @@ OAuth2 Username/Password Authentication implementation for HTTPX.
 
 Implements Resource Owner Password Credentials Grant (RFC 6749 Section 4.3)
 for direct authentication using username and password.
+
+Token refreshes are single-flight: concurrent requests that find the token
+expired share one token exchange, even across event loops. A background task
+refreshes the token before it expires (using the refresh_token when the
+server issued one), so auth normally adds no latency to the request path.
+
+When the token storage is shared between worker processes, a refresh first
+takes the storage's refresh lock and adopts a token another worker already
+stored, instead of exchanging the refresh token a second time.
+SharedTokenOAuthClientProvider does the same adoption for the authorization
+code flow.
 """
 
 from collections.abc import AsyncGenerator
+import asyncio
+import concurrent.futures
 import logging
+import threading
 import time
+import weakref
 
 import httpx
 from urllib.parse import urljoin
 
+from mcp.client.auth import OAuthClientProvider
 from mcp.client.auth.oauth2 import TokenStorage, OAuthFlowError
 from mcp.shared.auth import OAuthToken
 from mcp.shared.auth_utils import calculate_token_expiry
 
+from client.http_transport import create_http_client
+from client.token_storage import ExpiringTokenStorage
+
 logger = logging.getLogger(__name__)
 
+# Refresh inline when a request finds the token this close to expiry.
+_INLINE_REFRESH_MARGIN_SECONDS = 60
+# The background task refreshes this long before expiry, ahead of the inline margin.
+_BACKGROUND_REFRESH_MARGIN_SECONDS = 300
+_BACKGROUND_RETRY_SECONDS = 30
+
+
+class _LeaderCancelled(Exception):
+    """The caller running a shared token exchange was cancelled before it finished."""
+
 
 class OAuthPasswordGrantClientProvider(httpx.Auth):
     """
@@ -61,8 +90,15 @@ class OAuthPasswordGrantClientProvider(httpx.Auth):
         self.scope = scope
         self.timeout = timeout
         self._token: OAuthToken | None = None
+        self._token_expiry: float | None = None
         self._initialized = False
         self.visier_tenant_vanity = visier_tenant_vanity
+        # Single-flight state, guarded by a thread lock because httpx may drive
+        # this provider from the main MCP loop and the web server loop at once.
+        self._refresh_lock = threading.Lock()
+        self._inflight: concurrent.futures.Future | None = None
+        # One client per event loop; httpx connections can't cross loops.
+        self._http_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
     async def _get_token_endpoint(self) -> str:
         """Get the token endpoint URL."""
@@ -72,65 +108,182 @@ class OAuthPasswordGrantClientProvider(httpx.Auth):
         base_url = self.server_url.replace("/visier-query-mcp", "")
         return urljoin(base_url + "/", "hr/oauth2/token") # i.e. https://{vanity_name}.app.visier.com/hr/oauth2/token
 
-    async def _exchange_password_for_token(self) -> OAuthToken:
-        """Exchange username/password for access token using password grant."""
+    def _http_client(self) -> httpx.AsyncClient:
+        """Return the pooled token-endpoint client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._http_clients.get(loop)
+        if client is None or client.is_closed:
+            client = create_http_client(timeout=httpx.Timeout(self.timeout, connect=10.0), operation="token")
+            self._http_clients[loop] = client
+        return client
+
+    async def _request_token(self, grant_data: dict) -> OAuthToken:
+        """POST *grant_data* to the token endpoint and parse the token response."""
         token_endpoint = await self._get_token_endpoint()
         token_data = {
-            "grant_type": "password",
-            "username": self.username,
-            "password": self.password,
+            **grant_data,
             "client_id": self.client_id,
             "client_secret": self.client_secret,
             "resource": self.server_url # IMPORTANT: The `resource` param value must be the MCP server URL
         }
 
-        logger.debug(f"Requesting token from {token_endpoint}")
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                token_endpoint,
-                data=token_data,
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded",
-                    "Accept": "application/json",
-                }
-            )
-            
-            if response.status_code != 200:
-                error_details = response.text
-                print("token_endpoint=", token_endpoint)
-                logger.error(f"Token request failed: {response.status_code} - {error_details}")
-                raise OAuthFlowError(f"Token request failed: {response.status_code} - {error_details}")
-            
-            token_data = response.json()
-            logger.debug("Token request successful")
-
-            expires_in = None
-            if "expires_in" in token_data:
-                expires_in = int(calculate_token_expiry(int(token_data["expires_in"])))
-            
-            return OAuthToken(
-                access_token=token_data["access_token"],
-                token_type=token_data.get("token_type", "Bearer"),
-                expires_in=expires_in,
-                refresh_token=token_data.get("refresh_token"),
-                scope=token_data.get("scope")
-            )
+        logger.debug(f"Requesting {grant_data['grant_type']} token from {token_endpoint}")
+
+        response = await self._http_client().post(
+            token_endpoint,
+            data=token_data,
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Accept": "application/json",
+            }
+        )
+
+        if response.status_code != 200:
+            error_details = response.text
+            print("token_endpoint=", token_endpoint)
+            logger.error(f"Token request failed: {response.status_code} - {error_details}")
+            raise OAuthFlowError(f"Token request failed: {response.status_code} - {error_details}")
+
+        token_data = response.json()
+        logger.debug("Token request successful")
+
+        return OAuthToken(
+            access_token=token_data["access_token"],
+            token_type=token_data.get("token_type", "Bearer"),
+            expires_in=int(token_data["expires_in"]) if "expires_in" in token_data else None,
+            refresh_token=token_data.get("refresh_token"),
+            scope=token_data.get("scope")
+        )
+
+    async def _exchange_password_for_token(self) -> OAuthToken:
+        """Exchange username/password for access token using password grant."""
+        return await self._request_token({
+            "grant_type": "password",
+            "username": self.username,
+            "password": self.password,
+        })
+
+    async def _obtain_token(self) -> OAuthToken:
+        """Get a fresh token, preferring a newer stored token, then the refresh_token grant, then the password grant."""
+        if not isinstance(self.storage, ExpiringTokenStorage):
+            return await self._exchange_token()
+        async with self.storage.refresh_lock():
+            stored = await self.storage.get_tokens()
+            if stored and (self._token is None or stored.access_token != self._token.access_token):
+                expiry = await self.storage.get_token_expiry()
+                if expiry is None or expiry - time.time() > _INLINE_REFRESH_MARGIN_SECONDS:
+                    # Another process sharing the storage already refreshed it.
+                    logger.debug("Adopting token refreshed by another process")
+                    self._token = stored
+                    self._token_expiry = expiry
+                    return stored
+            return await self._exchange_token()
+
+    async def _exchange_token(self) -> OAuthToken:
+        token = None
+        if self._token and self._token.refresh_token:
+            try:
+                token = await self._request_token({
+                    "grant_type": "refresh_token",
+                    "refresh_token": self._token.refresh_token,
+                })
+                if not token.refresh_token:
+                    # Servers may omit the refresh token when it is not rotated.
+                    token.refresh_token = self._token.refresh_token
+            except (OAuthFlowError, httpx.HTTPError) as exc:
+                logger.debug(f"Refresh token grant failed, falling back to password grant: {exc}")
+        if token is None:
+            token = await self._exchange_password_for_token()
+
+        self._token = token
+        self._token_expiry = calculate_token_expiry(token.expires_in) if token.expires_in else None
+        await self.storage.set_tokens(token)
+        return token
+
+    async def _single_flight_refresh(self, stale_access_token: str | None = None) -> OAuthToken:
+        """Refresh the token, sharing one in-flight exchange between all concurrent callers.
+
+        Args:
+            stale_access_token: The token the caller found unusable. If another caller
+                has already replaced it, the new token is returned without a request.
+        """
+        while True:
+            with self._refresh_lock:
+                if self._token and stale_access_token and self._token.access_token != stale_access_token:
+                    return self._token
+                future = self._inflight
+                leader = future is None
+                if leader:
+                    future = self._inflight = concurrent.futures.Future()
+
+            if leader:
+                break
+            try:
+                return await asyncio.wrap_future(future)
+            except _LeaderCancelled:
+                # The leader's run was cancelled, not the exchange; try again, possibly as the new leader.
+                continue
+
+        try:
+            token = await self._obtain_token()
+        except BaseException as exc:
+            with self._refresh_lock:
+                self._inflight = None
+            # Only real exchange errors are shared; followers must not die of the leader's cancellation.
+            future.set_exception(exc if isinstance(exc, Exception) else _LeaderCancelled())
+            raise
+        with self._refresh_lock:
+            self._inflight = None
+        future.set_result(token)
+        return token
+
+    def _expires_within(self, seconds: float) -> bool:
+        return self._token_expiry is not None and time.time() + seconds >= self._token_expiry
 
     async def _refresh_token_if_needed(self) -> OAuthToken:
         """Refresh token if it's expired or about to expire."""
-        if not self._token:
-            # Get new token
-            self._token = await self._exchange_password_for_token()
-            await self.storage.set_tokens(self._token)
-            return self._token
-        
-        if self._token.expires_in and (time.time() + 60) >= self._token.expires_in:
-            logger.debug("Token expired or about to expire, getting new token")
-            self._token = await self._exchange_password_for_token()
-            await self.storage.set_tokens(self._token)
-        
-        return self._token
+        token = self._token
+        if token and not self._expires_within(_INLINE_REFRESH_MARGIN_SECONDS):
+            return token
+
+        logger.debug("Token missing, expired or about to expire, getting new token")
+        return await self._single_flight_refresh(token.access_token if token else None)
+
+    async def _background_refresh_loop(self) -> None:
+        while True:
+            if self._token is None:
+                delay = 0.0
+            elif self._token_expiry is None:
+                return  # Token never expires; nothing to refresh.
+            else:
+                # Never aim earlier than half the token lifetime, or short-lived tokens
+                # would be refreshed in a tight loop.
+                margin = min(_BACKGROUND_REFRESH_MARGIN_SECONDS, (self._token.expires_in or 0) / 2)
+                delay = max(0.0, self._token_expiry - time.time() - margin)
+            await asyncio.sleep(delay)
+            try:
+                await self._single_flight_refresh(self._token.access_token if self._token else None)
+                logger.debug("Background token refresh succeeded")
+            except Exception as exc:
+                logger.warning(f"Background token refresh failed, retrying in {_BACKGROUND_RETRY_SECONDS}s: {exc}")
+                await asyncio.sleep(_BACKGROUND_RETRY_SECONDS)
+
+    def start_background_refresh(self) -> asyncio.Task:
+        """Start refreshing the token ahead of expiry on the running event loop.
+
+        Returns the task so the caller can cancel it on shutdown.
+        """
+        async def run() -> None:
+            await self.tokens()
+            await self._background_refresh_loop()
+
+        return asyncio.create_task(run())
+
+    async def aclose(self) -> None:
+        """Close the pooled token-endpoint client for the running event loop."""
+        client = self._http_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
 
     async def async_auth_flow(self, request: httpx.Request) -> AsyncGenerator[httpx.Request, httpx.Response]:
         """Add OAuth2 Bearer token to the request."""
@@ -142,11 +295,10 @@ class OAuthPasswordGrantClientProvider(httpx.Auth):
 
         if response.status_code == 401:
             logger.debug("Received 401, refreshing token and retrying")
-            self._token = await self._exchange_password_for_token()
-            await self.storage.set_tokens(self._token)
-            
-            request.headers["Authorization"] = f"{self._token.token_type} {self._token.access_token}"
-            
+            token = await self._single_flight_refresh(token.access_token)
+
+            request.headers["Authorization"] = f"{token.token_type} {token.access_token}"
+
             yield request
 
     async def tokens(self) -> OAuthToken | None:
@@ -155,5 +307,43 @@ class OAuthPasswordGrantClientProvider(httpx.Auth):
             stored_token = await self.storage.get_tokens()
             if stored_token:
                 self._token = stored_token
+                if isinstance(self.storage, ExpiringTokenStorage):
+                    self._token_expiry = await self.storage.get_token_expiry()
+                else:
+                    # Unknown age: treat as expired so the first request refreshes it.
+                    self._token_expiry = time.time()
             self._initialized = True
-        return self._token
\ No newline at end of file
+        return self._token
+
+class SharedTokenOAuthClientProvider(OAuthClientProvider):
+    """OAuthClientProvider that re-reads shared token storage before refreshing.
+
+    With several worker processes on one token store, the first worker to find
+    the access token expired refreshes it; the others pick the stored result up
+    here instead of spending the (possibly rotated) refresh token again.
+    """
+
+    async def async_auth_flow(self, request: httpx.Request) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        if self._initialized and not self.context.is_token_valid():
+            await self._adopt_stored_token()
+        flow = super().async_auth_flow(request)
+        try:
+            outgoing = await flow.__anext__()
+            while True:
+                response = yield outgoing
+                outgoing = await flow.asend(response)
+        except StopAsyncIteration:
+            return
+
+    async def _adopt_stored_token(self) -> None:
+        storage = self.context.storage
+        stored = await storage.get_tokens()
+        current = self.context.current_tokens
+        if stored is None or (current is not None and stored.access_token == current.access_token):
+            return
+        expiry = await storage.get_token_expiry() if isinstance(storage, ExpiringTokenStorage) else None
+        if expiry is not None and expiry <= time.time():
+            return
+        logger.debug("Adopting token refreshed by another process")
+        self.context.current_tokens = stored
+        self.context.token_expiry_time = expiry
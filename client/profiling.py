@@ -0,0 +1,263 @@
+"""
+On-demand profiling of single agent runs.
+
+A run is profiled when its /ask request carries an `X-Profile: 1` header, or
+for every run while profiling is switched on at POST /profiles/settings (or
+with PROFILING=true). Runs that aren't profiled pay for one flag check.
+
+While a profiled run is in progress, a sampler thread records every
+PROFILE_SAMPLE_INTERVAL_MS:
+
+- the Python stack of every thread, which covers the web event loop
+  (LangGraph nodes, JSON work), the Bedrock executor threads and the main loop
+- the await chain of every asyncio task on the registered loops, which shows
+  where a run is waiting (MCP tool calls, LLM requests, rate limit pacing)
+
+The samples are saved as collapsed stacks (`<run id>.folded`, one
+"frame;frame;frame count" line per stack), the input format of flamegraph.pl,
+speedscope and most other flame graph tools. Every PROFILE_TASK_DUMP_SECONDS
+the sampler also records a dump of all asyncio tasks, saved with the run's
+timings in `<run id>.json`.
+
+The sampler sees the whole process, so runs that overlap a profiled run show
+up in its profile as well.
+"""
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+from collections import Counter
+
+from client import metrics
+
+PROFILING = os.environ.get("PROFILING", "false").lower() == "true"
+PROFILE_DIR = os.path.expanduser(
+    os.environ.get("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "visier-mcp-profiles")
+)
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+PROFILE_TASK_DUMP_SECONDS = float(os.environ.get("PROFILE_TASK_DUMP_SECONDS", "1"))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "600"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "20"))
+
+# loop name -> event loop whose tasks are sampled (see register_loop).
+_loops: dict[str, asyncio.AbstractEventLoop] = {}
+
+
+def register_loop(name: str, loop: asyncio.AbstractEventLoop) -> None:
+    """Include *loop*'s asyncio tasks in profiles (the main loop, the web event loop)."""
+    _loops[name] = loop
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # ";" separates frames in the collapsed format.
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _thread_stack(frame) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _awaited(awaitable):
+    """What *awaitable* is itself waiting on, or None."""
+    if type(awaitable).__name__ in ("async_generator_asend", "async_generator_athrow"):
+        # `async for` over an async generator awaits one of these wrappers, which
+        # don't expose the generator; it is one of their GC referents.
+        return next((r for r in gc.get_referents(awaitable) if isinstance(r, types.AsyncGeneratorType)), None)
+    return (
+        getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        or getattr(awaitable, "ag_await", None)
+    )
+
+
+def _await_chain(task: asyncio.Task) -> list[str]:
+    """Frames of the coroutines (and async generators) *task* is suspended in, outermost first."""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None and len(stack) < 200:
+        frame = (
+            getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+        )
+        if frame is not None:
+            stack.append(_frame_label(frame))
+        awaitable = _awaited(awaitable)
+    return stack
+
+
+def _tasks(loop: asyncio.AbstractEventLoop) -> list[asyncio.Task]:
+    # Read from the sampler thread; the task set may change under us, so retry a few times.
+    for _ in range(5):
+        try:
+            return [t for t in asyncio.all_tasks(loop) if not t.done()]
+        except RuntimeError:
+            continue
+    return []
+
+
+def _task_name(task: asyncio.Task) -> str:
+    return task.get_name().replace(";", ":")
+
+
+class RunProfiler:
+    """Samples the process from its own thread until stop() and saves the result."""
+
+    def __init__(self, run_id: str, question: str):
+        self.run_id = run_id
+        self.question = question
+        self._samples: Counter[str] = Counter()
+        self._task_dumps: list[dict] = []
+        self._stop = threading.Event()
+        self._started_at = time.time()
+        self._sample_count = 0
+        self._saved = False
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{run_id}", daemon=True)
+
+    def start(self) -> "RunProfiler":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+        next_dump = 0.0
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            self._sample()
+            if time.monotonic() >= next_dump:
+                self._task_dumps.append(self._task_dump())
+                next_dump = time.monotonic() + PROFILE_TASK_DUMP_SECONDS
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                thread = names.get(ident, str(ident)).replace(";", ":")
+                self._samples[";".join([f"thread:{thread}", *_thread_stack(frame)])] += 1
+        for loop_name, loop in list(_loops.items()):
+            for task in _tasks(loop):
+                self._samples[";".join([f"asyncio:{loop_name}", f"task:{_task_name(task)}", *_await_chain(task)])] += 1
+        self._sample_count += 1
+
+    def _task_dump(self) -> dict:
+        return {
+            "at": round(time.time() - self._started_at, 3),
+            "tasks": [
+                {"loop": loop_name, "name": task.get_name(), "stack": _await_chain(task)}
+                for loop_name, loop in list(_loops.items())
+                for task in _tasks(loop)
+            ],
+        }
+
+    def stop(self) -> str:
+        """Stop sampling, write the profile files and return the run id. Later calls only return the id."""
+        if self._saved:
+            return self.run_id
+        self._saved = True
+        self._stop.set()
+        self._thread.join()
+        self._task_dumps.append(self._task_dump())
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, f"{self.run_id}.folded"), "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self._samples.most_common())
+        summary = {
+            "run_id": self.run_id,
+            "question": self.question,
+            "started_at": self._started_at,
+            "duration_seconds": round(time.time() - self._started_at, 3),
+            "sample_interval_ms": PROFILE_SAMPLE_INTERVAL_MS,
+            "samples": self._sample_count,
+            "task_dumps": self._task_dumps,
+        }
+        with open(os.path.join(PROFILE_DIR, f"{self.run_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, default=str)
+        profile_stats.record_capture()
+        _prune()
+        return self.run_id
+
+
+def _prune() -> None:
+    """Keep the newest PROFILE_KEEP profiles."""
+    runs = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in runs[PROFILE_KEEP:]:
+        run_id = entry.name[:-len(".json")]
+        for suffix in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, run_id + suffix))
+            except OSError:
+                pass
+
+
+def start_profile(question: str, requested: bool = False) -> RunProfiler | None:
+    """Start profiling a run if it was requested or profiling is switched on; else None."""
+    if not (requested or profile_stats.enabled):
+        return None
+    return RunProfiler(uuid.uuid4().hex[:12], question).start()
+
+
+def list_profiles() -> list[dict]:
+    """Saved profiles, newest first, without their task dumps."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path, encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summary.pop("task_dumps", None)
+        profiles.append(summary)
+    return sorted(profiles, key=lambda p: p.get("started_at", 0), reverse=True)
+
+
+def profile_path(file_name: str) -> str | None:
+    """Path of a saved profile file ("<run id>.folded" or "<run id>.json"), or None."""
+    run_id, dot, suffix = file_name.rpartition(".")
+    if not dot or suffix not in ("folded", "json") or not run_id.isalnum():
+        return None
+    path = os.path.join(PROFILE_DIR, file_name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfileStats:
+    """The admin toggle and capture counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = PROFILING
+        self._captured = 0
+
+    def set_enabled(self, enabled: bool) -> None:
+        with self._lock:
+            self.enabled = enabled
+
+    def record_capture(self) -> None:
+        with self._lock:
+            self._captured += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "captured": self._captured, "directory": PROFILE_DIR}
+
+
+profile_stats = ProfileStats()
+
+metrics.register("profiling", profile_stats.snapshot)
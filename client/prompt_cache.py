@@ -0,0 +1,142 @@
+"""
+Cache of rendered MCP prompts.
+
+Prompt templates rarely change, so a prompt rendered for a given set of
+arguments is kept for MCP_PROMPT_CACHE_TTL_SECONDS, up to
+MCP_PROMPT_CACHE_MAX_ENTRIES entries (least recently used evicted first).
+MCPClientBackend clears it when the server sends prompts/list_changed.
+
+Given a SharedStore, the cache also writes rendered prompts there and reads
+them back on a local miss, so the workers of a multi-process deployment render
+each prompt once between them. Each cache has a scope (the MCP server URL and,
+for a tenant backend, its pool): shared entries live in a per-scope namespace,
+so tenants never read each other's prompts and clear() drops only its own.
+
+Live caches are listed per scope under `prompt_cache` at /metrics.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from client import metrics
+from client.shared_store import SharedStore
+
+MCP_PROMPT_CACHE_TTL_SECONDS = float(os.environ.get("MCP_PROMPT_CACHE_TTL_SECONDS", "3600"))
+MCP_PROMPT_CACHE_MAX_ENTRIES = int(os.environ.get("MCP_PROMPT_CACHE_MAX_ENTRIES", "128"))
+
+# Scope -> live cache; a backend's cache drops out when the backend is collected.
+_caches: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def prompt_cache_key(name: str, arguments: dict[str, str] | None) -> tuple[str, str]:
+    """Return (name, canonical JSON of arguments); None and {} map to the same key."""
+    return name, json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"))
+
+
+class PromptCache:
+    """Thread-safe TTL + LRU cache of rendered prompt messages."""
+
+    def __init__(
+        self,
+        scope: str,
+        ttl: float = MCP_PROMPT_CACHE_TTL_SECONDS,
+        max_entries: int = MCP_PROMPT_CACHE_MAX_ENTRIES,
+        store: SharedStore | None = None,
+    ):
+        self.scope = scope
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._store = store
+        self._shared_hits = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[str]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        # Bumped by clear(), so a fetch that started before an invalidation is not cached.
+        self._generation = 0
+        self._store_namespace = f"prompts:{scope}"
+        _caches[scope] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_entries > 0
+
+    def get(self, name: str, arguments: dict[str, str] | None) -> list[str] | None:
+        """Return the cached messages, or None if missing or expired."""
+        key = prompt_cache_key(name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+        shared = self._store.get(self._store_namespace, json.dumps(key)) if self._store and self.enabled else None
+        with self._lock:
+            if shared is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._shared_hits += 1
+            self._insert(key, shared)
+            return list(shared)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def put(
+        self, name: str, arguments: dict[str, str] | None, messages: list[str], generation: int | None = None
+    ) -> None:
+        """Store rendered messages; skipped if *generation* predates the last clear()."""
+        if not self.enabled:
+            return
+        key = prompt_cache_key(name, arguments)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._insert(key, messages)
+        if self._store is not None:
+            self._store.set(self._store_namespace, json.dumps(key), list(messages), ttl=self._ttl)
+
+    def _insert(self, key: tuple[str, str], messages: list[str]) -> None:
+        # Caller holds the lock.
+        self._entries[key] = (time.monotonic() + self._ttl, list(messages))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+            self._generation += 1
+        if self._store is not None:
+            self._store.clear(self._store_namespace)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "shared_hits": self._shared_hits,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+def _snapshot() -> dict:
+    return {scope: cache.snapshot() for scope, cache in list(_caches.items())}
+
+
+metrics.register("prompt_cache", _snapshot)
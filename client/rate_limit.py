@@ -0,0 +1,366 @@
+"""
+Client-side rate limiting for LLM and MCP calls.
+
+Every LLM attempt and MCP tool call takes a token from one or more shared
+token buckets before it is sent:
+
+- LLM providers: one requests-per-second bucket and one tokens-per-minute
+  bucket per provider (the router's provider names, e.g.
+  "bedrock:us-west-2:<model>"). A call reserves its estimated input tokens
+  and the estimate is corrected with the usage the provider reports.
+- MCP: one bucket per server plus one per tool (see client/tool_calls.py).
+
+Buckets are shared by every run in the process and are safe to use from any
+thread or event loop: a reservation only computes how long the caller has to
+wait, and the caller sleeps on its own loop.
+
+Rates adapt to throttling (AIMD): a throttled call halves the bucket's rate,
+and each successful call adds back a twentieth of the ceiling. A bucket with
+no configured limit starts unlimited; when it is first throttled its ceiling
+becomes the rate it was running at, and the limit is lifted again once it has
+run at that ceiling for a minute without being throttled. Throttled calls are
+retried with jittered exponential backoff by retry_throttled().
+"""
+import asyncio
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from client import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _parse_limits(value: str) -> dict[str, float]:
+    """Parse "name=rate,name2=rate" into {name: rate}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.rpartition("=")
+        if not name:
+            raise ValueError(f"Invalid rate limit '{item}', expected name=rate")
+        limits[name.strip()] = float(rate)
+    return limits
+
+
+# 0 means no configured limit (the bucket still adapts when throttled).
+LLM_RATE_LIMIT_RPS = float(os.environ.get("LLM_RATE_LIMIT_RPS", "0"))
+LLM_RATE_LIMIT_TOKENS_PER_MINUTE = float(os.environ.get("LLM_RATE_LIMIT_TOKENS_PER_MINUTE", "0"))
+# Per-provider requests per second, e.g. "bedrock:us-west-2:anthropic.claude-3-5-sonnet-20241022-v2:0=2".
+LLM_PROVIDER_RATE_LIMITS = _parse_limits(os.environ.get("LLM_PROVIDER_RATE_LIMITS", ""))
+MCP_RATE_LIMIT_RPS = float(os.environ.get("MCP_RATE_LIMIT_RPS", "0"))
+# Per-tool requests per second, e.g. "ask_vee_question=1,search_metrics=5".
+MCP_TOOL_RATE_LIMITS = _parse_limits(os.environ.get("MCP_TOOL_RATE_LIMITS", ""))
+RATE_LIMIT_MAX_RETRIES = int(os.environ.get("RATE_LIMIT_MAX_RETRIES", "4"))
+RATE_LIMIT_BACKOFF_SECONDS = float(os.environ.get("RATE_LIMIT_BACKOFF_SECONDS", "1"))
+RATE_LIMIT_MAX_BACKOFF_SECONDS = float(os.environ.get("RATE_LIMIT_MAX_BACKOFF_SECONDS", "30"))
+
+_DECREASE_FACTOR = 0.5
+# Additive increase per successful call, as a fraction of the ceiling.
+_INCREASE_FRACTION = 0.05
+# A throttled bucket never drops below this fraction of its ceiling.
+_MIN_RATE_FRACTION = 0.05
+_MIN_ADAPTIVE_RATE = 0.1
+# An adaptive (unconfigured) limit is lifted after this long at its ceiling without throttling.
+_ADAPTIVE_RESET_SECONDS = 60.0
+# Window used to measure the rate an unconfigured bucket was running at when throttled.
+_OBSERVED_WINDOW_SECONDS = 10.0
+
+# Error codes and exception names that mean the server is rate limiting us.
+_THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException"}
+# Text fallback for errors that only carry a message: 429 only as a status, and
+# "rate limit" only when it says the limit was hit, so row counts, IDs and
+# messages that merely mention rate limits don't count.
+_THROTTLING_PATTERN = re.compile(
+    r"\b(?:status|http|code|error)\D{0,10}429\b"
+    r"|\btoo many requests\b"
+    r"|\brate[ _-]?limit(?:ed\b|ing\b|s? (?:exceeded|reached|hit)\b)"
+    r"|\bthrottl(?:ed|ing)",
+    re.IGNORECASE,
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket with AIMD rate adaptation.
+
+    A reservation may take the bucket below zero; the caller then waits until
+    the deficit has refilled, so concurrent callers queue up in order.
+    """
+
+    def __init__(self, name: str, rate: float | None, capacity: float | None = None, unit: str = "requests"):
+        self.name = name
+        self.unit = unit
+        self.limit = rate or None  # configured rate per second, None if unlimited
+        self.rate = self.limit  # current (adapted) rate
+        self._ceiling = self.limit
+        self._capacity = capacity
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._last_throttled = 0.0
+        self._recent: deque[float] = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self.reserved = 0.0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.throttled = 0
+
+    @property
+    def capacity(self) -> float:
+        if self._capacity is not None:
+            return self._capacity
+        return max(1.0, self.rate or 1.0)
+
+    def _refill(self, now: float) -> None:
+        if self.rate is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take *amount* tokens and return how many seconds the caller must wait first."""
+        with self._lock:
+            now = time.monotonic()
+            self._recent.append(now)
+            self.reserved += amount
+            self._maybe_lift_limit(now)
+            if self.rate is None:
+                return 0.0
+            self._refill(now)
+            self._tokens -= amount
+            delay = max(0.0, -self._tokens / self.rate)
+            if delay > 0:
+                self.waits += 1
+                self.wait_seconds += delay
+                self.max_wait_seconds = max(self.max_wait_seconds, delay)
+            return delay
+
+    def adjust(self, amount: float) -> None:
+        """Take *amount* more tokens (or return them if negative) without waiting."""
+        with self._lock:
+            self.reserved += amount
+            if self.rate is not None:
+                self._refill(time.monotonic())
+                self._tokens = min(self.capacity, self._tokens - amount)
+
+    def on_throttled(self) -> None:
+        """Multiplicative decrease after the server throttled a call."""
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            self._last_throttled = now
+            if self.rate is None:
+                if self.unit != "requests":
+                    return  # Unknown token rate; the request bucket adapts instead.
+                self._ceiling = self._observed_rate(now)
+                self.rate = self._ceiling
+                self._tokens = 0.0
+                self._updated = now
+            self._refill(now)
+            self.rate = max(self._ceiling * _MIN_RATE_FRACTION, self.rate * _DECREASE_FACTOR)
+            # Drop the burst allowance so the next calls are paced right away.
+            self._tokens = min(self._tokens, 0.0)
+            logger.info(f"Rate limit {self.name} throttled, pacing at {self.rate:.2f} {self.unit}/s")
+
+    def on_success(self) -> None:
+        """Additive increase after a call went through."""
+        with self._lock:
+            if self.rate is not None and self._ceiling is not None and self.rate < self._ceiling:
+                self._refill(time.monotonic())
+                self.rate = min(self._ceiling, self.rate + self._ceiling * _INCREASE_FRACTION)
+
+    def _observed_rate(self, now: float) -> float:
+        recent = [t for t in self._recent if now - t <= _OBSERVED_WINDOW_SECONDS]
+        span = max(1.0, now - recent[0]) if recent else _OBSERVED_WINDOW_SECONDS
+        return max(_MIN_ADAPTIVE_RATE, len(recent) / span)
+
+    def _maybe_lift_limit(self, now: float) -> None:
+        # Caller holds the lock.
+        if (
+            self.limit is None and self.rate is not None and self.rate >= self._ceiling
+            and now - self._last_throttled > _ADAPTIVE_RESET_SECONDS
+        ):
+            self.rate = self._ceiling = None
+            logger.info(f"Rate limit {self.name} lifted after {_ADAPTIVE_RESET_SECONDS:.0f}s without throttling")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "unit": self.unit,
+                "limit_per_s": self.limit,
+                "rate_per_s": round(self.rate, 3) if self.rate is not None else None,
+                "available": round(self._tokens, 1) if self.rate is not None else None,
+                "reserved": round(self.reserved),
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+                "throttled": self.throttled,
+            }
+
+
+class RateLimiter:
+    """Named token buckets, created on first use and shared process-wide."""
+
+    def __init__(self):
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str, rate: float | None, capacity: float | None = None, unit: str = "requests") -> TokenBucket:
+        """Return the bucket *name*, creating it with *rate* per second if it does not exist yet."""
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                bucket = self._buckets[name] = TokenBucket(name, rate, capacity, unit)
+            return bucket
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = list(self._buckets.items())
+        return {name: bucket.snapshot() for name, bucket in sorted(buckets)}
+
+
+llm_limiter = RateLimiter()
+mcp_limiter = RateLimiter()
+
+_counters_lock = threading.Lock()
+_retry_counters = {"retries": 0, "retry_wait_seconds": 0.0, "gave_up": 0}
+
+
+def llm_buckets(provider: str) -> list[TokenBucket]:
+    """The request and token buckets of an LLM provider."""
+    buckets = [llm_limiter.bucket(provider, LLM_PROVIDER_RATE_LIMITS.get(provider, LLM_RATE_LIMIT_RPS))]
+    if LLM_RATE_LIMIT_TOKENS_PER_MINUTE > 0:
+        # A full minute of burst, matching how providers account per-minute quotas.
+        buckets.append(llm_limiter.bucket(
+            f"{provider}#tokens", LLM_RATE_LIMIT_TOKENS_PER_MINUTE / 60,
+            capacity=LLM_RATE_LIMIT_TOKENS_PER_MINUTE, unit="tokens",
+        ))
+    return buckets
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for *text* (about four characters per token), for token bucket reservations."""
+    return len(text) // 4 + 1
+
+
+def is_throttling_error(exc: BaseException) -> bool:
+    """Return True if *exc* says the server is rate limiting us (429, ThrottlingException, ...)."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError
+        if (response.get("Error") or {}).get("Code") in _THROTTLING_ERROR_CODES:
+            return True
+        if (response.get("ResponseMetadata") or {}).get("HTTPStatusCode") == 429:
+            return True
+    status = getattr(exc, "status_code", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if status == 429:
+        return True
+    name = type(exc).__name__
+    if "Throttl" in name or "RateLimit" in name:
+        return True
+    # McpError and exception groups only carry the status in their message.
+    return is_throttling_message(str(exc))
+
+
+def is_throttling_message(text: str) -> bool:
+    """Return True if an error message or tool error result reports rate limiting."""
+    return _THROTTLING_PATTERN.search(text[:500]) is not None
+
+
+class Throttled(Exception):
+    """Raised by limited() when a call returned a result that reports throttling."""
+
+    def __init__(self, result):
+        super().__init__("Throttled by the server")
+        self.result = result
+
+
+async def limited(
+    buckets: list[TokenBucket],
+    factory: Callable[[], Awaitable[T]],
+    tokens: int = 0,
+    usage: Callable[[T], int | None] | None = None,
+    is_throttled_result: Callable[[T], bool] | None = None,
+) -> T:
+    """Run one call through *buckets*: wait for capacity, call, and feed the outcome back.
+
+    Args:
+        buckets: Buckets to take from. Request buckets take 1, token buckets take *tokens*.
+        factory: Zero-arg coroutine factory making the call.
+        tokens: Estimated tokens for token buckets.
+        usage: Returns the actual tokens used from the result, to correct the estimate.
+        is_throttled_result: Returns True if a result (rather than an exception) reports throttling.
+    """
+    delay = max((b.reserve(tokens if b.unit == "tokens" else 1) for b in buckets), default=0.0)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    try:
+        result = await factory()
+    except Exception as exc:
+        if is_throttling_error(exc):
+            for bucket in buckets:
+                bucket.on_throttled()
+        raise
+    if is_throttled_result is not None and is_throttled_result(result):
+        for bucket in buckets:
+            bucket.on_throttled()
+        raise Throttled(result)
+    actual = usage(result) if usage is not None else None
+    for bucket in buckets:
+        bucket.on_success()
+        if bucket.unit == "tokens" and actual is not None:
+            bucket.adjust(actual - tokens)
+    return result
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(RATE_LIMIT_MAX_BACKOFF_SECONDS, RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt))
+
+
+async def retry_throttled(factory: Callable[[], Awaitable[T]], attempts: int = RATE_LIMIT_MAX_RETRIES + 1) -> T:
+    """Await *factory()*, retrying with jittered exponential backoff while the server throttles it.
+
+    A Throttled result that is still throttled on the last attempt is returned as is.
+    """
+    for attempt in range(attempts):
+        try:
+            return await factory()
+        except Throttled as exc:
+            if attempt == attempts - 1:
+                _bump("gave_up")
+                return exc.result
+        except Exception as exc:
+            if not is_throttling_error(exc):
+                raise
+            if attempt == attempts - 1:
+                _bump("gave_up")
+                raise
+        delay = _backoff(attempt)
+        logger.info(f"Throttled, retrying in {delay:.2f}s (attempt {attempt + 2}/{attempts})")
+        _bump("retries")
+        _bump("retry_wait_seconds", delay)
+        await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _bump(counter: str, amount: float = 1) -> None:
+    with _counters_lock:
+        _retry_counters[counter] += amount
+
+
+def _snapshot() -> dict:
+    with _counters_lock:
+        counters = {k: round(v, 3) for k, v in _retry_counters.items()}
+    return {**counters, "llm": llm_limiter.snapshot(), "mcp": mcp_limiter.snapshot()}
+
+
+metrics.register("rate_limits", _snapshot)
@@ -0,0 +1,143 @@
+"""
+SQLite-backed store shared by every process of a deployment.
+
+In supervisor mode (VISIER_WORKERS > 1) each worker keeps its own MCP
+sessions, but OAuth tokens, the tool/prompt catalog, rendered prompts and
+worker heartbeats live here so that one worker's refresh or fetch is
+immediately visible to the others. The supervisor points every worker at the
+same file through VISIER_SHARED_STORE_PATH; a single process can use it too.
+
+Values are JSON, grouped by namespace, with an optional TTL. The database runs
+in WAL mode so readers never block the writer, and every thread gets its own
+connection.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+VISIER_SHARED_STORE_PATH = os.environ.get("VISIER_SHARED_STORE_PATH")
+
+_LEASE_NAMESPACE = "_lease"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SharedStore:
+    """Namespaced key/value store in one SQLite file, safe across threads and processes."""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = os.path.expanduser(path)
+        self._busy_timeout = busy_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; multi-statement updates open their own transaction.
+            conn = sqlite3.connect(self.path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Return the value stored under (namespace, key), or *default* if missing or expired."""
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None = None) -> None:
+        """Store a JSON-serializable *value*; it expires after *ttl* seconds if given."""
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, default=str), now + ttl if ttl else None, now),
+        )
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: str) -> None:
+        """Delete every key in *namespace*."""
+        self._conn().execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+
+    def items(self, namespace: str) -> dict[str, Any]:
+        """Return {key: value} for the unexpired keys in *namespace*."""
+        rows = self._conn().execute(
+            "SELECT key, value FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, time.time()),
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        return self._conn().execute(
+            "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        ).rowcount
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take (or renew) the lease *name* for *owner* unless another owner holds an unexpired one."""
+        conn = self._conn()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?", (_LEASE_NAMESPACE, name)
+            ).fetchone()
+            if row is not None and json.loads(row[0]) != owner and row[1] >= now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (_LEASE_NAMESPACE, name, json.dumps(owner), now + ttl, now),
+            )
+            conn.execute("COMMIT")
+            return True
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def release_lease(self, name: str, owner: str) -> None:
+        """Release *name* if *owner* still holds it."""
+        self._conn().execute(
+            "DELETE FROM kv WHERE namespace = ? AND key = ? AND value = ?",
+            (_LEASE_NAMESPACE, name, json.dumps(owner)),
+        )
+
+
+_store: SharedStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> SharedStore | None:
+    """Return the process-wide SharedStore, or None if VISIER_SHARED_STORE_PATH is not set."""
+    global _store
+    if not VISIER_SHARED_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SharedStore(VISIER_SHARED_STORE_PATH)
+            logger.info(f"Using shared store {_store.path}")
+        return _store
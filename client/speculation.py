@@ -0,0 +1,179 @@
+"""
+Speculative first tool call.
+
+The system prompt tells the agent to answer data questions by calling
+ask_vee_question with the user's question, and for most questions that is
+exactly its first move. With SPECULATIVE_TOOL_CALLS=true the agent backends
+start that call when the run starts, so it overlaps with the first LLM turn.
+
+The speculation is tied to the run through a ContextVar. When the model asks
+for a tool call, ToolCallGuard (client/tool_calls.py) claims the speculation
+if the tool and arguments match and returns its result, whether it is still
+in flight or already finished. A speculation that is never claimed is
+cancelled, and its result discarded, when the run ends.
+
+Hit rate and the latency saved are reported under "speculation" at /metrics.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from client import metrics
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_TOOL_CALLS = os.environ.get("SPECULATIVE_TOOL_CALLS", "false").lower() == "true"
+SPECULATIVE_TOOL_NAME = os.environ.get("SPECULATIVE_TOOL_NAME", "ask_vee_question")
+SPECULATIVE_TOOL_ARGUMENT = os.environ.get("SPECULATIVE_TOOL_ARGUMENT", "question")
+
+_current: contextvars.ContextVar["Speculation | None"] = contextvars.ContextVar("speculative_tool_call", default=None)
+
+
+def _normalize(value: Any) -> str:
+    """Case, whitespace and trailing punctuation don't change what the tool answers."""
+    return " ".join(str(value).casefold().split()).rstrip("?.! ")
+
+
+class Speculation:
+    """One predicted tool call started ahead of the model's request."""
+
+    def __init__(self, owner: object, name: str, args: dict, task: asyncio.Task):
+        self.owner = owner
+        self.name = name
+        self.args = args
+        self.task = task
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.claimed = False
+        self.closed = False
+        self._saved = 0.0
+        self._token: contextvars.Token | None = None
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self.finished_at = time.perf_counter()
+        if not task.cancelled() and task.exception() is not None:
+            logger.info(f"Speculative {self.name} call failed: {task.exception()}")
+
+    def matches(self, name: str, args: dict) -> bool:
+        if name != self.name or set(args) != set(self.args):
+            return False
+        return all(_normalize(args[k]) == _normalize(v) for k, v in self.args.items())
+
+    async def result(self) -> Any:
+        """Await the claimed call; shielded so a cancelled caller doesn't cancel it twice.
+
+        Counts as a hit only once the result is in; a failed (or abandoned)
+        speculation is a miss, since the real call has to be made after all.
+        """
+        try:
+            result = await asyncio.shield(self.task)
+        except BaseException:
+            speculation_stats.record_miss((self.finished_at or time.perf_counter()) - self.started_at)
+            raise
+        speculation_stats.record_hit(self._saved)
+        return result
+
+    def close(self) -> None:
+        """End of the run: cancel the call if the model never asked for it."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                pass  # The run's generator was closed from another context.
+        if not self.claimed:
+            wasted = (self.finished_at or time.perf_counter()) - self.started_at
+            self.task.cancel()
+            speculation_stats.record_miss(wasted)
+
+
+def start_speculation(
+    owner: object, question: str, tool_names: set[str], call: Callable[[str, dict], Awaitable[Any]]
+) -> Speculation | None:
+    """Start the predicted tool call for *question* and bind it to the current run.
+
+    Returns None when speculation is disabled or the tool is not in the catalog.
+    """
+    if not SPECULATIVE_TOOL_CALLS or SPECULATIVE_TOOL_NAME not in tool_names or not question.strip():
+        return None
+    args = {SPECULATIVE_TOOL_ARGUMENT: question}
+    # Created before the ContextVar is set, so the call itself can't claim its own speculation.
+    task = asyncio.ensure_future(call(SPECULATIVE_TOOL_NAME, args))
+    speculation = Speculation(owner, SPECULATIVE_TOOL_NAME, args, task)
+    speculation._token = _current.set(speculation)
+    speculation_stats.record_start()
+    return speculation
+
+
+def claim(owner: object, name: str, args: dict) -> Speculation | None:
+    """Return the current run's speculation if it is for this call and not used yet."""
+    speculation = _current.get()
+    if speculation is None or speculation.owner is not owner or speculation.claimed or speculation.closed:
+        return None
+    if not speculation.matches(name, args):
+        if name == speculation.name:
+            speculation_stats.record_mismatch()
+        return None
+    speculation.claimed = True
+    # Time the call had already been running (or took in full) when the model asked for it.
+    speculation._saved = (speculation.finished_at or time.perf_counter()) - speculation.started_at
+    return speculation
+
+
+class SpeculationStats:
+    """Thread-safe counters for speculative tool calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"started": 0, "hits": 0, "misses": 0, "mismatched_args": 0, "failed": 0}
+        self._saved_seconds = 0.0
+        self._wasted_seconds = 0.0
+
+    def record_start(self) -> None:
+        with self._lock:
+            self._counts["started"] += 1
+
+    def record_hit(self, saved: float) -> None:
+        with self._lock:
+            self._counts["hits"] += 1
+            self._saved_seconds += saved
+
+    def record_miss(self, wasted: float) -> None:
+        with self._lock:
+            self._counts["misses"] += 1
+            self._wasted_seconds += wasted
+
+    def record_mismatch(self) -> None:
+        with self._lock:
+            self._counts["mismatched_args"] += 1
+
+    def record_failed(self) -> None:
+        with self._lock:
+            self._counts["failed"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            hits = counts["hits"]
+            return {
+                "enabled": SPECULATIVE_TOOL_CALLS,
+                "tool": SPECULATIVE_TOOL_NAME,
+                **counts,
+                "hit_rate": round(hits / counts["started"], 3) if counts["started"] else None,
+                "saved_seconds": round(self._saved_seconds, 3),
+                "mean_saved_seconds": round(self._saved_seconds / hits, 3) if hits else None,
+                "wasted_seconds": round(self._wasted_seconds, 3),
+            }
+
+
+speculation_stats = SpeculationStats()
+
+metrics.register("speculation", speculation_stats.snapshot)
@@ -0,0 +1,239 @@
+"""
+Multi-process deployment mode.
+
+With VISIER_WORKERS > 1, main.py runs this supervisor instead of the app. It
+starts that many worker processes (each a normal `main.py` run with its own MCP
+sessions and agent) that all bind the web UI port with SO_REUSEPORT, so the
+kernel spreads connections across them.
+
+Workers share OAuth tokens, the tool/prompt catalog and rendered prompts
+through the SQLite SharedStore at VISIER_SHARED_STORE_PATH, and write a
+heartbeat there every VISIER_WORKER_HEARTBEAT_SECONDS. The supervisor restarts
+a worker that exits, stops heartbeating for VISIER_WORKER_HEARTBEAT_TIMEOUT_SECONDS
+or reports its web server thread dead, backing off on repeated failures.
+
+With the browser (authorization code) flow, worker 0 starts first and the rest
+wait until it is ready, so only one browser login is needed; the others pick
+the token up from the store.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from client.shared_store import SharedStore
+
+logger = logging.getLogger(__name__)
+
+VISIER_WORKERS = int(os.environ.get("VISIER_WORKERS", "1"))
+VISIER_WORKER_HEARTBEAT_SECONDS = float(os.environ.get("VISIER_WORKER_HEARTBEAT_SECONDS", "2"))
+VISIER_WORKER_HEARTBEAT_TIMEOUT_SECONDS = float(os.environ.get("VISIER_WORKER_HEARTBEAT_TIMEOUT_SECONDS", "20"))
+VISIER_WORKER_STARTUP_TIMEOUT_SECONDS = float(os.environ.get("VISIER_WORKER_STARTUP_TIMEOUT_SECONDS", "300"))
+DEFAULT_SHARED_STORE_PATH = "~/.cache/visier-mcp-client/shared.sqlite3"
+
+_HEARTBEAT_NAMESPACE = "workers"
+_SUPERVISOR_NAMESPACE = "supervisor"
+_MAX_RESTART_BACKOFF_SECONDS = 30.0
+_MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+@dataclass
+class WorkerProcess:
+    """Supervisor-side state of one worker slot."""
+    worker_id: int
+    process: subprocess.Popen | None = None
+    started_at: float = 0.0
+    launches: int = 0
+    restarts: int = 0
+    # Failures since the worker last reported ready; drives the restart backoff.
+    failures: int = 0
+    next_start_at: float = 0.0
+    last_restart_reason: str | None = None
+
+
+class Supervisor:
+    """Starts, watches and restarts the worker processes."""
+
+    def __init__(self, workers: int, store: SharedStore, command: list[str] | None = None):
+        self._store = store
+        self._command = command or [sys.executable, _MAIN_SCRIPT]
+        self._workers = [WorkerProcess(worker_id=i) for i in range(workers)]
+        self._stopping = False
+
+    def run(self) -> int:
+        """Run until SIGINT/SIGTERM; returns the process exit code."""
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        self._store.clear(_HEARTBEAT_NAMESPACE)
+        print(f"Supervisor starting {len(self._workers)} workers (shared store: {self._store.path})")
+
+        primary, others = self._workers[0], self._workers[1:]
+        self._spawn(primary)
+        if not _uses_password_grant():
+            # Let worker 0 run the browser login before the others look for a token.
+            self._wait_until_ready(primary)
+        for worker in others:
+            self._spawn(worker)
+
+        while not self._stopping:
+            for worker in self._workers:
+                self._check(worker)
+            self._publish()
+            time.sleep(VISIER_WORKER_HEARTBEAT_SECONDS)
+
+        self._shutdown()
+        return 0
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _spawn(self, worker: WorkerProcess) -> None:
+        env = dict(os.environ)
+        env.update({
+            "VISIER_WORKER_ID": str(worker.worker_id),
+            "VISIER_SHARED_STORE_PATH": self._store.path,
+            "VISIER_SUPERVISOR_PID": str(os.getpid()),
+        })
+        if worker.worker_id != 0 or worker.launches > 0:
+            env["VISIER_OPEN_UI"] = "false"
+        worker.process = subprocess.Popen(self._command, env=env)
+        worker.started_at = time.time()
+        worker.launches += 1
+        print(f"Started worker {worker.worker_id} (pid {worker.process.pid})")
+
+    def _wait_until_ready(self, worker: WorkerProcess) -> None:
+        deadline = time.time() + VISIER_WORKER_STARTUP_TIMEOUT_SECONDS
+        while not self._stopping and time.time() < deadline:
+            heartbeat = self._heartbeat(worker)
+            if heartbeat and heartbeat.get("state") == "ready":
+                return
+            if worker.process.poll() is not None:
+                return
+            time.sleep(0.5)
+
+    def _heartbeat(self, worker: WorkerProcess) -> dict | None:
+        heartbeat = self._store.get(_HEARTBEAT_NAMESPACE, str(worker.worker_id))
+        # Ignore a heartbeat left behind by a previous process in this slot.
+        if heartbeat and worker.process is not None and heartbeat.get("pid") == worker.process.pid:
+            return heartbeat
+        return None
+
+    def _unhealthy_reason(self, worker: WorkerProcess) -> str | None:
+        code = worker.process.poll()
+        if code is not None:
+            return f"exited with code {code}"
+        heartbeat = self._heartbeat(worker)
+        last_seen = max(worker.started_at, heartbeat["at"]) if heartbeat else worker.started_at
+        if time.time() - last_seen > VISIER_WORKER_HEARTBEAT_TIMEOUT_SECONDS:
+            return f"no heartbeat for {time.time() - last_seen:.0f}s"
+        if heartbeat and not heartbeat.get("ui_alive", True):
+            return "web server thread died"
+        if heartbeat and heartbeat.get("state") == "ready":
+            worker.failures = 0
+        return None
+
+    def _check(self, worker: WorkerProcess) -> None:
+        if worker.process is None:
+            if time.time() >= worker.next_start_at:
+                self._spawn(worker)
+            return
+        reason = self._unhealthy_reason(worker)
+        if reason is None:
+            return
+        print(f"Worker {worker.worker_id} (pid {worker.process.pid}) is unhealthy: {reason}; restarting")
+        self._terminate(worker.process)
+        worker.process = None
+        worker.restarts += 1
+        worker.failures += 1
+        worker.last_restart_reason = reason
+        worker.next_start_at = time.time() + min(_MAX_RESTART_BACKOFF_SECONDS, 2 ** (worker.failures - 1))
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen, timeout: float = 10.0) -> None:
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def _publish(self) -> None:
+        self._store.set(_SUPERVISOR_NAMESPACE, "state", {
+            "pid": os.getpid(),
+            "at": time.time(),
+            "workers": {
+                str(w.worker_id): {
+                    "pid": w.process.pid if w.process else None,
+                    "restarts": w.restarts,
+                    "last_restart_reason": w.last_restart_reason,
+                }
+                for w in self._workers
+            },
+        })
+
+    def _shutdown(self) -> None:
+        print("\nSupervisor stopping workers...")
+        for worker in self._workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.terminate()
+        for worker in self._workers:
+            if worker.process is not None:
+                self._terminate(worker.process)
+
+
+def _uses_password_grant() -> bool:
+    return bool(os.environ.get("VISIER_USERNAME") and os.environ.get("VISIER_PASSWORD"))
+
+
+def run_supervisor(workers: int = VISIER_WORKERS) -> int:
+    """Run the supervisor for *workers* processes; used by main.py when VISIER_WORKERS > 1."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("VISIER_WORKERS > 1 needs SO_REUSEPORT, which this platform does not support")
+    store = SharedStore(os.environ.get("VISIER_SHARED_STORE_PATH") or DEFAULT_SHARED_STORE_PATH)
+    return Supervisor(workers, store).run()
+
+
+# --- Worker side ---
+
+async def run_worker_heartbeat(
+    store: SharedStore, worker_id: str, get_status: Callable[[], dict], ui_alive: Callable[[], bool]
+) -> None:
+    """Write this worker's heartbeat until cancelled; exit if the supervisor is gone."""
+    supervisor_pid = int(os.environ.get("VISIER_SUPERVISOR_PID", "0"))
+    while True:
+        if supervisor_pid and os.getppid() != supervisor_pid:
+            logger.warning("Supervisor exited, stopping worker")
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+        store.set(_HEARTBEAT_NAMESPACE, worker_id, {
+            "pid": os.getpid(),
+            "at": time.time(),
+            "state": get_status().get("state"),
+            "ui_alive": ui_alive(),
+        })
+        await asyncio.sleep(VISIER_WORKER_HEARTBEAT_SECONDS)
+
+
+def workers_snapshot(store: SharedStore) -> dict:
+    """Heartbeats and restart counts of every worker, for /metrics."""
+    now = time.time()
+    supervisor = store.get(_SUPERVISOR_NAMESPACE, "state") or {}
+    restarts = supervisor.get("workers", {})
+    return {
+        worker_id: {
+            "pid": heartbeat.get("pid"),
+            "state": heartbeat.get("state"),
+            "heartbeat_age_s": round(now - heartbeat.get("at", now), 1),
+            "restarts": restarts.get(worker_id, {}).get("restarts", 0),
+            "last_restart_reason": restarts.get(worker_id, {}).get("last_restart_reason"),
+        }
+        for worker_id, heartbeat in sorted(store.items(_HEARTBEAT_NAMESPACE).items())
+    }
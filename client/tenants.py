@@ -0,0 +1,347 @@
+"""
+Multi-tenant backend registry.
+
+One process can serve several Visier tenants. Tenants are listed in the JSON
+file named by VISIER_TENANTS_FILE:
+
+    {
+      "acme": {
+        "server_url": "https://acme.app.visier.com/visier-query-mcp",
+        "client_id": "...",
+        "client_secret": "$ACME_CLIENT_SECRET",
+        "username": "svc-mcp@acme.com",
+        "password": "$ACME_PASSWORD"
+      }
+    }
+
+String values go through os.path.expandvars, so secrets can stay in the
+environment. Tenants authenticate with the password grant, since a browser
+login per tenant is not practical on a shared server.
+
+A request picks its tenant with the X-Visier-Tenant header or a /t/{tenant}/
+path prefix. The first request for a tenant starts its TenantRuntime in the
+background: its own token storage, OAuth provider, HTTP connection pool and
+MCPClientBackend plus agent. Runtimes live on the main event loop, each owned
+by one task, because MCP sessions must be closed by the task that opened them.
+
+At most VISIER_TENANT_MAX_ACTIVE runtimes are kept. Beyond that, and after
+VISIER_TENANT_IDLE_SECONDS without requests, the least recently used idle
+runtime is closed. Every tenant gets an equal share of
+VISIER_TENANT_MAX_CONNECTIONS, so the total connection count stays bounded
+however many tenants are configured. A tenant's pool is opened on two loops
+(the MCP session on the main loop; LangChain tool calls, pings and warm-up on
+the web loop), so its share is split between them, and eviction closes both.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import httpx
+
+from client.agent_backend import AgentBackend
+from client.http_transport import aclose_pool, set_pool_limits
+from client.mcp_client_backend import MCPClientBackend, create_mcp_client_backend
+
+logger = logging.getLogger(__name__)
+
+VISIER_TENANTS_FILE = os.environ.get("VISIER_TENANTS_FILE")
+VISIER_TENANT_MAX_ACTIVE = int(os.environ.get("VISIER_TENANT_MAX_ACTIVE", "32"))
+VISIER_TENANT_IDLE_SECONDS = float(os.environ.get("VISIER_TENANT_IDLE_SECONDS", "900"))
+VISIER_TENANT_MAX_CONNECTIONS = int(os.environ.get("VISIER_TENANT_MAX_CONNECTIONS", "128"))
+
+# Event loops a tenant pool is opened on: the main loop and the web loop.
+_POOL_LOOPS = 2
+# A failed tenant is kept (and reported) this long before the next request retries it.
+_ERROR_RETRY_SECONDS = 30.0
+_SWEEP_INTERVAL_SECONDS = 15.0
+
+
+@dataclass
+class TenantConfig:
+    """Connection settings for one Visier tenant."""
+    tenant_id: str
+    server_url: str
+    client_id: str
+    client_secret: str
+    username: str | None = None
+    password: str | None = None
+    vanity: str | None = None
+
+
+def load_tenant_configs(path: str) -> dict[str, TenantConfig]:
+    """Read the tenants file; values like "$VAR" are taken from the environment."""
+    with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    configs = {}
+    for tenant_id, entry in raw.items():
+        values = {k: os.path.expandvars(v) if isinstance(v, str) else v for k, v in entry.items()}
+        missing = [k for k in ("server_url", "client_id", "client_secret", "username", "password") if not values.get(k)]
+        if missing:
+            raise ValueError(f"Tenant '{tenant_id}' in {path} is missing {', '.join(missing)}")
+        configs[tenant_id] = TenantConfig(
+            tenant_id=tenant_id,
+            server_url=values["server_url"],
+            client_id=values["client_id"],
+            client_secret=values["client_secret"],
+            username=values.get("username"),
+            password=values.get("password"),
+            vanity=values.get("vanity"),
+        )
+    return configs
+
+
+@dataclass
+class TenantRuntime:
+    """A tenant's live backend and agent, plus the callbacks the web server reads."""
+    config: TenantConfig
+    get_model_name: Callable[[], str]
+    backend: MCPClientBackend | None = None
+    agent: AgentBackend | None = None
+    state: str = "starting"
+    detail: str | None = None
+    catalog_version: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    failed_at: float | None = None
+    active_requests: int = 0
+    closing: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _stop: asyncio.Event | None = field(default=None, repr=False)
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def pool(self) -> str:
+        return f"tenant:{self.config.tenant_id}"
+
+    def get_agent(self) -> AgentBackend | None:
+        return self.agent
+
+    def get_server_url(self) -> str:
+        return self.config.server_url
+
+    def get_tools(self) -> list[dict]:
+        return self.backend.tool_definitions() if self.agent is not None else []
+
+    def get_prompts(self) -> list[dict]:
+        return self.backend.prompt_definitions() if self.agent is not None else []
+
+    def get_status(self) -> dict:
+        return {
+            "ready": self.agent is not None,
+            "state": self.state,
+            "detail": self.detail,
+            "catalogSource": "live" if self.agent is not None else None,
+            "catalogVersion": self.catalog_version,
+            "tenant": self.config.tenant_id,
+        }
+
+    async def get_prompt_messages_async(self, name: str, arguments: dict[str, str] | None = None) -> list[str]:
+        if self.backend is None:
+            raise RuntimeError(f"Tenant '{self.config.tenant_id}' is not connected yet")
+        return await self.backend.get_prompt_messages(name, arguments)
+
+    @contextmanager
+    def in_use(self):
+        """Mark the runtime busy for the duration of a request, so it is not evicted mid-run."""
+        with self._lock:
+            self.active_requests += 1
+            self.last_used = time.monotonic()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.active_requests -= 1
+                self.last_used = time.monotonic()
+
+
+class TenantRegistry:
+    """Creates tenant runtimes on demand and closes idle ones (LRU)."""
+
+    def __init__(
+        self,
+        configs: dict[str, TenantConfig],
+        create_auth: Callable[[TenantConfig], Awaitable[httpx.Auth]],
+        agent_backend: str,
+        get_model_name: Callable[[], str],
+        verbose: bool = False,
+        max_active: int = VISIER_TENANT_MAX_ACTIVE,
+        idle_seconds: float = VISIER_TENANT_IDLE_SECONDS,
+        max_connections: int = VISIER_TENANT_MAX_CONNECTIONS,
+    ):
+        self._configs = configs
+        self._create_auth = create_auth
+        self._agent_backend = agent_backend
+        self._get_model_name = get_model_name
+        self._verbose = verbose
+        self._max_active = max(1, max_active)
+        self._idle_seconds = idle_seconds
+        # Per tenant and per loop.
+        self._pool_connections = max(1, max_connections // (self._max_active * _POOL_LOOPS))
+        self._runtimes: OrderedDict[str, TenantRuntime] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sweeper: asyncio.Task | None = None
+        self._created = 0
+        self._evicted = 0
+
+    @property
+    def tenant_ids(self) -> list[str]:
+        return list(self._configs)
+
+    def start(self) -> None:
+        """Bind to the running (main) event loop and start the idle sweeper."""
+        self._loop = asyncio.get_running_loop()
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def aclose(self) -> None:
+        """Close every tenant runtime."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        with self._lock:
+            runtimes = list(self._runtimes.values())
+            self._runtimes.clear()
+        for runtime in runtimes:
+            await self._stop_runtime(runtime)
+
+    def get(self, tenant_id: str) -> TenantRuntime | None:
+        """Return the tenant's runtime, starting it in the background if needed.
+
+        Safe to call from any thread. Returns None for unknown tenants. The runtime
+        may still be connecting; check get_status() or get_agent().
+        """
+        config = self._configs.get(tenant_id)
+        if config is None or self._loop is None:
+            return None
+        evict: list[TenantRuntime] = []
+        with self._lock:
+            runtime = self._runtimes.get(tenant_id)
+            if runtime is not None and runtime.failed_at is not None \
+                    and time.monotonic() - runtime.failed_at > _ERROR_RETRY_SECONDS:
+                del self._runtimes[tenant_id]
+                evict.append(runtime)
+                runtime = None
+            if runtime is None:
+                runtime = TenantRuntime(config=config, get_model_name=self._get_model_name)
+                self._runtimes[tenant_id] = runtime
+                self._created += 1
+                evict.extend(self._over_capacity())
+                self._loop.call_soon_threadsafe(self._spawn, runtime)
+            self._runtimes.move_to_end(tenant_id)
+            runtime.last_used = time.monotonic()
+        for old in evict:
+            asyncio.run_coroutine_threadsafe(self._stop_runtime(old), self._loop)
+        return runtime
+
+    def _over_capacity(self) -> list[TenantRuntime]:
+        # Caller holds the lock. Busy runtimes are skipped, so the cap can be exceeded briefly.
+        evicted = []
+        for tenant_id in list(self._runtimes):
+            if len(self._runtimes) <= self._max_active:
+                break
+            runtime = self._runtimes[tenant_id]
+            if runtime.active_requests == 0:
+                del self._runtimes[tenant_id]
+                evicted.append(runtime)
+                self._evicted += 1
+                print(f"Evicting tenant '{tenant_id}' (over VISIER_TENANT_MAX_ACTIVE)")
+        return evicted
+
+    def _spawn(self, runtime: TenantRuntime) -> None:
+        if runtime.closing:
+            return  # Evicted before it got started.
+        runtime._stop = asyncio.Event()
+        runtime._task = asyncio.create_task(self._run_runtime(runtime))
+
+    async def _run_runtime(self, runtime: TenantRuntime) -> None:
+        """Own the tenant's backend for its whole life: open, serve until stopped, close."""
+        tenant_id = runtime.config.tenant_id
+        refresh_task = None
+        set_pool_limits(runtime.pool, self._pool_connections)
+        try:
+            runtime.state = "connecting"
+            auth = await self._create_auth(runtime.config)
+            if hasattr(auth, "start_background_refresh"):
+                refresh_task = auth.start_background_refresh()
+            backend = create_mcp_client_backend(runtime.config.server_url, auth, self._agent_backend, pool=runtime.pool)
+            async with backend:
+                runtime.backend = backend
+                runtime.agent = backend.create_agent(verbose=self._verbose)
+                runtime.catalog_version += 1
+                backend.add_catalog_listener(lambda tools_changed, _: self._on_catalog_changed(runtime, tools_changed))
+                runtime.state = "ready"
+                print(f"Tenant '{tenant_id}' ready: {len(backend.tool_definitions())} tools")
+                await runtime._stop.wait()
+        except asyncio.CancelledError:
+            # Runtimes are stopped through _stop, never cancelled, so this is the MCP
+            # session's cancel scope giving up on an unreachable server.
+            logger.warning(f"Tenant '{tenant_id}' connection was cancelled")
+            runtime.state, runtime.detail = "error", "Connection to the MCP server failed"
+            runtime.failed_at = time.monotonic()
+        except Exception as exc:
+            logger.exception(f"Tenant '{tenant_id}' failed")
+            runtime.state, runtime.detail = "error", str(exc)
+            runtime.failed_at = time.monotonic()
+        finally:
+            runtime.agent = None
+            if refresh_task is not None:
+                refresh_task.cancel()
+            await aclose_pool(runtime.pool)
+            if runtime.state != "error":
+                runtime.state = "stopped"
+
+    def _on_catalog_changed(self, runtime: TenantRuntime, tools_changed: bool) -> None:
+        runtime.catalog_version += 1
+        if tools_changed:
+            runtime.agent = runtime.backend.create_agent(verbose=self._verbose)
+
+    async def _stop_runtime(self, runtime: TenantRuntime) -> None:
+        runtime.closing = True
+        if runtime._stop is not None:
+            runtime._stop.set()
+        if runtime._task is not None:
+            try:
+                await runtime._task
+            except Exception:
+                logger.exception(f"Closing tenant '{runtime.config.tenant_id}' failed")
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(_SWEEP_INTERVAL_SECONDS)
+            now = time.monotonic()
+            with self._lock:
+                idle = [
+                    r for r in self._runtimes.values()
+                    if r.active_requests == 0 and now - r.last_used > self._idle_seconds
+                ]
+                for runtime in idle:
+                    del self._runtimes[runtime.config.tenant_id]
+                    self._evicted += 1
+            for runtime in idle:
+                print(f"Evicting idle tenant '{runtime.config.tenant_id}'")
+                await self._stop_runtime(runtime)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "configured": len(self._configs),
+                "active": len(self._runtimes),
+                "max_active": self._max_active,
+                "connections_per_tenant": self._pool_connections * _POOL_LOOPS,
+                "created": self._created,
+                "evicted": self._evicted,
+                "tenants": {
+                    tenant_id: {
+                        "state": r.state,
+                        "active_requests": r.active_requests,
+                        "idle_s": round(now - r.last_used, 1),
+                    }
+                    for tenant_id, r in self._runtimes.items()
+                },
+            }
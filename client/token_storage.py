@@ -0,0 +1,226 @@
+"""
+OAuth token storage implementations.
+
+InMemoryTokenStorage keeps tokens for the lifetime of the process.
+FileTokenStorage persists them to disk encrypted with Fernet (AES-128-CBC +
+HMAC-SHA256), so a restart can reuse the access/refresh token instead of
+running the browser auth-code flow or password exchange again.
+
+SharedTokenStorage keeps the same encrypted record in the SharedStore, so the
+workers of a multi-process deployment share one token and see each other's
+refreshes.
+
+All of them record when each token expires, because OAuthToken.expires_in is
+relative to when the token was issued and is meaningless once reloaded.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from cryptography.fernet import Fernet, InvalidToken
+from mcp.client.auth import TokenStorage
+from mcp.shared.auth import OAuthClientInformationFull, OAuthToken
+
+from client.shared_store import SharedStore
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiringTokenStorage(TokenStorage):
+    """TokenStorage that also remembers the absolute expiry time of the stored token."""
+
+    async def get_token_expiry(self) -> float | None:
+        """Return the Unix timestamp at which the stored access token expires, if known."""
+        return None
+
+    @asynccontextmanager
+    async def refresh_lock(self):
+        """Held while refreshing the token; storages shared between processes serialize refreshes."""
+        yield
+
+
+class InMemoryTokenStorage(ExpiringTokenStorage):
+    def __init__(self, client_info: OAuthClientInformationFull | None = None):
+        self.tokens = None
+        self.token_expiry: float | None = None
+        self.client_info = client_info
+
+    async def get_tokens(self) -> OAuthToken | None:
+        return self.tokens
+
+    async def set_tokens(self, tokens: OAuthToken) -> None:
+        self.tokens = tokens
+        self.token_expiry = time.time() + tokens.expires_in if tokens.expires_in else None
+
+    async def get_token_expiry(self) -> float | None:
+        return self.token_expiry
+
+    async def get_client_info(self) -> OAuthClientInformationFull | None:
+        return self.client_info
+
+    async def set_client_info(self, client_info: OAuthClientInformationFull) -> None:
+        self.client_info = client_info
+
+
+class FileTokenStorage(ExpiringTokenStorage):
+    """Encrypted, file-backed TokenStorage.
+
+    The record is bound to the MCP server URL, client id and account, so pointing
+    the same file at a different tenant or user starts from a clean slate instead
+    of sending someone else's token.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        server_url: str,
+        client_info: OAuthClientInformationFull,
+        key: str | None = None,
+        account: str | None = None,
+    ):
+        """Initialize file-backed token storage.
+
+        Args:
+            path: File to store the encrypted tokens in.
+            server_url: MCP server URL the tokens belong to.
+            client_info: Static OAuth client metadata returned by get_client_info.
+            key: Fernet key (urlsafe base64). If omitted, a key is generated once and
+                 kept next to the token file in `<path>.key` with 0600 permissions.
+            account: Optional user the tokens were issued to (password grant).
+        """
+        self._path = os.path.expanduser(path)
+        self._server_url = server_url
+        self._client_info = client_info
+        self._account = account
+        self._lock = threading.Lock()
+        self._fernet = Fernet(key.encode() if key else self._load_or_create_key())
+        self._record = self._read()
+
+    async def get_tokens(self) -> OAuthToken | None:
+        tokens = self._record.get("tokens")
+        return OAuthToken.model_validate(tokens) if tokens else None
+
+    async def set_tokens(self, tokens: OAuthToken) -> None:
+        with self._lock:
+            self._record["tokens"] = tokens.model_dump(mode="json")
+            self._record["expires_at"] = time.time() + tokens.expires_in if tokens.expires_in else None
+            self._write(self._record)
+
+    async def get_token_expiry(self) -> float | None:
+        return self._record.get("expires_at")
+
+    async def get_client_info(self) -> OAuthClientInformationFull | None:
+        return self._client_info
+
+    async def set_client_info(self, client_info: OAuthClientInformationFull) -> None:
+        self._client_info = client_info
+
+    def _binding(self) -> dict:
+        return {"server_url": self._server_url, "client_id": self._client_info.client_id, "account": self._account}
+
+    def _read(self) -> dict:
+        try:
+            blob = self._load_blob()
+            if blob is None:
+                return self._binding()
+            record = json.loads(self._fernet.decrypt(blob))
+        except (InvalidToken, ValueError) as exc:
+            logger.warning(f"Ignoring unreadable token store {self._path}: {exc}")
+            return self._binding()
+        if any(record.get(k) != v for k, v in self._binding().items()):
+            logger.info(f"Token store {self._path} belongs to a different server/client, ignoring it")
+            return self._binding()
+        return record
+
+    def _write(self, record: dict) -> None:
+        self._store_blob(self._fernet.encrypt(json.dumps(record).encode()))
+
+    def _load_blob(self) -> bytes | None:
+        try:
+            with open(self._path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _store_blob(self, blob: bytes) -> None:
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        tmp_path = f"{self._path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, self._path)
+
+    def _load_or_create_key(self) -> bytes:
+        key_path = f"{self._path}.key"
+        try:
+            with open(key_path, "rb") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(key_path) or ".", exist_ok=True)
+        key = Fernet.generate_key()
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        return key
+
+
+class SharedTokenStorage(FileTokenStorage):
+    """FileTokenStorage whose encrypted record lives in a SharedStore.
+
+    Every read goes back to the store, so a token refreshed by one worker is
+    picked up by the others, and refresh_lock() is a store lease so only one
+    worker at a time exchanges the refresh token. The Fernet key is kept in
+    `<store path>.key` unless given explicitly. *record_key* separates the
+    tokens of different tenants in one store.
+    """
+
+    _NAMESPACE = "oauth_tokens"
+    _LEASE_TTL_SECONDS = 30.0
+
+    def __init__(
+        self,
+        store: SharedStore,
+        server_url: str,
+        client_info: OAuthClientInformationFull,
+        key: str | None = None,
+        account: str | None = None,
+        record_key: str = "record",
+    ):
+        self._store = store
+        self._record_key = record_key
+        self._owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        super().__init__(store.path, server_url, client_info, key=key, account=account)
+
+    async def get_tokens(self) -> OAuthToken | None:
+        self._record = self._read()
+        return await super().get_tokens()
+
+    async def get_token_expiry(self) -> float | None:
+        self._record = self._read()
+        return await super().get_token_expiry()
+
+    @asynccontextmanager
+    async def refresh_lock(self):
+        # Wait out another worker's refresh, but never longer than the lease itself.
+        deadline = time.monotonic() + self._LEASE_TTL_SECONDS
+        while not self._store.acquire_lease(f"token-refresh:{self._record_key}", self._owner, self._LEASE_TTL_SECONDS):
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.1)
+        try:
+            yield
+        finally:
+            self._store.release_lease(f"token-refresh:{self._record_key}", self._owner)
+
+    def _load_blob(self) -> bytes | None:
+        blob = self._store.get(self._NAMESPACE, self._record_key)
+        return blob.encode("ascii") if blob else None
+
+    def _store_blob(self, blob: bytes) -> None:
+        self._store.set(self._NAMESPACE, self._record_key, blob.decode("ascii"))
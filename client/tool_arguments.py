@@ -0,0 +1,317 @@
+"""
+Local validation and repair of tool arguments.
+
+Models regularly get tool arguments slightly wrong: `q` instead of `question`,
+a number passed as a string, an optional argument left out. Sent as is, such a
+call travels to the MCP server, fails, and costs another LLM turn to fix.
+
+ToolCallGuard (client/tool_calls.py) checks every call against the tool's
+inputSchema before it is sent. Validators are compiled once per tool when the
+catalog is loaded. Obvious mistakes are repaired first:
+
+- known aliases (TOOL_ARGUMENT_ALIASES plus built-ins such as q -> question),
+  differently cased or camelCase names, and a lone unknown argument of a tool
+  that takes exactly one
+- values of the wrong JSON type that convert cleanly ("5" -> 5, "true" -> True,
+  a scalar where an array is expected), and enum values in the wrong case
+- missing required arguments that have a schema default (filled in quietly;
+  omitted optional arguments are left for the server to default, so the call
+  keeps the arguments the model gave, e.g. for a speculative call to match)
+- unknown arguments, when the schema forbids additional properties
+
+If the repaired arguments are still invalid, the call is not sent. The model
+gets a structured error listing each problem and the expected arguments
+straight away. Counts are reported under "tool_arguments" at /metrics.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+from jsonschema import SchemaError
+from jsonschema.validators import validator_for
+
+from client import metrics
+
+logger = logging.getLogger(__name__)
+
+TOOL_ARGUMENT_VALIDATION = os.environ.get("TOOL_ARGUMENT_VALIDATION", "true").lower() == "true"
+
+# alias -> argument name; an alias is only used when the tool has that argument.
+_BUILTIN_ALIASES = {
+    "q": "question",
+    "query": "question",
+    "prompt": "question",
+    "text": "question",
+    "search": "search_string",
+    "search_term": "search_string",
+    "term": "search_string",
+    "keyword": "search_string",
+}
+
+
+def _parse_aliases(value: str) -> dict[str, str]:
+    """Parse "alias=argument,alias2=argument2"."""
+    aliases = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        alias, _, name = item.partition("=")
+        if not name:
+            raise ValueError(f"Invalid tool argument alias '{item}', expected alias=argument")
+        aliases[alias.strip()] = name.strip()
+    return aliases
+
+
+TOOL_ARGUMENT_ALIASES = {**_BUILTIN_ALIASES, **_parse_aliases(os.environ.get("TOOL_ARGUMENT_ALIASES", ""))}
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_TRUE_STRINGS = {"true", "yes", "1"}
+_FALSE_STRINGS = {"false", "no", "0"}
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+    "null": type(None),
+}
+
+
+def _key(name: str) -> str:
+    """Canonical form for matching argument names: searchString, Search-String -> search_string."""
+    return _CAMEL_BOUNDARY.sub("_", name).replace("-", "_").lower()
+
+
+def _schema_types(schema: dict) -> list[str]:
+    types = schema.get("type")
+    if isinstance(types, str):
+        return [types]
+    if isinstance(types, list):
+        return types
+    # Optional[...] from pydantic and friends: anyOf/oneOf of typed schemas.
+    return [t for option in schema.get("anyOf") or schema.get("oneOf") or [] for t in _schema_types(option)]
+
+
+def _has_type(value: Any, json_type: str) -> bool:
+    expected = _JSON_TYPES.get(json_type)
+    if expected is None:
+        return True
+    if isinstance(value, bool) and json_type in ("integer", "number"):
+        return False
+    return isinstance(value, expected)
+
+
+def _convert(value: Any, json_type: str) -> Any:
+    """Convert *value* to *json_type*, raising ValueError/TypeError if it doesn't convert cleanly."""
+    if json_type == "integer":
+        if isinstance(value, str):
+            value = float(value.strip())
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+    elif json_type == "number" and isinstance(value, str):
+        number = float(value.strip())
+        return int(number) if number.is_integer() and "." not in value else number
+    elif json_type == "boolean":
+        lowered = str(value).strip().lower()
+        if lowered in _TRUE_STRINGS:
+            return True
+        if lowered in _FALSE_STRINGS:
+            return False
+    elif json_type == "string" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    elif json_type == "array":
+        if isinstance(value, str) and value.lstrip().startswith("["):
+            parsed = json.loads(value)
+            if isinstance(parsed, list):
+                return parsed
+        if not isinstance(value, (list, dict)):
+            return [value]
+    elif json_type == "object" and isinstance(value, str) and value.lstrip().startswith("{"):
+        parsed = json.loads(value)
+        if isinstance(parsed, dict):
+            return parsed
+    raise ValueError(f"cannot convert {type(value).__name__} to {json_type}")
+
+
+def _coerce(value: Any, schema: dict) -> tuple[Any, str | None]:
+    """Return (value, repair description or None) after fitting *value* to *schema*'s type and enum."""
+    repair = None
+    types = _schema_types(schema)
+    if types and not any(_has_type(value, t) for t in types):
+        for json_type in types:
+            try:
+                value, repair = _convert(value, json_type), f"coerced to {json_type}"
+                break
+            except (ValueError, TypeError):
+                continue
+    items = schema.get("items")
+    if isinstance(value, list) and isinstance(items, dict):
+        coerced = [_coerce(item, items) for item in value]
+        if any(r for _, r in coerced):
+            value, repair = [v for v, _ in coerced], repair or "coerced array items"
+    enum = schema.get("enum")
+    if enum and value not in enum and isinstance(value, str):
+        match = next((e for e in enum if isinstance(e, str) and e.lower() == value.strip().lower()), None)
+        if match is not None:
+            value, repair = match, "matched enum value"
+    return value, repair
+
+
+@dataclass
+class ArgumentCheck:
+    """Outcome of checking one call: the (repaired) arguments and any remaining problems."""
+    args: dict
+    repairs: list[str] = field(default_factory=list)
+    problems: list[dict] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+class _ToolSchema:
+    """One tool's inputSchema with its compiled validator."""
+
+    def __init__(self, name: str, schema: dict):
+        self.name = name
+        self.schema = schema
+        self.properties: dict[str, dict] = schema.get("properties") or {}
+        self.required: list[str] = schema.get("required") or []
+        self.closed = schema.get("additionalProperties") is False
+        self._by_key = {_key(p): p for p in self.properties}
+        validator_cls = validator_for(schema)
+        validator_cls.check_schema(schema)
+        self._validator = validator_cls(schema)
+
+    def _argument_name(self, given: str) -> str | None:
+        alias = TOOL_ARGUMENT_ALIASES.get(given) or TOOL_ARGUMENT_ALIASES.get(_key(given))
+        if alias in self.properties:
+            return alias
+        return self._by_key.get(_key(given))
+
+    def check(self, args: dict) -> ArgumentCheck:
+        args = dict(args or {})
+        repairs: list[str] = []
+
+        # Names: aliases and spelling variants of known arguments.
+        unknown = [k for k in args if k not in self.properties]
+        for given in unknown:
+            name = self._argument_name(given)
+            if name is not None and name not in args:
+                args[name] = args.pop(given)
+                repairs.append(f"renamed '{given}' to '{name}'")
+        unknown = [k for k in args if k not in self.properties]
+        missing = [p for p in self.required if p not in args]
+        if len(self.properties) == 1 and len(unknown) == 1 and len(missing) == 1:
+            args[missing[0]] = args.pop(unknown[0])
+            repairs.append(f"renamed '{unknown[0]}' to '{missing[0]}'")
+            unknown = []
+        if self.closed:
+            for given in unknown:
+                del args[given]
+                repairs.append(f"dropped unknown argument '{given}'")
+
+        # Values: types, enums and defaults.
+        for name, prop in self.properties.items():
+            if name in args:
+                args[name], repair = _coerce(args[name], prop)
+                if repair:
+                    repairs.append(f"'{name}' {repair}")
+            elif "default" in prop and name in self.required:
+                args[name] = prop["default"]
+
+        problems = [
+            {"argument": "/".join(str(p) for p in error.absolute_path) or None, "problem": error.message}
+            for error in sorted(self._validator.iter_errors(args), key=lambda e: list(map(str, e.absolute_path)))
+        ]
+        return ArgumentCheck(args=args, repairs=repairs, problems=problems)
+
+    def expected(self) -> dict:
+        """Short description of the arguments, sent back with validation errors."""
+        return {
+            name: {
+                "type": "|".join(_schema_types(prop)) or "any",
+                "required": name in self.required,
+                **({"enum": prop["enum"]} if "enum" in prop else {}),
+            }
+            for name, prop in self.properties.items()
+        }
+
+
+class ToolArguments:
+    """Compiled schemas of one MCP server's tools."""
+
+    def __init__(self):
+        self._schemas: dict[str, _ToolSchema] = {}
+
+    def set_schemas(self, schemas: dict[str, dict | None]) -> None:
+        """Compile the inputSchema of every tool; replaces the previous set (call on catalog load)."""
+        compiled = {}
+        for name, schema in schemas.items():
+            if not isinstance(schema, dict):
+                continue
+            try:
+                compiled[name] = _ToolSchema(name, schema)
+            except SchemaError as exc:
+                logger.warning(f"Not validating arguments of tool '{name}': invalid inputSchema ({exc.message})")
+        self._schemas = compiled
+
+    def check(self, name: str, args: dict) -> ArgumentCheck:
+        """Repair and validate *args* for tool *name*; unknown tools pass through unchecked."""
+        schema = self._schemas.get(name)
+        if not TOOL_ARGUMENT_VALIDATION or schema is None:
+            return ArgumentCheck(args=args)
+        result = schema.check(args)
+        argument_stats.record(name, result)
+        if result.repairs:
+            logger.info(f"Repaired arguments of '{name}': {'; '.join(result.repairs)}")
+        return result
+
+    def error_message(self, name: str, result: ArgumentCheck) -> str:
+        """Structured error for the model; starts with "Error" like other failed tool results."""
+        detail = {
+            "error": "invalid_arguments",
+            "tool": name,
+            "problems": result.problems,
+            "expected_arguments": self._schemas[name].expected(),
+        }
+        return (
+            f"Error: invalid arguments for tool '{name}'; the call was not sent. "
+            f"Fix the arguments and call the tool again.\n{json.dumps(detail, default=str)}"
+        )
+
+
+class ArgumentStats:
+    """Thread-safe counters for argument checks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"checked": 0, "repaired": 0, "rejected": 0}
+        self._rejected_by_tool: dict[str, int] = {}
+
+    def record(self, name: str, result: ArgumentCheck) -> None:
+        with self._lock:
+            self._counts["checked"] += 1
+            if result.repairs:
+                self._counts["repaired"] += 1
+            if result.problems:
+                self._counts["rejected"] += 1
+                self._rejected_by_tool[name] = self._rejected_by_tool.get(name, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": TOOL_ARGUMENT_VALIDATION,
+                **self._counts,
+                # Every rejected call is a failed round trip to the MCP server that never happened.
+                "server_calls_avoided": self._counts["rejected"],
+                "rejected_by_tool": dict(self._rejected_by_tool),
+            }
+
+
+argument_stats = ArgumentStats()
+
+metrics.register("tool_arguments", argument_stats.snapshot)
@@ -0,0 +1,114 @@
+"""
+Guard around every MCP tool call.
+
+Both MCP client backends send their tool calls through a ToolCallGuard: the
+Bedrock backend wraps its session.call_tool with it, and the LangChain backend
+installs it as a langchain-mcp-adapters tool interceptor. The guard paces
+calls through the MCP rate limiter (one bucket for the server, one per tool)
+and retries calls the server throttled, whether it answered with HTTP 429 or
+with an error result that reports rate limiting.
+
+Before any of that, arguments are repaired and validated against the tool's
+inputSchema (client/tool_arguments.py); invalid calls are answered with an
+error result without contacting the server. Calls then go through the tool's
+policy (client/tool_policy.py): a circuit breaker, a concurrency cap and a
+timeout per attempt. A rejected or timed-out call is answered with an error
+result too. Progress notifications received while a call runs are attributed to
+it (client/tool_progress.py).
+
+It also runs the speculative first tool call of a run (client/speculation.py)
+and answers the model's matching call with its result.
+"""
+import asyncio
+from collections.abc import Awaitable, Callable
+from functools import partial
+
+from mcp.types import CallToolResult, TextContent
+
+from client.rate_limit import (
+    MCP_RATE_LIMIT_RPS, MCP_TOOL_RATE_LIMITS, TokenBucket, is_throttling_message, limited, mcp_limiter,
+    retry_throttled,
+)
+from client.speculation import Speculation, claim, speculation_stats, start_speculation
+from client.tool_arguments import ToolArguments
+from client.tool_policy import BreakerOpen, tool_policies
+from client.tool_progress import track_call
+
+
+def _error_result(text: str) -> CallToolResult:
+    return CallToolResult(content=[TextContent(type="text", text=text)], isError=True)
+
+
+def _is_throttled_result(result) -> bool:
+    if not isinstance(result, CallToolResult) or not result.isError:
+        return False
+    return any(isinstance(c, TextContent) and is_throttling_message(c.text) for c in result.content)
+
+
+class ToolCallGuard:
+    """Rate limits and retries the tool calls one backend makes to its MCP server."""
+
+    def __init__(self, server_url: str):
+        self._server_url = server_url
+        self._server_bucket = mcp_limiter.bucket(server_url, MCP_RATE_LIMIT_RPS)
+        self._arguments = ToolArguments()
+
+    def set_schemas(self, schemas: dict[str, dict | None]) -> None:
+        """Compile the tools' inputSchemas for local argument checks; call whenever the catalog is loaded."""
+        self._arguments.set_schemas(schemas)
+
+    def _buckets(self, name: str) -> list[TokenBucket]:
+        return [self._server_bucket, mcp_limiter.bucket(f"{self._server_url}#{name}", MCP_TOOL_RATE_LIMITS.get(name))]
+
+    async def call(
+        self, name: str, args: dict, call: Callable[[dict], Awaitable[CallToolResult]], call_id: str | None = None
+    ) -> CallToolResult:
+        """Run call(args) for tool *name* under the guard; *call_id* is the model's id for the call."""
+        checked = self._arguments.check(name, args)
+        if not checked.ok:
+            return _error_result(self._arguments.error_message(name, checked))
+        args = checked.args
+        speculation = claim(self, name, args)
+        if speculation is not None:
+            try:
+                return await speculation.result()
+            except Exception:
+                # Make the call for real; the model asked for it either way.
+                speculation_stats.record_failed()
+        buckets = self._buckets(name)
+
+        def attempts(timeout: float) -> Awaitable[CallToolResult]:
+            return retry_throttled(lambda: limited(
+                buckets, lambda: asyncio.wait_for(call(args), timeout or None), is_throttled_result=_is_throttled_result
+            ))
+
+        policy = tool_policies.policy(self._server_url, name)
+        try:
+            with track_call(name, call_id):
+                return await policy.run(attempts)
+        except BreakerOpen as exc:
+            return _error_result(
+                f"Error: tool '{name}' is temporarily unavailable after repeated failures; the call was not sent. "
+                f"Try again in about {max(1, round(exc.retry_after))}s, or answer without this tool."
+            )
+        except TimeoutError:
+            return _error_result(
+                f"Error: tool '{name}' did not respond within {policy.timeout:g}s and the call was cancelled."
+            )
+
+    async def interceptor(self, request, handler):
+        """langchain-mcp-adapters ToolCallInterceptor running the call under the guard."""
+        return await self.call(
+            request.name,
+            request.args,
+            lambda args: handler(request.override(args=args)),
+            call_id=getattr(request.runtime, "tool_call_id", None),
+        )
+
+    def speculate(
+        self, question: str, tool_names: set[str], call_tool: Callable[[str, dict], Awaitable[CallToolResult]]
+    ) -> Speculation | None:
+        """Start the run's speculative tool call (if enabled); call_tool(name, args) makes the MCP call."""
+        return start_speculation(
+            self, question, tool_names, lambda name, args: self.call(name, args, partial(call_tool, name))
+        )
@@ -0,0 +1,243 @@
+"""
+Per-tool timeout, concurrency cap and circuit breaker for MCP tool calls.
+
+The MCP transport has no read timeout (the streamable HTTP stream stays open
+for as long as a tool runs, see client/http_transport.py), so without a policy
+a hung tool call blocks its run forever. And a tool that keeps failing is
+still called by every concurrent run.
+
+ToolCallGuard (client/tool_calls.py) runs every call of every backend through
+the tool's ToolPolicy:
+
+- timeout: each attempt is cancelled after MCP_TOOL_TIMEOUT_SECONDS (or the
+  tool's entry in MCP_TOOL_TIMEOUTS). The model gets an error result saying so.
+- concurrency: at most MCP_TOOL_MAX_CONCURRENCY calls of one tool are in
+  flight at once (or the tool's entry in MCP_TOOL_CONCURRENCY). The cap holds
+  across event loops; later calls wait for a slot.
+- circuit breaker: after MCP_BREAKER_FAILURES consecutive failures (exceptions
+  or timeouts) the breaker opens. Calls are then answered straight away with
+  an error result until MCP_BREAKER_RESET_SECONDS have passed. The next call
+  is let through as a probe ("half-open"). If the probe succeeds the breaker
+  closes, otherwise it opens again. Error results returned by the tool itself
+  (usually bad arguments from the model) don't count as failures.
+
+Policies are per server and tool and shared by every run in the process.
+Their state is reported under "tool_policies" at /metrics.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from client import metrics
+
+MCP_TOOL_TIMEOUT_SECONDS = float(os.environ.get("MCP_TOOL_TIMEOUT_SECONDS", "120"))
+MCP_TOOL_MAX_CONCURRENCY = int(os.environ.get("MCP_TOOL_MAX_CONCURRENCY", "8"))
+MCP_BREAKER_FAILURES = int(os.environ.get("MCP_BREAKER_FAILURES", "5"))
+MCP_BREAKER_RESET_SECONDS = float(os.environ.get("MCP_BREAKER_RESET_SECONDS", "30"))
+
+
+def _parse_settings(value: str) -> dict[str, float]:
+    """Parse "tool=value,tool2=value2" into {tool: value}."""
+    settings = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, setting = item.rpartition("=")
+        if not name:
+            raise ValueError(f"Invalid tool setting '{item}', expected tool=value")
+        settings[name.strip()] = float(setting)
+    return settings
+
+
+# Per-tool overrides, e.g. "ask_vee_question=300,search_metrics=20".
+MCP_TOOL_TIMEOUTS = _parse_settings(os.environ.get("MCP_TOOL_TIMEOUTS", ""))
+MCP_TOOL_CONCURRENCY = {k: int(v) for k, v in _parse_settings(os.environ.get("MCP_TOOL_CONCURRENCY", "")).items()}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class BreakerOpen(Exception):
+    """The tool's circuit breaker rejected the call."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit breaker open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class _Slots:
+    """Counting semaphore usable from any thread and event loop (asyncio.Semaphore is bound to one loop)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self.in_use = 0
+        # (loop, future) of callers waiting for a slot, in arrival order.
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.limit <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            # The releasing caller hands its slot over by resolving the future.
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, waiter))
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            if handed_over:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        if self.limit <= 0:
+            return
+        with self._lock:
+            if not self._waiters:
+                self.in_use -= 1
+                return
+            loop, waiter = self._waiters.popleft()
+        loop.call_soon_threadsafe(_hand_over, waiter)
+
+
+def _hand_over(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ToolPolicy:
+    """Timeout, concurrency cap and circuit breaker of one tool."""
+
+    def __init__(self, name: str, timeout: float, max_concurrency: int):
+        self.name = name
+        self.timeout = timeout
+        self._slots = _Slots(max_concurrency)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._counts = {"calls": 0, "failures": 0, "timeouts": 0, "rejected": 0, "opened": 0}
+
+    def _admit(self) -> bool:
+        """Check the breaker; returns True if this call is the half-open probe."""
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + MCP_BREAKER_RESET_SECONDS - time.monotonic()
+                if remaining > 0:
+                    self._counts["rejected"] += 1
+                    raise BreakerOpen(remaining)
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    # Only the probe goes through until it has succeeded.
+                    self._counts["rejected"] += 1
+                    raise BreakerOpen(1)
+                self._probing = True
+                return True
+            return False
+
+    def _record(self, probe: bool, failed: bool | None, timed_out: bool = False) -> None:
+        """Feed one outcome to the breaker; failed=None means the call was cancelled."""
+        with self._lock:
+            if probe:
+                self._probing = False
+            if failed is None:
+                return
+            self._counts["calls"] += 1
+            if not failed:
+                self._failures = 0
+                self._state = CLOSED
+                return
+            self._counts["failures"] += 1
+            if timed_out:
+                self._counts["timeouts"] += 1
+            self._failures += 1
+            if probe or (self._state == CLOSED and MCP_BREAKER_FAILURES > 0 and self._failures >= MCP_BREAKER_FAILURES):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._counts["opened"] += 1
+
+    async def run(self, call):
+        """Await call(timeout) under the breaker and the concurrency cap.
+
+        *call* gets the per-attempt timeout to apply. Raises BreakerOpen without
+        calling when the breaker rejects the call; TimeoutError and other
+        failures are recorded and re-raised.
+        """
+        probe = self._admit()
+        failed = None
+        timed_out = False
+        try:
+            await self._slots.acquire()
+            try:
+                result = await call(self.timeout)
+            finally:
+                self._slots.release()
+            failed = False
+            return result
+        except TimeoutError:
+            failed = timed_out = True
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(probe, failed, timed_out)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "timeout_seconds": self.timeout,
+                "max_concurrency": self._slots.limit or None,
+                "in_flight": self._slots.in_use,
+                "waiting": self._slots.waiting,
+                **self._counts,
+            }
+
+
+class ToolPolicies:
+    """ToolPolicy per server and tool, created on first use and shared process-wide."""
+
+    def __init__(self):
+        self._policies: dict[str, ToolPolicy] = {}
+        self._lock = threading.Lock()
+
+    def policy(self, server_url: str, name: str) -> ToolPolicy:
+        key = f"{server_url}#{name}"
+        with self._lock:
+            policy = self._policies.get(key)
+            if policy is None:
+                policy = self._policies[key] = ToolPolicy(
+                    name,
+                    MCP_TOOL_TIMEOUTS.get(name, MCP_TOOL_TIMEOUT_SECONDS),
+                    MCP_TOOL_CONCURRENCY.get(name, MCP_TOOL_MAX_CONCURRENCY),
+                )
+            return policy
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            policies = list(self._policies.items())
+        return {key: policy.snapshot() for key, policy in sorted(policies)}
+
+
+tool_policies = ToolPolicies()
+
+metrics.register("tool_policies", tool_policies.snapshot)
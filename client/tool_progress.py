@@ -0,0 +1,134 @@
+"""
+Live progress of running MCP tool calls.
+
+Heavy Visier queries can run for tens of seconds. A server that supports it
+reports progress while a tool runs (MCP `notifications/progress`, with a
+progress value, an optional total and a message) and can send log messages
+(`notifications/message`). Both are forwarded to the run as ToolProgressChunks
+and streamed to the UI as `tool_progress` events. The UI then shows the
+percentage, an ETA and the latest message, or shows that a tool has stopped
+reporting.
+
+The web server sets the run's sink with report_progress() around the agent
+stream. ToolCallGuard opens track_call() around each call, and the backends
+hand the current call's callbacks to the MCP session:
+
+- progress_callback() for session.call_tool, which also makes the session send
+  a progress token with the request
+- on_progress / on_logging_message as langchain-mcp-adapters callbacks (the
+  LangChain backend opens a session per call, so its log messages belong to
+  that call)
+
+The boto3 backend shares one MCP session between all runs, so server log
+messages can't be tied to a call there; only progress is forwarded.
+
+Progress updates of one call are forwarded at most every
+TOOL_PROGRESS_MIN_INTERVAL_SECONDS; the final update (progress == total) and log
+messages always are. ETA is a linear extrapolation from the call's elapsed time.
+"""
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from mcp.types import LoggingMessageNotificationParams
+
+from client.agent_backend import ToolProgressChunk
+
+TOOL_PROGRESS = os.environ.get("TOOL_PROGRESS", "true").lower() == "true"
+TOOL_PROGRESS_MIN_INTERVAL_SECONDS = float(os.environ.get("TOOL_PROGRESS_MIN_INTERVAL_SECONDS", "1"))
+
+_MAX_MESSAGE_CHARS = 500
+
+# The current run's sink; called from whichever loop receives the notification, so it must be thread-safe.
+_sink: ContextVar[Callable[[ToolProgressChunk], None] | None] = ContextVar("tool_progress_sink", default=None)
+_call: ContextVar["_CallProgress | None"] = ContextVar("tool_progress_call", default=None)
+
+
+class _CallProgress:
+    """Turns the notifications of one tool call into ToolProgressChunks."""
+
+    def __init__(self, sink: Callable[[ToolProgressChunk], None], name: str, call_id: str | None):
+        self._sink = sink
+        self.name = name
+        self.call_id = call_id
+        self.started = time.monotonic()
+        self._last_sent = 0.0
+
+    def _chunk(self, **fields) -> ToolProgressChunk:
+        return ToolProgressChunk(
+            call_id=self.call_id,
+            name=self.name,
+            at=time.time(),
+            elapsed_seconds=round(time.monotonic() - self.started, 2),
+            **fields,
+        )
+
+    async def on_progress(self, progress: float, total: float | None, message: str | None) -> None:
+        now = time.monotonic()
+        final = total is not None and progress >= total
+        if not final and now - self._last_sent < TOOL_PROGRESS_MIN_INTERVAL_SECONDS:
+            return
+        self._last_sent = now
+        percent = eta = None
+        if total:
+            percent = round(min(100.0, progress / total * 100), 1)
+            if 0 < progress < total:
+                eta = round((now - self.started) * (total - progress) / progress, 1)
+        self._sink(self._chunk(
+            progress=progress,
+            total=total,
+            percent=percent,
+            eta_seconds=eta,
+            message=message[:_MAX_MESSAGE_CHARS] if message else None,
+        ))
+
+    async def on_log(self, params: LoggingMessageNotificationParams) -> None:
+        data = params.data if isinstance(params.data, str) else json.dumps(params.data, default=str)
+        self._sink(self._chunk(message=data[:_MAX_MESSAGE_CHARS], level=params.level))
+
+
+@contextmanager
+def report_progress(sink: Callable[[ToolProgressChunk], None]) -> Iterator[None]:
+    """Send the progress of tool calls made in this context (one agent run) to *sink*."""
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+@contextmanager
+def track_call(name: str, call_id: str | None) -> Iterator[None]:
+    """Attribute notifications received in this context to tool call *call_id* of tool *name*."""
+    sink = _sink.get()
+    if sink is None or not TOOL_PROGRESS:
+        yield
+        return
+    token = _call.set(_CallProgress(sink, name, call_id))
+    try:
+        yield
+    finally:
+        _call.reset(token)
+
+
+def progress_callback():
+    """The current call's progress callback for session.call_tool, or None outside a tracked call."""
+    call = _call.get()
+    return call.on_progress if call is not None else None
+
+
+async def on_progress(progress: float, total: float | None, message: str | None, context=None) -> None:
+    """langchain-mcp-adapters progress callback; runs in the tool call's session."""
+    call = _call.get()
+    if call is not None:
+        await call.on_progress(progress, total, message)
+
+
+async def on_logging_message(params: LoggingMessageNotificationParams, context=None) -> None:
+    """MCP / langchain-mcp-adapters logging callback; runs in the tool call's session."""
+    call = _call.get()
+    if call is not None:
+        await call.on_log(params)
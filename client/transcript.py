@@ -0,0 +1,101 @@
+"""
+Lazily formatted steps of an agent run.
+
+Backends describe what happened during a run (model text, tool calls, tool
+results) as typed TranscriptEvents and stream their display lines to the UI.
+An event keeps the raw payload and only builds its line, a preview capped at
+TRANSCRIPT_PREVIEW_CHARS, when something asks for it. Whole tool results are
+never stringified just to be cut, and nothing is kept once the step has been
+streamed.
+"""
+import json
+import os
+import reprlib
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+TRANSCRIPT_PREVIEW_CHARS = int(os.environ.get("TRANSCRIPT_PREVIEW_CHARS", "500"))
+
+MODEL_TEXT = "model_text"
+TOOL_CALL = "tool_call"
+TOOL_RESULT = "tool_result"
+
+_repr = reprlib.Repr()
+_repr.maxstring = TRANSCRIPT_PREVIEW_CHARS
+_repr.maxother = TRANSCRIPT_PREVIEW_CHARS
+
+
+def iter_text(content: Any):
+    """Yield the text pieces of a message content (a string or a list of content blocks)."""
+    if isinstance(content, str):
+        yield content
+    elif isinstance(content, list):
+        for block in content:
+            if isinstance(block, str):
+                yield block
+            elif isinstance(block, dict) and isinstance(block.get("text"), str):
+                yield block["text"]
+
+
+def _is_text(content: Any) -> bool:
+    if isinstance(content, str):
+        return True
+    return isinstance(content, list) and all(
+        isinstance(block, str) or (isinstance(block, dict) and isinstance(block.get("text"), str))
+        for block in content
+    )
+
+
+def content_size(content: Any) -> int:
+    """Size of a payload in characters: the text length for text, else the length of its JSON."""
+    if _is_text(content):
+        return sum(len(piece) for piece in iter_text(content))
+    try:
+        return len(json.dumps(content, default=str))
+    except (TypeError, ValueError):
+        return len(str(content))
+
+
+def preview(content: Any, limit: int = TRANSCRIPT_PREVIEW_CHARS) -> str:
+    """Return at most *limit* characters of *content*, reading no more than that.
+
+    Strings and content-block lists are sliced; anything else goes through a
+    size-limited repr so large dicts are never fully stringified.
+    """
+    if isinstance(content, (str, list)):
+        parts, remaining, truncated = [], limit, False
+        for piece in iter_text(content):
+            if remaining <= 0:
+                truncated = truncated or bool(piece)
+                break
+            parts.append(piece[:remaining])
+            truncated = len(piece) > remaining
+            remaining -= len(piece)
+        text = "".join(parts).strip()
+    else:
+        text = _repr.repr(content)
+        truncated = False
+    return text + ("..." if truncated else "")
+
+
+@dataclass
+class TranscriptEvent:
+    """One step of an agent run; the display line is built on first use."""
+    kind: str
+    source: str
+    payload: Any = None
+    name: str | None = None
+    timestamp: float = field(default_factory=time.time)
+    _line: str | None = field(default=None, repr=False)
+
+    def format(self) -> str:
+        if self._line is None:
+            if self.kind == TOOL_CALL:
+                self._line = f"[{self.source}] Calling tool: {self.name} with args: {preview(self.payload)}"
+            elif self.kind == TOOL_RESULT:
+                self._line = f"[{self.source}] Tool result: {preview(self.payload)}"
+            else:
+                self._line = f"[{self.source}] {preview(self.payload)}"
+        return self._line
+
@@ -11,9 +11,15 @@ import os
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
-# Import and run the main client
-from client.client import main
 import asyncio
 
+from client.supervisor import VISIER_WORKERS, run_supervisor
+
 if __name__ == "__main__":
+    if VISIER_WORKERS > 1 and "VISIER_WORKER_ID" not in os.environ:
+        # Multi-process mode: supervise VISIER_WORKERS copies of this script.
+        sys.exit(run_supervisor())
+
+    # Import and run the main client
+    from client.client import main
     asyncio.run(main())
\ No newline at end of file
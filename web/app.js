@@ -1,22 +1,53 @@
 let isProcessing = false;
 let availablePromptsList = [];
+let agentReady = false;
+let catalogVersion = null;
+// Tool names by rendered index; schemas are fetched from /tools/{name} on first expand.
+let renderedToolNames = [];
+
+const STATUS_LABELS = {
+    starting: 'Starting...',
+    connecting: 'Authenticating and loading tools...',
+    warming_up: 'Warming up...',
+    ready: 'Ready',
+    error: 'Startup failed'
+};
+
+// Reasoning pane (see thinking_view.js), created when the page loads.
+let thinkingView = null;
+// Pages served under /t/{tenant}/ talk to that tenant's API (see client/tenants.py).
+const API_BASE = (location.pathname.match(/^\/t\/[^/]+/) || [''])[0];
+// Open the page with ?profile to profile every question (see client/profiling.py).
+const PROFILE_RUNS = new URLSearchParams(location.search).has('profile');
 
 // Load server info when page loads
 document.addEventListener('DOMContentLoaded', function() {
+    thinkingView = new ThinkingView(document.getElementById('thinkingArea'), {
+        placeholder: "The agent's thought process and tool usage will appear here..."
+    });
     loadServerInfo();
 });
 
 async function loadServerInfo() {
+    let status = null;
     try {
-        const response = await fetch('/server-info');
+        const response = await fetch(API_BASE + '/server-info');
         const data = await response.json();
         if (data.success) {
+            status = data.status || { ready: true, state: 'ready' };
+            agentReady = !!status.ready;
+            renderConnectionState(status);
             document.getElementById('serverUrl').textContent = data.serverUrl;
             document.getElementById('modelName').textContent = data.modelName;
-            renderToolsList(data.tools);
-            availablePromptsList = data.prompts || [];
-            renderPromptsList(availablePromptsList);
-            populatePromptSelect(availablePromptsList);
+            // Re-render the catalog only when it changed (cached -> live, list_changed refresh),
+            // and keep the loading placeholders until there is a catalog at all.
+            if (status.catalogVersion !== catalogVersion && (status.catalogSource || status.ready)) {
+                catalogVersion = status.catalogVersion;
+                renderToolsList(data.tools);
+                availablePromptsList = data.prompts || [];
+                renderPromptsList(availablePromptsList);
+                populatePromptSelect(availablePromptsList);
+            }
             updateAskButtonState();
         } else {
             document.getElementById('serverUrl').textContent = 'Server URL not available';
@@ -31,6 +62,21 @@ async function loadServerInfo() {
         document.getElementById('toolsContainer').innerHTML = '<div class="error">Error loading tools info</div>';
         document.getElementById('promptsContainer').innerHTML = '<div class="error">Error loading prompts info</div>';
     }
+    // Poll quickly until the agent is ready, then slowly to pick up catalog changes.
+    if (status && status.state !== 'error') {
+        setTimeout(loadServerInfo, status.ready ? 30000 : 1000);
+    }
+}
+
+/** Show the startup state and whether the tool list is cached or live. */
+function renderConnectionState(status) {
+    const el = document.getElementById('connectionState');
+    if (!el) return;
+    let text = STATUS_LABELS[status.state] || status.state;
+    if (status.state === 'error' && status.detail) text += ': ' + status.detail;
+    if (!status.ready && status.catalogSource === 'cache') text += ' (showing cached tools)';
+    el.textContent = text;
+    el.className = 'info-value status-' + (status.state || 'starting');
 }
 
 function renderPromptsList(prompts) {
@@ -178,7 +224,7 @@ function areRequiredPromptParamsFilled() {
 function updateAskButtonState() {
     const question = (document.getElementById('questionInput').value || '').trim();
     const btn = document.getElementById('askButton');
-    if (btn) btn.disabled = isProcessing || question === '';
+    if (btn) btn.disabled = isProcessing || !agentReady || question === '';
 }
 
 /** Fetch the selected prompt (with params) from the server and put its content into the question box. */
@@ -199,7 +245,7 @@ async function loadPromptIntoQuestion() {
     }
     try {
         const promptArguments = getPromptArgumentsFromInputs();
-        const response = await fetch('/get-prompt-content', {
+        const response = await fetch(API_BASE + '/get-prompt-content', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ prompt: promptName, promptArguments: promptArguments || {} })
@@ -238,6 +284,7 @@ function togglePrompt(promptId) {
 
 function renderToolsList(tools) {
     const container = document.getElementById('toolsContainer');
+    renderedToolNames = (tools || []).map(tool => tool.name);
     
     if (!tools || tools.length === 0) {
         container.innerHTML = '<div class="no-tools">No tools available</div>';
@@ -263,7 +310,7 @@ function renderToolsList(tools) {
                         </div>
                         <div class="tool-schema">
                             <div class="tool-schema-title">Parameters Schema</div>
-                            <div class="tool-schema-content"><pre>${formatSchemaForDisplay(tool.args_schema)}</pre></div>
+                            <div class="tool-schema-content"><pre id="${toolId}-schema">Loading schema...</pre></div>
                         </div>
                     </div>
                 </div>
@@ -285,12 +332,31 @@ function toggleTool(toolId) {
         } else {
             details.classList.add('expanded');
             if (icon) icon.textContent = '\u25BC'; // Down-pointing triangle
+            loadToolSchema(toolId);
         }
     } else {
         console.error('Could not find details element for:', toolId);
     }
 }
 
+/** Fetch a tool's parameter schema the first time its details are expanded. */
+async function loadToolSchema(toolId) {
+    const schemaEl = document.getElementById(`${toolId}-schema`);
+    if (!schemaEl || schemaEl.dataset.loaded) return;
+    const name = renderedToolNames[Number(toolId.replace('tool-', ''))];
+    schemaEl.dataset.loaded = 'true';
+    try {
+        const response = await fetch(API_BASE + '/tools/' + encodeURIComponent(name));
+        const data = await response.json();
+        if (!data.success) throw new Error(data.error || 'Tool not found');
+        schemaEl.textContent = formatSchemaForDisplay(data.tool.args_schema);
+    } catch (error) {
+        console.error('Error loading tool schema:', error);
+        delete schemaEl.dataset.loaded;
+        schemaEl.textContent = 'Error loading schema';
+    }
+}
+
 function formatSchemaForDisplay(schema) {
     if (!schema) return 'No schema available';
     try {
@@ -341,6 +407,364 @@ document.getElementById('questionInput').addEventListener('keydown', function(e)
     }
 });
 
+/** Show the final answer; it arrives in one piece, so one textContent write is enough. */
+function setResponseText(text) {
+    const el = document.getElementById('responseArea');
+    el.textContent = text;
+    el.classList.toggle('is-empty', !text);
+}
+
+// --- Run timeline (waterfall) ---
+
+let runTimeline = null;
+
+function escapeHtml(text) {
+    return String(text == null ? '' : text)
+        .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+}
+
+/** Start an empty timeline for a new run. */
+function resetTimeline() {
+    if (runTimeline) clearInterval(runTimeline.progressTimer);
+    runTimeline = { startedAt: null, endedAt: null, rows: [], byCallId: {} };
+    document.getElementById('copySummaryButton').disabled = true;
+    document.getElementById('timelineStatus').textContent = 'Run in progress...';
+    renderTimeline();
+}
+
+/** Add a streamed run_started / llm_turn / tool_call / tool_progress / tool_result / done event to the timeline. */
+function recordTimelineEvent(data) {
+    if (!runTimeline) return;
+    const t = runTimeline;
+    if (data.type === 'run_started') {
+        t.startedAt = data.started_at;
+    } else if (data.type === 'llm_turn') {
+        t.rows.push({
+            kind: 'llm', label: 'LLM ' + data.turn_id, detail: data.model,
+            start: data.requested_at, end: data.ended_at,
+            inputTokens: data.input_tokens, outputTokens: data.output_tokens
+        });
+    } else if (data.type === 'tool_call') {
+        const row = { kind: 'tool', label: 'Tool ' + data.name, start: data.started_at, end: null };
+        t.rows.push(row);
+        t.byCallId[data.call_id] = row;
+    } else if (data.type === 'tool_result') {
+        let row = t.byCallId[data.call_id];
+        if (!row) {
+            row = { kind: 'tool', label: 'Tool ' + data.name };
+            t.rows.push(row);
+        }
+        row.start = data.started_at;
+        row.end = data.ended_at;
+        row.size = data.size;
+        row.isError = data.is_error;
+    } else if (data.type === 'tool_progress') {
+        const row = t.byCallId[data.call_id];
+        if (!row) return;
+        if (data.percent != null) {
+            row.percent = data.percent;
+            row.eta = data.eta_seconds;
+        }
+        // Browser time, so "last update" isn't affected by clock skew.
+        row.progressAt = Date.now() / 1000;
+        // Keep the "last update" age ticking while tools run, so a stalled tool shows as one.
+        if (!t.progressTimer) t.progressTimer = setInterval(renderTimeline, 1000);
+    } else if (data.type === 'done') {
+        t.endedAt = data.ended_at || null;
+        clearInterval(t.progressTimer);
+        renderTimeline();
+        document.getElementById('timelineStatus').textContent = timelineDoneStatus(data);
+        document.getElementById('copySummaryButton').disabled = false;
+        return;
+    } else {
+        return;
+    }
+    renderTimeline();
+}
+
+/**
+ * Lay out the timeline rows relative to the run start, in start order. "queued"
+ * is the idle gap before a step: time since every earlier step (or the run
+ * start) ended, spent neither in the model nor in a tool. One pass, keeping
+ * the latest end so far.
+ */
+function computeTimeline() {
+    const t = runTimeline;
+    let tEnd = t.endedAt || 0;
+    let first = Infinity;
+    for (const r of t.rows) {
+        if (r.start < first) first = r.start;
+        if (r.start > tEnd) tEnd = r.start;
+        if (r.end != null && r.end > tEnd) tEnd = r.end;
+    }
+    const t0 = t.startedAt != null ? t.startedAt : first;
+    tEnd = Math.max(tEnd, t0);
+    const rows = [...t.rows].sort((a, b) => a.start - b.start);
+    let busyUntil = t0;
+    rows.forEach(row => {
+        row.queueStart = Math.min(busyUntil, row.start);
+        row.queued = Math.max(0, row.start - busyUntil);
+        row.duration = (row.end != null ? row.end : tEnd) - row.start;
+        // A running step keeps everything after it busy.
+        busyUntil = Math.max(busyUntil, row.end != null ? row.end : Infinity);
+    });
+    return { t0, total: Math.max(tEnd - t0, 0.001), rows };
+}
+
+function createTimelineRow(row) {
+    const el = document.createElement('div');
+    el.className = 'timeline-row';
+    el.innerHTML = `
+        <div class="timeline-label" title="${escapeHtml(row.detail || row.label)}">${escapeHtml(row.label)}</div>
+        <div class="timeline-track">
+            <div class="timeline-queue"></div>
+            <div></div>
+        </div>
+        <div class="timeline-meta"></div>
+    `;
+    const [queue, bar] = el.querySelector('.timeline-track').children;
+    return { el, queue, bar, meta: el.querySelector('.timeline-meta') };
+}
+
+function timelineRowMeta(row) {
+    let meta = row.end == null ? 'running...' : row.duration.toFixed(2) + 's';
+    if (row.end == null && row.progressAt != null) {
+        if (row.percent != null) meta += ` ${row.percent}%`;
+        if (row.eta != null) meta += `, ETA ${Math.round(row.eta)}s`;
+        const silent = Date.now() / 1000 - row.progressAt;
+        if (silent >= 5) meta += `, no update for ${Math.round(silent)}s`;
+    }
+    if (row.queued >= 0.01) meta += ', queued ' + row.queued.toFixed(2) + 's';
+    if (row.inputTokens != null) meta += `, ${row.inputTokens}/${row.outputTokens} tok`;
+    if (row.size != null) meta += ', ' + formatSize(row.size);
+    return meta;
+}
+
+/** Render the timeline, creating elements only for new rows and patching the rest. */
+function renderTimeline() {
+    const container = document.getElementById('timelineContainer');
+    const t = runTimeline;
+    if (!t || t.rows.length === 0) {
+        container.innerHTML = '<div class="no-tools">' +
+            (t ? 'Waiting for the first model turn...' : 'No run yet') + '</div>';
+        if (t) t.legend = null;
+        return;
+    }
+    if (!t.legend) {
+        container.innerHTML = `
+            <div class="timeline-legend">
+                <span class="legend-llm">LLM turn</span>
+                <span class="legend-tool">Tool call</span>
+                <span class="legend-queue">Queued / overhead</span>
+                <span></span>
+            </div>
+        `;
+        t.legend = container.firstElementChild;
+    }
+    const { t0, total, rows } = computeTimeline();
+    const pct = v => ((v - t0) / total * 100).toFixed(2) + '%';
+    const width = d => (Math.max(d, 0) / total * 100).toFixed(2) + '%';
+    // Walk backwards so a new row can be inserted before its successor (or the legend).
+    let next = t.legend;
+    for (let i = rows.length - 1; i >= 0; i--) {
+        const row = rows[i];
+        if (!row.view) {
+            row.view = createTimelineRow(row);
+            container.insertBefore(row.view.el, next);
+        }
+        const { queue, bar, meta } = row.view;
+        const classes = ['timeline-bar', row.kind];
+        if (row.isError) classes.push('error');
+        if (row.end == null) classes.push('running');
+        bar.className = classes.join(' ');
+        bar.style.left = pct(row.start);
+        bar.style.width = width(row.duration);
+        queue.style.left = pct(row.queueStart);
+        queue.style.width = width(row.queued);
+        meta.textContent = timelineRowMeta(row);
+        next = row.view.el;
+    }
+    t.legend.lastElementChild.textContent = `Total ${total.toFixed(2)}s`;
+}
+
+/** Final timeline status line for a run's "done" event. */
+function timelineDoneStatus(data) {
+    const t = runTimeline;
+    const total = t.startedAt != null && t.endedAt != null ? t.endedAt - t.startedAt
+        : t.rows.length ? computeTimeline().total : null;
+    const took = total != null ? total.toFixed(2) + 's' : null;
+    if (data.cancelled) return took ? `Cancelled after ${took}` : 'Cancelled';
+    if (data.success) return took ? `Completed in ${took}` : 'Completed';
+    return took ? `Failed after ${took}` : 'Failed';
+}
+
+/** Build a plain-text per-run summary that support engineers can paste into a ticket. */
+function buildRunSummary() {
+    const { t0, total, rows } = computeTimeline();
+    const llm = rows.filter(r => r.kind === 'llm');
+    const tools = rows.filter(r => r.kind === 'tool');
+    const sum = (list, key) => list.reduce((acc, r) => acc + (r[key] || 0), 0);
+    const slowest = rows.reduce((a, b) => (b.duration > (a ? a.duration : -1) ? b : a), null);
+    const lines = [
+        `Run summary: total ${total.toFixed(2)}s`,
+        `LLM: ${llm.length} turns, ${sum(llm, 'duration').toFixed(2)}s, ` +
+            `${sum(llm, 'inputTokens')} in / ${sum(llm, 'outputTokens')} out tokens`,
+        `Tools: ${tools.length} calls, ${sum(tools, 'duration').toFixed(2)}s, ${formatSize(sum(tools, 'size'))}`,
+        `Queued / overhead: ${sum(rows, 'queued').toFixed(2)}s`,
+    ];
+    if (slowest) lines.push(`Slowest step: ${slowest.label} (${slowest.duration.toFixed(2)}s)`);
+    lines.push('Steps:');
+    rows.forEach(row => {
+        let line = `  +${(row.start - t0).toFixed(2)}s  ${row.label}`;
+        if (row.detail) line += ` [${row.detail}]`;
+        line += `  ${row.duration.toFixed(2)}s  queued ${row.queued.toFixed(2)}s`;
+        if (row.inputTokens != null) line += `  ${row.inputTokens}/${row.outputTokens} tok`;
+        if (row.size != null) line += `  ${formatSize(row.size)}`;
+        if (row.isError) line += '  ERROR';
+        lines.push(line);
+    });
+    return lines.join('\n');
+}
+
+async function copyRunSummary() {
+    if (!runTimeline || runTimeline.rows.length === 0) return;
+    const summary = buildRunSummary();
+    const status = document.getElementById('timelineStatus');
+    try {
+        await navigator.clipboard.writeText(summary);
+        status.textContent = 'Summary copied to clipboard';
+    } catch (e) {
+        // Clipboard API needs a secure context or permission; fall back to a prompt.
+        window.prompt('Copy the run summary:', summary);
+    }
+}
+
+// Runs go over one WebSocket (run_socket.js) when the browser and server support it, else over SSE.
+let runSocket = RunSocket.supported()
+    ? new RunSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + API_BASE + '/ws')
+    : null;
+// Stops the run in progress; set while a question runs.
+let cancelActiveRun = null;
+
+/** The connected run socket, or null to use SSE (from then on, if the socket can't be opened). */
+async function openRunSocket() {
+    if (!runSocket) return null;
+    try {
+        return await runSocket.open();
+    } catch (error) {
+        console.warn('WebSocket unavailable, falling back to SSE:', error);
+        runSocket = null;
+        return null;
+    }
+}
+
+function cancelRun() {
+    if (cancelActiveRun) cancelActiveRun();
+    document.getElementById('responseStatus').textContent = 'Cancelling...';
+}
+
+/** Stop the spinner and re-enable the ask button so the next question can run. */
+function finishRun() {
+    isProcessing = false;
+    cancelActiveRun = null;
+    document.getElementById('spinner').style.display = 'none';
+    document.getElementById('loadingText').style.display = 'none';
+    document.getElementById('cancelButton').style.display = 'none';
+    updateAskButtonState();
+}
+
+/** Show one run event (the same over SSE and the WebSocket). */
+function handleRunEvent(data) {
+    const thinkingStatusEl = document.getElementById('thinkingStatus');
+    const responseStatusEl = document.getElementById('responseStatus');
+    recordTimelineEvent(data);
+    const line = data.type === 'thinking' ? data.content : formatAgentEvent(data);
+    if (line) {
+        // Queue the reasoning step; the view renders once per animation frame
+        thinkingView.append(line, data.type);
+        thinkingStatusEl.textContent = 'Reasoning in progress...';
+    } else if (data.type === 'done') {
+        // Final event: set thinking, response, and stop spinner
+        if (data.thinking && thinkingView.length === 0) thinkingView.setText(data.thinking);
+        if (data.cancelled) {
+            thinkingStatusEl.textContent = 'Run cancelled';
+            setResponseText('');
+            responseStatusEl.textContent = 'Cancelled';
+        } else {
+            thinkingStatusEl.textContent = data.success ? 'Reasoning complete' : 'Error occurred';
+            setResponseText(data.success ? (data.response || '') : ('Error: ' + (data.error || 'Unknown error')));
+            responseStatusEl.textContent = data.success ? 'Response ready' : 'Request failed';
+        }
+        if (data.profile_url) {
+            const link = document.createElement('a');
+            link.href = data.profile_url;
+            link.textContent = 'Download profile';
+            responseStatusEl.append(' · ', link);
+        }
+        finishRun();
+    }
+}
+
+/** Run a question over the WebSocket; resolves after its "done" event. */
+async function askOverWebSocket(socket, question) {
+    let finished;
+    const done = new Promise((resolve) => { finished = resolve; });
+    const id = await socket.ask(question, (data) => {
+        handleRunEvent(data);
+        if (data.type === 'done') finished();
+    }, { profile: PROFILE_RUNS });
+    cancelActiveRun = () => socket.cancel(id);
+    await done;
+}
+
+/** Run a question over POST /ask and its SSE response; cancelling drops the connection, which stops the run. */
+async function askOverSSE(question) {
+    const controller = new AbortController();
+    cancelActiveRun = () => controller.abort();
+    const response = await fetch(API_BASE + '/ask', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', ...(PROFILE_RUNS ? { 'X-Profile': '1' } : {}) },
+        body: JSON.stringify({ question: question }),
+        signal: controller.signal
+    });
+
+    if (!response.ok || !response.body) {
+        const err = await response.text();
+        throw new Error(err || 'Request failed');
+    }
+
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!contentType.includes('text/event-stream')) {
+        throw new Error('Expecting streaming response, got: ' + contentType);
+    }
+    // --- Streaming path: read SSE and update UI as chunks arrive ---
+    const decoder = new TextDecoderStream();
+    const reader = response.body.pipeThrough(decoder).getReader();
+    let buffer = '';
+    try {
+        // Read stream until done
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value || '';
+            const parsed = splitSSEEvents(buffer);
+            buffer = parsed.rest;
+            parsed.events.forEach(handleRunEvent);
+        }
+        // Handle any final event left in the buffer
+        if (buffer) {
+            const data = parseSSEData(buffer);
+            if (data) handleRunEvent(data);
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') throw error;
+        handleRunEvent({ type: 'done', success: false, cancelled: true, ended_at: Date.now() / 1000 });
+    } finally {
+        // Always stop spinner when stream ends (or errors) so next request can run
+        finishRun();
+    }
+}
+
 async function askAgent() {
     if (isProcessing) return;
 
@@ -353,110 +777,32 @@ async function askAgent() {
     // Update UI to show processing state
     isProcessing = true;
     document.getElementById('askButton').disabled = true;
+    document.getElementById('cancelButton').style.display = '';
     document.getElementById('spinner').style.display = 'block';
     document.getElementById('loadingText').style.display = 'block';
     document.getElementById('thinkingStatus').textContent = 'Agent is analyzing your request...';
     document.getElementById('responseStatus').textContent = 'Processing...';
-    document.getElementById('thinkingArea').value = '';
-    document.getElementById('responseArea').value = '';
+    thinkingView.clear();
+    setResponseText('');
+    resetTimeline();
 
     try {
-        // POST question to /ask and get response (streaming or JSON)
-        const response = await fetch('/ask', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ question: question })
-        });
-
-        if (!response.ok || !response.body) {
-            const err = await response.text();
-            throw new Error(err || 'Request failed');
-        }
-
-        const contentType = response.headers.get('Content-Type') || '';
-        if (contentType.includes('text/event-stream')) {
-            // --- Streaming path: read SSE and update UI as chunks arrive ---
-            const thinkingEl = document.getElementById('thinkingArea');
-            const thinkingStatusEl = document.getElementById('thinkingStatus');
-            const responseAreaEl = document.getElementById('responseArea');
-            const responseStatusEl = document.getElementById('responseStatus');
-            let thinkingParts = [];
-            const decoder = new TextDecoderStream();
-            const reader = response.body.pipeThrough(decoder).getReader();
-            let buffer = '';
-            try {
-                // Read stream until done
-                while (true) {
-                    const { value, done } = await reader.read();
-                    if (done) break;
-                    buffer += value || '';
-                    const lines = buffer.split('\n\n');
-                    buffer = lines.pop() || '';
-                    for (const chunk of lines) {
-                        const match = chunk.match(/^data:\s*(.+)$/m);
-                        if (!match) continue;
-                        try {
-                            const data = JSON.parse(match[1].trim());
-                            if (data.type === 'thinking' && data.content) {
-                                // Append reasoning step and scroll into view
-                                thinkingParts.push(data.content);
-                                thinkingEl.value = thinkingParts.join('\n\n');
-                                thinkingStatusEl.textContent = 'Reasoning in progress...';
-                                thinkingEl.scrollTop = thinkingEl.scrollHeight;
-                            } else if (data.type === 'done') {
-                                // Final event: set thinking, response, and stop spinner
-                                if (data.thinking) thinkingEl.value = data.thinking;
-                                thinkingStatusEl.textContent = data.success ? 'Reasoning complete' : 'Error occurred';
-                                responseAreaEl.value = data.success ? (data.response || '') : ('Error: ' + (data.error || 'Unknown error'));
-                                responseStatusEl.textContent = data.success ? 'Response ready' : 'Request failed';
-                                isProcessing = false;
-                                document.getElementById('spinner').style.display = 'none';
-                                document.getElementById('loadingText').style.display = 'none';
-                                updateAskButtonState();
-                            }
-                        } catch (e) {
-                            console.warn('SSE parse:', e);
-                        }
-                    }
-                }
-                // Handle any final event left in the buffer
-                if (buffer) {
-                    const match = buffer.match(/^data:\s*(.+)$/m);
-                    if (match) {
-                        try {
-                            const data = JSON.parse(match[1].trim());
-                            if (data.type === 'done') {
-                                if (data.thinking) thinkingEl.value = data.thinking;
-                                thinkingStatusEl.textContent = data.success ? 'Reasoning complete' : 'Error occurred';
-                                responseAreaEl.value = data.success ? (data.response || '') : ('Error: ' + (data.error || ''));
-                                responseStatusEl.textContent = data.success ? 'Response ready' : 'Request failed';
-                            }
-                        } catch (e) { /* ignore */ }
-                    }
-                }
-            } finally {
-                // Always stop spinner when stream ends (or errors) so next request can run
-                isProcessing = false;
-                document.getElementById('spinner').style.display = 'none';
-                document.getElementById('loadingText').style.display = 'none';
-                updateAskButtonState();
-            }
+        const socket = await openRunSocket();
+        if (socket) {
+            await askOverWebSocket(socket, question);
         } else {
-            throw new Error('Expecting streaming response, got: ' + contentType);
+            await askOverSSE(question);
         }
     } catch (error) {
         // Network or server error: show message and reset UI
         console.error('Error asking agent:', error);
-        document.getElementById('thinkingArea').value = '';
-        document.getElementById('responseArea').value = 'Connection error: ' + error.message +
-            '\n\nPlease check that the server is running and try again.';
+        thinkingView.clear();
+        setResponseText('Connection error: ' + error.message +
+            '\n\nPlease check that the server is running and try again.');
         document.getElementById('thinkingStatus').textContent = 'Connection failed';
         document.getElementById('responseStatus').textContent = 'Network error';
     }
 
     // Reset UI (spinner, loading text, button state)
-    isProcessing = false;
-    document.getElementById('spinner').style.display = 'none';
-    document.getElementById('loadingText').style.display = 'none';
-    updateAskButtonState();
-}
\ No newline at end of file
+    finishRun();
+}
@@ -0,0 +1,123 @@
+"""
+Pre-serialized, compressed and conditional HTTP responses for the web UI.
+
+Bodies are built once per version of their source (a file's mtime/size, or the
+catalog version and startup status for /server-info) and kept with gzip and,
+when the optional `brotli` package is installed, brotli variants plus a strong
+ETag. Handlers answer matching If-None-Match requests with 304 Not Modified.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressing tiny bodies costs more than it saves.
+_MIN_COMPRESS_SIZE = 512
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript")
+
+
+@dataclass
+class CachedResponse:
+    """A response body with its precomputed encodings and ETags."""
+    content_type: str
+    cache_control: str
+    # encoding ("identity", "gzip", "br") -> (body, etag)
+    variants: dict[str, tuple[bytes, str]] = field(default_factory=dict)
+
+    def etags(self) -> set[str]:
+        return {etag for _, etag in self.variants.values()}
+
+    def select(self, accept_encoding: str | None) -> tuple[str, bytes, str]:
+        """Pick the best variant for an Accept-Encoding header: (encoding, body, etag)."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return (encoding, *self.variants[encoding])
+        return ("identity", *self.variants["identity"])
+
+
+def build_response(body: bytes, content_type: str, cache_control: str = "no-cache") -> CachedResponse:
+    """Build a CachedResponse for *body*, compressing it if worthwhile."""
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    response = CachedResponse(content_type, cache_control)
+    response.variants["identity"] = (body, f'"{digest}"')
+    if len(body) >= _MIN_COMPRESS_SIZE and content_type.startswith(_COMPRESSIBLE_TYPES):
+        # mtime=0 keeps the gzip bytes (and so the ETag) stable across rebuilds.
+        response.variants["gzip"] = (gzip.compress(body, compresslevel=6, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            response.variants["br"] = (brotli.compress(body, quality=5), f'"{digest}-br"')
+    return response
+
+
+def if_none_match(header: str | None, response: CachedResponse) -> bool:
+    """Return True if an If-None-Match header matches any variant of *response*."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return not candidates.isdisjoint(response.etags())
+
+
+def _parse_accept_encoding(header: str | None) -> dict[str, float]:
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+class ResponseCache:
+    """Thread-safe cache of CachedResponse objects, each rebuilt only when its version changes."""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[Any, CachedResponse]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: Any, build: Callable[[], CachedResponse]) -> CachedResponse:
+        """Return the cached response for *key*, calling *build* if *version* changed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+        response = build()
+        with self._lock:
+            self._entries[key] = (version, response)
+        return response
+
+    def get_file(self, path: str, content_type: str, cache_control: str = "no-cache") -> CachedResponse | None:
+        """Return the cached response for a static file, re-reading it only when it changed on disk."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        def build() -> CachedResponse:
+            with open(path, "rb") as f:
+                return build_response(f.read(), content_type, cache_control)
+
+        return self.get(f"file:{path}", (stat.st_mtime_ns, stat.st_size), build)
+
+    def invalidate(self, prefix: str = "") -> None:
+        """Drop every entry whose key starts with *prefix* (all entries by default)."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
@@ -0,0 +1,92 @@
+// Agent runs over one WebSocket (see web/websocket.py): runs are multiplexed by id,
+// can be cancelled, and are paced by the credit this side grants as it handles events.
+// Loaded before app.js, so everything here is global.
+
+// Events a run may send before this side grants more; half of it is granted back at a time.
+const RUN_CREDIT = 64;
+
+class RunSocket {
+    constructor(url) {
+        this.url = url;
+        this.ws = null;
+        this.opening = null;
+        // Frame code -> [event type, ...field names], from the server's hello message.
+        this.frames = {};
+        // Run id -> { onEvent, handled }
+        this.runs = new Map();
+        this.nextId = 1;
+    }
+
+    static supported() {
+        return typeof WebSocket !== 'undefined';
+    }
+
+    /** Connect (once; again after the connection drops). Rejects if the server doesn't accept WebSockets. */
+    open() {
+        if (this.opening) return this.opening;
+        this.opening = new Promise((resolve, reject) => {
+            const ws = new WebSocket(this.url);
+            ws.onmessage = (e) => {
+                const message = JSON.parse(e.data);
+                if (Array.isArray(message)) {
+                    this._dispatch(message);
+                } else if (message.op === 'hello') {
+                    this.frames = message.frames;
+                    resolve(this);
+                } else if (message.op === 'error') {
+                    this._fail(message.id, message.error);
+                }
+            };
+            ws.onclose = () => {
+                reject(new Error('WebSocket connection failed'));
+                this.ws = null;
+                this.opening = null;
+                for (const id of [...this.runs.keys()]) this._fail(id, 'Connection closed');
+            };
+            this.ws = ws;
+        });
+        return this.opening;
+    }
+
+    /** Start a run; onEvent gets the same {type, ...} events as the /ask SSE stream. Returns the run id. */
+    async ask(question, onEvent, { profile = false } = {}) {
+        await this.open();
+        const id = 'r' + this.nextId++;
+        this.runs.set(id, { onEvent, handled: 0 });
+        this.ws.send(JSON.stringify({ op: 'ask', id, question, profile, credit: RUN_CREDIT }));
+        return id;
+    }
+
+    /** Ask the server to stop a run; it still ends with a "done" event (cancelled: true). */
+    cancel(id) {
+        if (this.ws && this.runs.has(id)) this.ws.send(JSON.stringify({ op: 'cancel', id }));
+    }
+
+    _dispatch(frame) {
+        const [id, code, ...values] = frame;
+        const run = this.runs.get(id);
+        if (!run) return;
+        let data;
+        if (code === 'o') {
+            data = values[0];
+        } else {
+            const [type, ...names] = this.frames[code] || [code];
+            data = { type };
+            // Trailing nulls are left out of frames.
+            names.forEach((name, i) => { data[name] = i < values.length ? values[i] : null; });
+        }
+        if (data.type === 'done') this.runs.delete(id);
+        run.onEvent(data);
+        if (data.type !== 'done' && ++run.handled >= RUN_CREDIT / 2) {
+            this.ws.send(JSON.stringify({ op: 'credit', id, n: run.handled }));
+            run.handled = 0;
+        }
+    }
+
+    _fail(id, error) {
+        const run = this.runs.get(id);
+        if (!run) return;
+        this.runs.delete(id);
+        run.onEvent({ type: 'done', success: false, error, ended_at: Date.now() / 1000 });
+    }
+}
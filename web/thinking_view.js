@@ -0,0 +1,287 @@
+// Agent reasoning pane: SSE parsing, event formatting and a virtualized, append-only view.
+// Loaded before app.js (and by the thinking benchmark page), so everything here is global.
+
+/** Format a byte/character count for display. */
+function formatSize(size) {
+    if (size == null) return '?';
+    if (size < 1024) return size + ' B';
+    if (size < 1024 * 1024) return (size / 1024).toFixed(1) + ' KB';
+    return (size / (1024 * 1024)).toFixed(1) + ' MB';
+}
+
+/** Format seconds between two Unix timestamps. */
+function formatDuration(start, end) {
+    return ((end - start) || 0).toFixed(2) + 's';
+}
+
+/** Turn a typed tool_call / tool_result / tool_progress / llm_turn event into a reasoning line. */
+function formatAgentEvent(data) {
+    if (data.type === 'tool_call') {
+        return `[tools] Calling tool: ${data.name} with args: ${JSON.stringify(data.args)}`;
+    }
+    if (data.type === 'tool_result') {
+        const status = data.is_error ? ', error' : '';
+        return `[tools] Tool result from ${data.name} (${formatDuration(data.started_at, data.ended_at)}, ` +
+            `${formatSize(data.size)}${status}): ${data.preview}`;
+    }
+    if (data.type === 'tool_progress') {
+        const message = data.message ? ` - ${data.message}` : '';
+        if (data.level) return `[tools] ${data.name} ${data.level}: ${data.message}`;
+        if (data.percent == null) return `[tools] ${data.name}: progress ${data.progress}${message}`;
+        const eta = data.eta_seconds != null ? `, ETA ${Math.round(data.eta_seconds)}s` : '';
+        return `[tools] ${data.name}: ${data.percent}% after ${data.elapsed_seconds.toFixed(1)}s${eta}${message}`;
+    }
+    if (data.type === 'llm_turn') {
+        const tokens = data.input_tokens != null
+            ? `, ${data.input_tokens} in / ${data.output_tokens} out tokens` : '';
+        return `[model] ${data.turn_id} on ${data.model || 'model'} ` +
+            `(${formatDuration(data.requested_at, data.ended_at)}${tokens})`;
+    }
+    return null;
+}
+
+/**
+ * Split buffered SSE text into parsed `data:` payloads.
+ * Returns { events, rest } where `rest` is an incomplete trailing event to keep buffering.
+ */
+function splitSSEEvents(buffer) {
+    const chunks = buffer.split('\n\n');
+    const rest = chunks.pop() || '';
+    const events = [];
+    for (const chunk of chunks) {
+        const data = parseSSEData(chunk);
+        if (data) events.push(data);
+    }
+    return { events, rest };
+}
+
+/** Parse the JSON `data:` line of a single SSE event, or return null. */
+function parseSSEData(chunk) {
+    const match = chunk.match(/^data:\s*(.+)$/m);
+    if (!match) return null;
+    try {
+        return JSON.parse(match[1].trim());
+    } catch (e) {
+        console.warn('SSE parse:', e);
+        return null;
+    }
+}
+
+/**
+ * Virtualized list of reasoning entries.
+ *
+ * append() only queues text; the DOM is updated once per animation frame, so a
+ * burst of SSE events costs one layout instead of one per event. New entries are
+ * appended to the DOM, never re-rendered. Once the list grows past
+ * `maxRendered` entries, only the entries near the viewport stay in the DOM and
+ * spacers stand in for the rest, using each entry's measured height. Entries
+ * longer than `collapseChars` render as a collapsed preview whose full text is
+ * only put in the DOM when expanded.
+ */
+class ThinkingView {
+    constructor(container, options = {}) {
+        this.container = container;
+        this.collapseChars = options.collapseChars || 600;
+        this.previewChars = options.previewChars || 200;
+        this.maxRendered = options.maxRendered || 200;
+        this.overscanPx = options.overscanPx || 800;
+        this.estimatedHeight = options.estimatedHeight || 44;
+        this.placeholder = options.placeholder || '';
+
+        this.container.classList.add('thinking-view');
+        this.container.addEventListener('scroll', () => this._scheduleWindow(), { passive: true });
+        this.clear();
+    }
+
+    /** Remove every entry. */
+    clear() {
+        this.entries = [];
+        this.pending = [];
+        // Rendered slice of `entries` is [first, last).
+        this.first = 0;
+        this.last = 0;
+        this.frame = null;
+        this.windowFrame = null;
+        this.pinned = true;
+        this.container.replaceChildren();
+        this.topSpacer = this._spacer();
+        this.list = document.createElement('div');
+        this.bottomSpacer = this._spacer();
+        this.empty = document.createElement('div');
+        this.empty.className = 'thinking-placeholder';
+        this.empty.textContent = this.placeholder;
+        this.container.append(this.empty, this.topSpacer, this.list, this.bottomSpacer);
+    }
+
+    /** Queue an entry; it is rendered on the next animation frame. */
+    append(text, kind = 'thinking') {
+        this.pending.push({ text: String(text), kind, height: null, expanded: false });
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => this.flush());
+        }
+    }
+
+    /** Replace all entries with `text`, split on blank lines (used for a final transcript). */
+    setText(text) {
+        this.clear();
+        for (const part of String(text || '').split('\n\n')) {
+            if (part.trim()) this.append(part);
+        }
+    }
+
+    /** Full transcript text, including entries outside the rendered window. */
+    getText() {
+        return this.entries.concat(this.pending).map(e => e.text).join('\n\n');
+    }
+
+    get length() {
+        return this.entries.length + this.pending.length;
+    }
+
+    /** Render queued entries now. Called from requestAnimationFrame. */
+    flush() {
+        if (this.frame !== null) {
+            cancelAnimationFrame(this.frame);
+            this.frame = null;
+        }
+        if (this.pending.length === 0) return;
+        const added = this.pending;
+        this.pending = [];
+        const start = this.entries.length;
+        this.entries.push(...added);
+        this.empty.style.display = 'none';
+
+        const el = this.container;
+        this.pinned = el.scrollTop + el.clientHeight >= el.scrollHeight - 8;
+        if (this.last === start && (this.pinned || this.last - this.first < this.maxRendered)) {
+            // Append-only fast path: the window already ends at the tail.
+            // A burst larger than the window only renders its own tail.
+            const from = Math.max(start, this.entries.length - this.maxRendered);
+            if (from > start) {
+                this.list.replaceChildren();
+                this.first = from;
+            }
+            const fragment = document.createDocumentFragment();
+            for (let i = from; i < this.entries.length; i++) {
+                fragment.appendChild(this._render(i));
+            }
+            this.list.appendChild(fragment);
+            this.last = this.entries.length;
+            this._measure();
+            this._trimTop();
+        } else {
+            // The user scrolled back; the new entries only grow the bottom spacer.
+            this._updateSpacers();
+        }
+        if (this.pinned) el.scrollTop = el.scrollHeight;
+    }
+
+    _spacer() {
+        const spacer = document.createElement('div');
+        spacer.className = 'thinking-spacer';
+        return spacer;
+    }
+
+    _height(entry) {
+        return entry.height == null ? this.estimatedHeight : entry.height;
+    }
+
+    _render(index) {
+        const entry = this.entries[index];
+        const node = document.createElement('div');
+        node.className = 'thinking-entry thinking-' + entry.kind;
+        node.dataset.index = index;
+        if (entry.text.length <= this.collapseChars) {
+            node.textContent = entry.text;
+            return node;
+        }
+        const details = document.createElement('details');
+        const summary = document.createElement('summary');
+        summary.textContent = entry.text.slice(0, this.previewChars) +
+            `... (${formatSize(entry.text.length)}, click to expand)`;
+        details.appendChild(summary);
+        const body = document.createElement('div');
+        body.className = 'thinking-entry-body';
+        details.appendChild(body);
+        const fill = () => {
+            // The full text is only put in the DOM while expanded.
+            body.textContent = details.open ? entry.text : '';
+            entry.expanded = details.open;
+            entry.height = node.offsetHeight;
+            this._updateSpacers();
+        };
+        details.addEventListener('toggle', fill);
+        if (entry.expanded) {
+            details.open = true;
+            body.textContent = entry.text;
+        }
+        node.appendChild(details);
+        return node;
+    }
+
+    _measure() {
+        for (const node of this.list.children) {
+            this.entries[node.dataset.index].height = node.offsetHeight;
+        }
+    }
+
+    /** Drop entries from the top of the DOM while more than maxRendered are shown. */
+    _trimTop() {
+        while (this.last - this.first > this.maxRendered && this.list.firstChild) {
+            this.list.removeChild(this.list.firstChild);
+            this.first++;
+        }
+        this._updateSpacers();
+    }
+
+    _updateSpacers() {
+        let top = 0;
+        let bottom = 0;
+        for (let i = 0; i < this.first; i++) top += this._height(this.entries[i]);
+        for (let i = this.last; i < this.entries.length; i++) bottom += this._height(this.entries[i]);
+        this.topSpacer.style.height = top + 'px';
+        this.bottomSpacer.style.height = bottom + 'px';
+    }
+
+    _scheduleWindow() {
+        if (this.windowFrame !== null) return;
+        this.windowFrame = requestAnimationFrame(() => {
+            this.windowFrame = null;
+            this._renderWindow();
+        });
+    }
+
+    /** Re-render the slice of entries around the current scroll position. */
+    _renderWindow() {
+        const el = this.container;
+        this.pinned = el.scrollTop + el.clientHeight >= el.scrollHeight - 8;
+        if (this.entries.length <= this.maxRendered) {
+            if (this.first === 0 && this.last === this.entries.length) return;
+        }
+        const top = el.scrollTop - this.overscanPx;
+        const bottom = el.scrollTop + el.clientHeight + this.overscanPx;
+        let offset = 0;
+        let first = 0;
+        while (first < this.entries.length - 1 && offset + this._height(this.entries[first]) < top) {
+            offset += this._height(this.entries[first]);
+            first++;
+        }
+        let last = first;
+        while (last < this.entries.length && offset < bottom && last - first < this.maxRendered) {
+            offset += this._height(this.entries[last]);
+            last++;
+        }
+        if (first === this.first && last === this.last) return;
+
+        const fragment = document.createDocumentFragment();
+        for (let i = first; i < last; i++) {
+            fragment.appendChild(this._render(i));
+        }
+        this.list.replaceChildren(fragment);
+        this.first = first;
+        this.last = last;
+        this._measure();
+        this._updateSpacers();
+        if (this.pinned) el.scrollTop = el.scrollHeight;
+    }
+}
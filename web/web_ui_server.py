@@ -1,18 +1,159 @@
 import asyncio
+import concurrent.futures
+import dataclasses
+import hashlib
 import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import parse_qs, urlparse
-from threading import Thread
+import os
+import queue
+import re
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from threading import Lock, Thread
 import webbrowser
 
-from client.agent_backend import ThinkingChunk, FinalChunk
+from client import metrics
+from client.health import health_monitor
+from client.loop_monitor import monitor_loop
+from client.memory import memory_tracker
+from client.profiling import list_profiles, profile_path, profile_stats, register_loop, start_profile
+from client.agent_backend import (
+    ThinkingChunk, ToolCallChunk, ToolResultChunk, ToolProgressChunk, LLMTurnChunk, FinalChunk,
+)
+from client.tool_progress import report_progress
+from web.response_cache import CachedResponse, ResponseCache, build_response, if_none_match
+from web.websocket import WS_ENABLED, RunChannel, WebSocket, accept_key, origin_allowed
+
+_WEB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Typed agent chunks sent as their own SSE event types, with the dataclass fields as data.
+_SSE_EVENT_TYPES = {
+    ToolCallChunk: 'tool_call',
+    ToolResultChunk: 'tool_result',
+    ToolProgressChunk: 'tool_progress',
+    LLMTurnChunk: 'llm_turn',
+}
+
+# /t/{tenant}/rest-of-path selects a tenant (see client/tenants.py).
+_TENANT_PATH = re.compile(r'^/t/([^/]+)(/.*)?$')
+
+
+async def _run_agent(agent, question: str, profiler, send, paced=None):
+    """Run *question* and report its events through send(obj, event); shared by /ask (SSE) and /ws.
+
+    *paced*, if given, is awaited after each agent chunk, so the transport can
+    hold the run back while its client catches up.
+    """
+    def send_chunk(chunk):
+        event_type = _SSE_EVENT_TYPES[type(chunk)]
+        send({"type": event_type, **dataclasses.asdict(chunk)}, event=event_type)
+
+    # Server-side timestamps anchor the UI's run timeline, so browser clock skew doesn't matter.
+    run_started = {"type": "run_started", "started_at": time.time()}
+    if profiler is not None:
+        run_started["profile_id"] = profiler.run_id
+    send(run_started, event="run_started")
+    try:
+        # Progress of running tool calls arrives out of band, possibly on another loop.
+        with report_progress(send_chunk):
+            async for chunk in agent.astream(question):
+                if type(chunk) in _SSE_EVENT_TYPES:
+                    send_chunk(chunk)
+                elif isinstance(chunk, ThinkingChunk):
+                    send({"type": "thinking", "content": chunk.content})
+                elif isinstance(chunk, FinalChunk):
+                    if chunk.success:
+                        # The thinking was already streamed step by step; don't send it again.
+                        send({"type": "done", "success": True, "response": chunk.response, "ended_at": time.time()})
+                    else:
+                        send({"type": "done", "success": False, "error": chunk.error, "ended_at": time.time()})
+                if paced is not None:
+                    await paced()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        send({"type": "done", "success": False, "error": str(e), "ended_at": time.time()})
+
+
+class WebEventLoop:
+    """One long-lived event loop, in its own thread, that runs the async work of every request.
+
+    Requests are handled on their own threads, but agent runs and prompt fetches
+    all run here, so connection pools bound to a loop (httpx, the MCP
+    transport) stay warm across requests.
+    """
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = Lock()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule *coro* on the loop, starting the loop thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                Thread(target=self._loop.run_forever, name="web-event-loop", daemon=True).start()
+                register_loop("web", self._loop)
+                monitor_loop("web", self._loop)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
 
 
 class WebUIHandler(BaseHTTPRequestHandler):
+    # URL path -> (file under web/, content type, Cache-Control). The HTML, JS and CSS
+    # are revalidated on every load (cheap 304s) so edits show up without a hard refresh.
+    _STATIC_FILES = {
+        '/': ('web_ui.html', 'text/html; charset=utf-8', 'no-cache'),
+        '/index.html': ('web_ui.html', 'text/html; charset=utf-8', 'no-cache'),
+        '/app.js': ('app.js', 'application/javascript', 'no-cache'),
+        '/thinking_view.js': ('thinking_view.js', 'application/javascript', 'no-cache'),
+        '/run_socket.js': ('run_socket.js', 'application/javascript', 'no-cache'),
+        '/bench/thinking': ('thinking_bench.html', 'text/html; charset=utf-8', 'no-cache'),
+        '/styles.css': ('styles.css', 'text/css', 'no-cache'),
+        '/assets/logo.png': (os.path.join('assets', 'logo.png'), 'image/png', 'public, max-age=3600'),
+    }
+    response_cache = ResponseCache()
+    web_loop = WebEventLoop()
+    # tenant id -> TenantRuntime (client/tenants.py); None when only the default tenant is served.
+    get_tenant = None
+
+    def _route(self, path: str) -> str | None:
+        """Pick the tenant from the X-Visier-Tenant header or a /t/{tenant}/ prefix and return the path without it.
+
+        Sets self.app to the object providing the callbacks (get_agent, get_tools, ...):
+        the handler class itself for the default tenant, else the tenant's runtime.
+        Sends a 404 and returns None for an unknown tenant.
+        """
+        tenant_id = self.headers.get('X-Visier-Tenant')
+        match = _TENANT_PATH.match(path)
+        if match:
+            tenant_id = unquote(match.group(1))
+            path = match.group(2) or '/'
+        self.app, self.tenant_id = WebUIHandler, None
+        if not tenant_id:
+            return path
+        runtime = WebUIHandler.get_tenant(tenant_id) if WebUIHandler.get_tenant is not None else None
+        if runtime is None:
+            self._send_json_response({'success': False, 'error': f"Unknown tenant '{tenant_id}'"}, status=404)
+            return None
+        self.app, self.tenant_id = runtime, tenant_id
+        return path
+
+    def _cache_key(self, key: str) -> str:
+        return f"{self.tenant_id}/{key}" if self.tenant_id else key
+
     def do_GET(self):
         # Parse the URL to get the path without query parameters
         parsed_url = urlparse(self.path)
-        path = parsed_url.path
+        if parsed_url.path in ('/healthz', '/readyz'):
+            # Process-wide probes for load balancers; not tenant-scoped.
+            status = WebUIHandler.get_status() if hasattr(WebUIHandler, 'get_status') else {}
+            probe = health_monitor.liveness if parsed_url.path == '/healthz' else health_monitor.readiness
+            code, report = probe(status)
+            self._send_json_response(report, status=code)
+            return
+        path = self._route(parsed_url.path)
+        if path is None:
+            return
         
         if path == '/callback':
             # Handle OAuth callback
@@ -29,90 +170,218 @@ class WebUIHandler(BaseHTTPRequestHandler):
             else:
                 self.wfile.write(b"<h1>Login Failed</h1><p>No code found.</p>")
         
-        elif path == '/' or path == '/index.html':
-            # Serve the web UI
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            
-            try:
-                # Get the directory where this script is located
-                import os
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                html_path = os.path.join(script_dir, 'web_ui.html')
-                with open(html_path, 'r', encoding='utf-8') as f:
-                    self.wfile.write(f.read().encode('utf-8'))
-            except FileNotFoundError:
-                self.wfile.write(b"<h1>Error</h1><p>web_ui.html not found</p>")
-        
-        elif path == '/server-info':
-            # Serve server info
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            server_url = "Server URL not available"
-            model_name = "Model not available"
-            tools_list = []
-            prompts_list = []
-
-            if hasattr(WebUIHandler, 'get_server_url'):
-                server_url = WebUIHandler.get_server_url()
-            if hasattr(WebUIHandler, 'get_model_name'):
-                model_name = WebUIHandler.get_model_name()
-            if hasattr(WebUIHandler, 'get_tools'):
-                tools_list = WebUIHandler.get_tools()
-            if hasattr(WebUIHandler, 'get_prompts'):
-                prompts_list = WebUIHandler.get_prompts()
-
-            response_data = {
-                'success': True,
-                'serverUrl': server_url,
-                'modelName': model_name,
-                'tools': tools_list,
-                'prompts': prompts_list
-            }
-            self.wfile.write(json.dumps(response_data).encode('utf-8'))
-        
-        elif path == '/assets/logo.png' or path == '/styles.css' or path == '/app.js':
-            import os
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            
-            if path == '/assets/logo.png':
-                asset_path = os.path.join(script_dir, 'assets', 'logo.png')
-                content_type = 'image/png'
-            elif path == '/styles.css':
-                asset_path = os.path.join(script_dir, 'styles.css')
-                content_type = 'text/css'
-            elif path == '/app.js':
-                asset_path = os.path.join(script_dir, 'app.js')
-                content_type = 'application/javascript'
-            
-            try:
-                with open(asset_path, 'rb') as f:
-                    content = f.read()
-                    
-                self.send_response(200)
-                self.send_header('Content-type', content_type)
-                self.send_header('Cache-Control', 'public, max-age=3600')
-                self.end_headers()
-                self.wfile.write(content)
-                
-            except FileNotFoundError:
+        elif path in self._STATIC_FILES:
+            # Serve the web UI and its assets from the response cache
+            file_name, content_type, cache_control = self._STATIC_FILES[path]
+            cached = WebUIHandler.response_cache.get_file(os.path.join(_WEB_DIR, file_name), content_type, cache_control)
+            if cached is None:
                 self.send_response(404)
                 self.send_header('Content-type', 'text/plain')
                 self.end_headers()
                 self.wfile.write(b"Asset not found")
-        
+            else:
+                self._send_cached_response(cached)
+
+        elif path == '/server-info':
+            # Serve server info; tool schemas are fetched separately from /tools/{name}
+            self._send_cached_response(self._server_info_response())
+
+        elif path.startswith('/tools/'):
+            # Serve one tool's full definition, including its parameter schema
+            cached = self._tool_response(unquote(path[len('/tools/'):]))
+            if cached is None:
+                self._send_json_response({'success': False, 'error': 'Tool not found'}, status=404)
+            else:
+                self._send_cached_response(cached)
+
+        elif path == '/metrics':
+            # Serve in-process metrics (LLM routing, latency, ...)
+            self._send_json_response(metrics.snapshot())
+
+        elif path == '/profiles':
+            # List saved run profiles (see client/profiling.py)
+            self._send_json_response({'enabled': profile_stats.enabled, 'profiles': list_profiles()})
+
+        elif path.startswith('/profiles/'):
+            # Download one run's collapsed stacks (.folded) or task dumps (.json)
+            file_path = profile_path(path[len('/profiles/'):])
+            if file_path is None:
+                self._send_json_response({'success': False, 'error': 'Profile not found'}, status=404)
+            else:
+                with open(file_path, 'rb') as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json' if file_path.endswith('.json') else 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(file_path)}"')
+                self.end_headers()
+                self.wfile.write(body)
+
+        elif path == '/memory':
+            # Memory growth since the baseline, per module and source line (see client/memory.py)
+            self._send_json_response(memory_tracker.report())
+
+        elif path == '/ws' and WS_ENABLED:
+            # Many runs over one WebSocket, with cancel and flow control (see web/websocket.py)
+            self._serve_websocket()
+
         else:
             self.send_response(404)
             self.send_header('Content-type', 'text/plain')
             self.end_headers()
             self.wfile.write(b"Not found")
-    
+
+    def _serve_websocket(self):
+        """Upgrade the request to a WebSocket and serve runs on it until the client goes away."""
+        key = self.headers.get('Sec-WebSocket-Key')
+        if (self.headers.get('Upgrade', '').lower() != 'websocket'
+                or 'upgrade' not in self.headers.get('Connection', '').lower() or not key):
+            self._send_json_response({'success': False, 'error': 'Expected a WebSocket upgrade'}, status=400)
+            return
+        if self.headers.get('Sec-WebSocket-Version') != '13':
+            self.send_response(426)
+            self.send_header('Sec-WebSocket-Version', '13')
+            self.end_headers()
+            return
+        if not origin_allowed(self.headers.get('Origin'), self.headers.get('Host')):
+            self._send_json_response({'success': False, 'error': 'Origin not allowed'}, status=403)
+            return
+
+        # Browsers expect an HTTP/1.1 status line for the handshake.
+        self.protocol_version = 'HTTP/1.1'
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept_key(key))
+        self.end_headers()
+        self.close_connection = True
+
+        app = self.app
+
+        def start_run(question, profile, send, paced):
+            agent = app.get_agent() if hasattr(app, 'get_agent') else None
+            if agent is None:
+                raise RuntimeError('Agent not ready yet - please wait for authentication to complete')
+            profiler = start_profile(question, requested=profile)
+
+            held_done = []
+
+            def send_event(obj, event=None):
+                # A profiled run's "done" waits until the profile is saved, below.
+                if obj.get("type") == "done" and profiler is not None:
+                    held_done.append(obj)
+                else:
+                    send(obj)
+
+            async def run():
+                try:
+                    await _run_agent(agent, question, profiler, send_event, paced)
+                finally:
+                    if profiler is not None:
+                        # Joins the sampler thread and writes the profile files; off the shared loop.
+                        run_id = await asyncio.to_thread(profiler.stop)
+                        for obj in held_done:
+                            send({**obj, "profile_url": f"/profiles/{run_id}.folded"})
+
+            return WebUIHandler.web_loop.submit(run())
+
+        channel = RunChannel(WebSocket(self.rfile, self.wfile), start_run)
+        if self.tenant_id is not None:
+            # Keep the tenant's runtime from being evicted while the connection is open.
+            with app.in_use():
+                channel.serve()
+        else:
+            channel.serve()
+
+    def _server_info_response(self) -> CachedResponse:
+        server_url = "Server URL not available"
+        model_name = "Model not available"
+        status = {'ready': False, 'state': 'starting'}
+
+        if hasattr(self.app, 'get_server_url'):
+            server_url = self.app.get_server_url()
+        if hasattr(self.app, 'get_model_name'):
+            model_name = self.app.get_model_name()
+        if hasattr(self.app, 'get_status'):
+            status = self.app.get_status()
+
+        def build() -> CachedResponse:
+            tools_list = self.app.get_tools() if hasattr(self.app, 'get_tools') else []
+            prompts_list = self.app.get_prompts() if hasattr(self.app, 'get_prompts') else []
+            response_data = {
+                'success': True,
+                'serverUrl': server_url,
+                'modelName': model_name,
+                'tools': [
+                    {'name': t.get('name'), 'description': t.get('description')}
+                    for t in tools_list
+                ],
+                'prompts': prompts_list,
+                'status': status
+            }
+            return build_response(json.dumps(response_data).encode('utf-8'), 'application/json')
+
+        # The body only changes with the catalog version, the startup status or the model.
+        version = (server_url, model_name, json.dumps(status, sort_keys=True, default=str))
+        return WebUIHandler.response_cache.get(self._cache_key('server-info'), version, build)
+
+    def _tool_response(self, name: str) -> CachedResponse | None:
+        tools_list = self.app.get_tools() if hasattr(self.app, 'get_tools') else []
+        tool = next((t for t in tools_list if t.get('name') == name), None)
+        if tool is None:
+            return None
+        status = self.app.get_status() if hasattr(self.app, 'get_status') else {}
+
+        # Keyed on the tool's content too, in case the catalog is swapped without a version bump.
+        digest = hashlib.sha1(json.dumps(tool, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+        def build() -> CachedResponse:
+            body = json.dumps({'success': True, 'tool': tool}, default=str).encode('utf-8')
+            return build_response(body, 'application/json')
+
+        return WebUIHandler.response_cache.get(self._cache_key(f'tool:{name}'), (status.get('catalogVersion'), digest), build)
+
+    def _send_cached_response(self, cached: CachedResponse):
+        if if_none_match(self.headers.get('If-None-Match'), cached):
+            self.send_response(304)
+            self.send_header('ETag', cached.select(self.headers.get('Accept-Encoding'))[2])
+            self.send_header('Cache-Control', cached.cache_control)
+            self.end_headers()
+            return
+
+        encoding, body, etag = cached.select(self.headers.get('Accept-Encoding'))
+        self.send_response(200)
+        self.send_header('Content-type', cached.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cached.cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_POST(self):
-        if self.path == '/get-prompt-content':
+        path = self._route(urlparse(self.path).path)
+        if path is None:
+            return
+        if path == '/profiles/settings':
+            # Admin toggle: profile every run while enabled
+            try:
+                data = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+                profile_stats.set_enabled(bool(data.get('enabled')))
+                self._send_json_response({'success': True, 'enabled': profile_stats.enabled})
+            except Exception as e:
+                self._send_json_response({'success': False, 'error': str(e)}, status=400)
+            return
+
+        if path == '/memory/baseline':
+            # Soak tests: take the baseline /memory compares against
+            self._send_json_response({'success': True, **memory_tracker.set_baseline()})
+            return
+
+        if path == '/get-prompt-content':
             try:
                 content_length = int(self.headers['Content-Length'])
                 post_data = self.rfile.read(content_length)
@@ -122,12 +391,12 @@ class WebUIHandler(BaseHTTPRequestHandler):
                 if not prompt_name:
                     self._send_json_response({'success': False, 'error': 'No prompt selected.'})
                     return
-                if not hasattr(WebUIHandler, 'get_prompt_messages_async') or not callable(getattr(WebUIHandler, 'get_prompt_messages_async', None)):
+                if not callable(getattr(self.app, 'get_prompt_messages_async', None)):
                     self._send_json_response({'success': False, 'error': 'Prompt service not available.'})
                     return
 
                 async def fetch_prompt():
-                    messages = await WebUIHandler.get_prompt_messages_async(prompt_name, prompt_arguments)
+                    messages = await self.app.get_prompt_messages_async(prompt_name, prompt_arguments)
                     parts = []
                     for m in messages:
                         content = str(m).strip()
@@ -135,20 +404,13 @@ class WebUIHandler(BaseHTTPRequestHandler):
                             parts.append(content)
                     return '\n\n'.join(parts) if parts else ''
 
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_closed():
-                        raise RuntimeError("Event loop is closed")
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                prompt_content = loop.run_until_complete(fetch_prompt())
+                prompt_content = WebUIHandler.web_loop.submit(fetch_prompt()).result()
                 self._send_json_response({'success': True, 'promptContent': prompt_content})
             except Exception as e:
                 self._send_json_response({'success': False, 'error': str(e)})
             return
 
-        if self.path == '/ask':
+        if path == '/ask':
             try:
                 # Read request body
                 content_length = int(self.headers['Content-Length'])
@@ -161,8 +423,8 @@ class WebUIHandler(BaseHTTPRequestHandler):
                     return
 
                 # Get the global agent
-                if hasattr(WebUIHandler, 'get_agent'):
-                    agent = WebUIHandler.get_agent()
+                if hasattr(self.app, 'get_agent'):
+                    agent = self.app.get_agent()
                     if agent is None:
                         self._send_json_response({'success': False, 'error': 'Agent not ready yet - please wait for authentication to complete'})
                         return
@@ -170,24 +432,40 @@ class WebUIHandler(BaseHTTPRequestHandler):
                     self._send_json_response({'success': False, 'error': 'Agent service not available'})
                     return
                 
-                def send_sse(obj):
-                    self.wfile.write(("data: " + json.dumps(obj) + "\n\n").encode("utf-8"))
-                    self.wfile.flush()
+                # The run happens on the web event loop; this thread writes its events to the socket,
+                # so a slow client only holds up its own request.
+                events = queue.Queue()
+                profiler = start_profile(
+                    question, requested=self.headers.get('X-Profile', '').lower() in ('1', 'true', 'yes')
+                )
+
+                def send_sse(obj, event=None):
+                    events.put((obj, event))
 
                 async def stream_agent():
                     try:
-                        async for chunk in agent.astream(question):
-                            if isinstance(chunk, ThinkingChunk):
-                                send_sse({"type": "thinking", "content": chunk.content})
-                            elif isinstance(chunk, FinalChunk):
-                                if chunk.success:
-                                    send_sse({"type": "done", "success": True, "response": chunk.response, "thinking": chunk.thinking})
-                                else:
-                                    send_sse({"type": "done", "success": False, "error": chunk.error})
-                    except Exception as e:
-                        import traceback
-                        traceback.print_exc()
-                        send_sse({"type": "done", "success": False, "error": str(e)})
+                        await _run_agent(agent, question, profiler, send_sse)
+                    finally:
+                        events.put(None)
+
+                def write_events():
+                    run = WebUIHandler.web_loop.submit(stream_agent())
+                    try:
+                        while (item := events.get()) is not None:
+                            obj, event = item
+                            if obj.get("type") == "done" and profiler is not None:
+                                # Saved before the UI hears the run is done, so the link works straight away.
+                                obj = {**obj, "profile_url": f"/profiles/{profiler.stop()}.folded"}
+                            # The "type" field is kept in the data for clients that ignore SSE event names.
+                            prefix = f"event: {event}\n" if event else ""
+                            self.wfile.write((prefix + "data: " + json.dumps(obj, default=str) + "\n\n").encode("utf-8"))
+                            self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The browser went away; stop the run instead of finishing it for nobody.
+                        run.cancel()
+                    finally:
+                        if profiler is not None:
+                            profiler.stop()
 
                 self.send_response(200)
                 self.send_header("Content-Type", "text/event-stream")
@@ -195,14 +473,12 @@ class WebUIHandler(BaseHTTPRequestHandler):
                 self.send_header("Connection", "close")
                 self.send_header("Access-Control-Allow-Origin", "*")
                 self.end_headers()
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_closed():
-                        raise RuntimeError("Event loop is closed")
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                loop.run_until_complete(stream_agent())
+                if self.tenant_id is not None:
+                    # Keep the tenant's runtime from being evicted while the run streams.
+                    with self.app.in_use():
+                        write_events()
+                else:
+                    write_events()
                 return
             except Exception as e:
                 self._send_json_response({'success': False, 'error': str(e)})
@@ -210,8 +486,8 @@ class WebUIHandler(BaseHTTPRequestHandler):
             self.send_response(404)
             self.end_headers()
     
-    def _send_json_response(self, data):
-        self.send_response(200)
+    def _send_json_response(self, data, status=200):
+        self.send_response(status)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
@@ -222,10 +498,16 @@ class WebUIHandler(BaseHTTPRequestHandler):
         pass
 
 
+class _ReusePortHTTPServer(ThreadingHTTPServer):
+    # Lets several worker processes listen on the same UI port (see client/supervisor.py).
+    allow_reuse_port = True
+
+
 class WebUIServer:
-    def __init__(self, oauth_port=8000, ui_port=8001):
+    def __init__(self, oauth_port=8000, ui_port=8001, reuse_port=False):
         self.oauth_port = oauth_port
         self.ui_port = ui_port
+        self.reuse_port = reuse_port
         
     def set_callbacks(
         self,
@@ -236,8 +518,9 @@ class WebUIServer:
         get_tools_func=None,
         get_prompts_func=None,
         get_prompt_messages_async=None,
+        get_status_func=None,
     ):
-        """Set the callback functions for OAuth, agent access, server URL, model name, tools, and prompt resolution."""
+        """Set the callback functions for OAuth, agent access, server URL, model name, tools, prompt resolution, and startup status."""
         WebUIHandler.callback_handler = callback_handler
         WebUIHandler.get_agent = get_agent_func
         if get_server_url_func:
@@ -250,6 +533,27 @@ class WebUIServer:
             WebUIHandler.get_prompts = get_prompts_func
         if get_prompt_messages_async is not None:
             WebUIHandler.get_prompt_messages_async = get_prompt_messages_async
+        if get_status_func:
+            WebUIHandler.get_status = get_status_func
+
+    def run_async(self, coro) -> concurrent.futures.Future:
+        """Run *coro* on the web event loop, where questions run (e.g. to warm its connection pools)."""
+        return WebUIHandler.web_loop.submit(coro)
+
+    def prime_cache(self):
+        """Build the cached static files, /server-info and /tools/{name} responses before the first page load."""
+        for file_name, content_type, cache_control in WebUIHandler._STATIC_FILES.values():
+            WebUIHandler.response_cache.get_file(os.path.join(_WEB_DIR, file_name), content_type, cache_control)
+        # Only the response builders are used, so no request is needed.
+        handler = WebUIHandler.__new__(WebUIHandler)
+        handler.app, handler.tenant_id = WebUIHandler, None
+        handler._server_info_response()
+        for tool in (WebUIHandler.get_tools() if hasattr(WebUIHandler, 'get_tools') else []):
+            handler._tool_response(tool.get('name'))
+
+    def set_tenant_resolver(self, get_tenant_func):
+        """Serve extra tenants: get_tenant_func(tenant_id) returns a TenantRuntime or None."""
+        WebUIHandler.get_tenant = staticmethod(get_tenant_func)
 
     def start_oauth_server(self):
         """Start the OAuth callback server"""
@@ -258,7 +562,9 @@ class WebUIServer:
         
     def start_ui_server(self):
         """Start the web UI server"""
-        server = HTTPServer(('localhost', self.ui_port), WebUIHandler)
+        # Threaded, so health probes and page loads are answered while a question streams.
+        server_class = _ReusePortHTTPServer if self.reuse_port else ThreadingHTTPServer
+        server = server_class(('localhost', self.ui_port), WebUIHandler)
         print(f"\nWeb UI available at: http://localhost:{self.ui_port}")
         server.serve_forever()
         
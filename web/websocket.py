@@ -0,0 +1,479 @@
+"""
+WebSocket transport for agent runs (GET /ws).
+
+Every POST /ask streams one run over its own SSE response, so a page that asks
+many questions at once uses up the browser's per-host connection limit, and a
+run can only be stopped by dropping its connection. Over /ws one connection
+carries any number of runs:
+
+- client -> server, JSON text messages:
+    {"op": "ask", "id": "r1", "question": "...", "profile": false, "credit": 64}
+    {"op": "cancel", "id": "r1"}
+    {"op": "credit", "id": "r1", "n": 32}
+- server -> client: a {"op": "hello", "frames": {...}} message first, then one
+  compact JSON array per run event: [run id, frame code, *values]. The hello
+  message maps each frame code to the event type and its field names, so the
+  client can rebuild the same {"type": ..., ...} objects /ask sends. Trailing
+  null values are left out. {"op": "error", "id": ..., "error": ...} reports a
+  rejected message.
+
+Flow control is per run: a run may send as many events as the client has
+granted credit ("credit" in ask, then "credit" messages as it consumes them).
+Out of credit, the run stops pulling from the agent until more is granted, so
+a slow consumer holds back only its own run. Progress events and the final
+"done" event, which the agent doesn't wait on, are queued instead and the
+"done" event flushes the queue.
+
+The framing (RFC 6455) is implemented here on top of the request handler's
+socket files; there is no extension support (no compression). Connections
+from a browser page must come from the same host, or from an origin listed in
+WS_ALLOWED_ORIGINS.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import fields
+
+from client import metrics
+from client.agent_backend import LLMTurnChunk, ToolCallChunk, ToolProgressChunk, ToolResultChunk
+
+WS_ENABLED = os.environ.get("WS_ENABLED", "true").lower() == "true"
+WS_RUN_CREDIT = int(os.environ.get("WS_RUN_CREDIT", "64"))
+WS_MAX_RUNS = int(os.environ.get("WS_MAX_RUNS", "16"))
+WS_MAX_MESSAGE_BYTES = int(os.environ.get("WS_MAX_MESSAGE_BYTES", str(1024 * 1024)))
+WS_PING_SECONDS = float(os.environ.get("WS_PING_SECONDS", "20"))
+WS_ALLOWED_ORIGINS = {o.strip() for o in os.environ.get("WS_ALLOWED_ORIGINS", "").split(",") if o.strip()}
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_INVALID_DATA = 1007
+CLOSE_TOO_BIG = 1009
+
+# Frame code -> (event type, field names). Chunk fields follow the dataclasses in client/agent_backend.py.
+FRAMES = {
+    "s": ("run_started", ("started_at", "profile_id")),
+    "t": ("thinking", ("content",)),
+    "c": ("tool_call", tuple(f.name for f in fields(ToolCallChunk))),
+    "r": ("tool_result", tuple(f.name for f in fields(ToolResultChunk))),
+    "p": ("tool_progress", tuple(f.name for f in fields(ToolProgressChunk))),
+    "l": ("llm_turn", tuple(f.name for f in fields(LLMTurnChunk))),
+    "d": ("done", ("success", "response", "error", "ended_at", "profile_url", "cancelled")),
+}
+_CODES = {event_type: (code, names) for code, (event_type, names) in FRAMES.items()}
+# Events of other types are sent whole: [run id, "o", {...}].
+_OBJECT_CODE = "o"
+# Queued by the writer itself when the connection has been idle for WS_PING_SECONDS.
+_PING = b""
+
+
+class ProtocolError(Exception):
+    """The peer broke the WebSocket protocol; the connection is closed with *close_code*."""
+
+    def __init__(self, close_code: int, reason: str):
+        super().__init__(reason)
+        self.close_code = close_code
+
+
+def accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept value for a handshake's Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + _GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def origin_allowed(origin: str | None, host: str | None) -> bool:
+    """Non-browser clients send no Origin; pages must be served by this host or be listed."""
+    if not origin:
+        return True
+    if origin in WS_ALLOWED_ORIGINS:
+        return True
+    return origin.split("://", 1)[-1] == host
+
+
+def encode_frame(opcode: int, payload: bytes) -> bytes:
+    """One final, unmasked (server-to-client) frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def encode_event(run_id: str, obj: dict) -> str:
+    """Compact frame for one run event."""
+    code, names = _CODES.get(obj.get("type"), (None, None))
+    if code is None:
+        return json.dumps([run_id, _OBJECT_CODE, obj], separators=(",", ":"), default=str)
+    values = [obj.get(name) for name in names]
+    while values and values[-1] is None:
+        values.pop()
+    return json.dumps([run_id, code, *values], separators=(",", ":"), default=str)
+
+
+class WebSocket:
+    """Server side of one WebSocket connection over a request handler's rfile / wfile."""
+
+    def __init__(self, rfile, wfile, max_message_bytes: int = WS_MAX_MESSAGE_BYTES):
+        self._rfile = rfile
+        self._wfile = wfile
+        self._max_message_bytes = max_message_bytes
+        # Frames are written from the reader (pongs, close) and the writer thread.
+        self._write_lock = threading.Lock()
+        self.closed = False
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._rfile.read(size)
+        if len(data) < size:
+            raise ConnectionError("connection closed mid-frame")
+        return data
+
+    def _read_frame(self) -> tuple[bool, int, bytes]:
+        first, second = self._read_exact(2)
+        if first & 0x70:
+            raise ProtocolError(CLOSE_PROTOCOL_ERROR, "reserved bits set without an extension")
+        fin, opcode = bool(first & 0x80), first & 0x0F
+        if not second & 0x80:
+            raise ProtocolError(CLOSE_PROTOCOL_ERROR, "client frames must be masked")
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", self._read_exact(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", self._read_exact(8))
+        if opcode >= OP_CLOSE and (length > 125 or not fin):
+            raise ProtocolError(CLOSE_PROTOCOL_ERROR, "invalid control frame")
+        if length > self._max_message_bytes:
+            raise ProtocolError(CLOSE_TOO_BIG, "message too big")
+        mask = self._read_exact(4)
+        payload = self._read_exact(length)
+        if length:
+            # XOR with the repeated mask as one big integer; much faster than per byte.
+            key = (mask * (length // 4 + 1))[:length]
+            payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+        return fin, opcode, payload
+
+    def receive(self) -> str | bytes | None:
+        """The next data message; answers pings on the way. Returns None once the peer has closed."""
+        message_opcode = None
+        parts: list[bytes] = []
+        size = 0
+        while True:
+            fin, opcode, payload = self._read_frame()
+            if opcode == OP_PING:
+                self.send(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else CLOSE_NORMAL
+                self.close(code if 1000 <= code < 5000 else CLOSE_PROTOCOL_ERROR)
+                return None
+            if opcode == OP_CONTINUATION:
+                if message_opcode is None:
+                    raise ProtocolError(CLOSE_PROTOCOL_ERROR, "continuation without a message")
+            elif opcode in (OP_TEXT, OP_BINARY):
+                if message_opcode is not None:
+                    raise ProtocolError(CLOSE_PROTOCOL_ERROR, "new message inside a fragmented one")
+                message_opcode = opcode
+            else:
+                raise ProtocolError(CLOSE_PROTOCOL_ERROR, f"unknown opcode {opcode}")
+            size += len(payload)
+            if size > self._max_message_bytes:
+                raise ProtocolError(CLOSE_TOO_BIG, "message too big")
+            parts.append(payload)
+            if fin:
+                data = b"".join(parts)
+                if message_opcode == OP_BINARY:
+                    return data
+                try:
+                    return data.decode("utf-8")
+                except UnicodeDecodeError:
+                    raise ProtocolError(CLOSE_INVALID_DATA, "text message is not UTF-8") from None
+
+    def send(self, opcode: int, payload: bytes) -> None:
+        frame = encode_frame(opcode, payload)
+        with self._write_lock:
+            if self.closed:
+                raise ConnectionError("WebSocket is closed")
+            self._wfile.write(frame)
+            self._wfile.flush()
+
+    def send_text(self, text: str) -> None:
+        self.send(OP_TEXT, text.encode("utf-8"))
+
+    def close(self, code: int = CLOSE_NORMAL, reason: str = "") -> None:
+        """Send a close frame (once); the caller then drops the connection."""
+        with self._write_lock:
+            if self.closed:
+                return
+            self.closed = True
+            try:
+                self._wfile.write(encode_frame(OP_CLOSE, struct.pack("!H", code) + reason.encode("utf-8")[:120]))
+                self._wfile.flush()
+            except OSError:
+                pass
+
+
+class _Run:
+    """One multiplexed run: its credit, the events waiting for credit, and the agent task."""
+
+    def __init__(self, run_id: str, credit: int, write: Callable[[str], None]):
+        self.id = run_id
+        self._write = write
+        self._lock = threading.Lock()
+        self._credit = credit
+        self._backlog: deque[str] = deque()
+        # Set when the run is out of credit; lives on the loop the run's task runs on.
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._resume: asyncio.Event | None = None
+        self.future = None
+        # Set once the "done" event has been sent.
+        self.done = False
+
+    def send(self, obj: dict) -> None:
+        """Send one event (any thread): straight away while there's credit, else once the client grants more."""
+        frame = encode_event(self.id, obj)
+        with self._lock:
+            if self.done:
+                # The client forgets the run on "done"; anything after it is dropped.
+                return
+            if obj.get("type") == "done":
+                self.done = True
+                # Nothing waits on the run any more; flush everything so the client sees the end.
+                while self._backlog:
+                    self._write(self._backlog.popleft())
+                self._write(frame)
+            elif self._credit > 0 and not self._backlog:
+                self._credit -= 1
+                self._write(frame)
+            else:
+                self._backlog.append(frame)
+
+    def grant(self, credit: int) -> None:
+        with self._lock:
+            self._credit += credit
+            while self._credit > 0 and self._backlog:
+                self._credit -= 1
+                self._write(self._backlog.popleft())
+            wake = self._credit > 0 and self._resume is not None
+        if wake:
+            self._loop.call_soon_threadsafe(self._resume.set)
+
+    async def paced(self) -> None:
+        """Awaited by the run after each agent chunk; returns once the client has credit left."""
+        while True:
+            with self._lock:
+                if self._credit > 0 or self.done:
+                    return
+                if self._resume is None:
+                    self._loop = asyncio.get_running_loop()
+                    self._resume = asyncio.Event()
+                self._resume.clear()
+            websocket_stats.record_credit_wait()
+            await self._resume.wait()
+
+
+class RunChannel:
+    """Serves one WebSocket connection: starts, paces and cancels the runs multiplexed on it.
+
+    *start_run(question, profile, send, paced)* starts an agent run and returns
+    its concurrent.futures.Future; the run reports its events through
+    send(obj) and awaits paced() after each agent chunk.
+    """
+
+    def __init__(self, ws: WebSocket, start_run: Callable):
+        self._ws = ws
+        self._start_run = start_run
+        self._runs: dict[str, _Run] = {}
+        self._lock = threading.Lock()
+        # Frames for the writer thread, so runs never block their event loop on a slow socket.
+        self._outbox: queue.Queue[str | bytes | None] = queue.Queue()
+
+    def _write(self, frame: str) -> None:
+        self._outbox.put(frame)
+
+    def _write_frames(self) -> None:
+        while True:
+            try:
+                frame = self._outbox.get(timeout=WS_PING_SECONDS)
+            except queue.Empty:
+                # Idle: ping, so proxies keep the connection open and dead peers are noticed.
+                frame = _PING
+            if frame is None:
+                return
+            try:
+                if frame is _PING:
+                    self._ws.send(OP_PING, frame)
+                else:
+                    payload = frame.encode("utf-8")
+                    self._ws.send(OP_TEXT, payload)
+                    websocket_stats.record_frame(len(payload))
+            except (OSError, ConnectionError):
+                return
+
+    def _error(self, run_id, error: str) -> None:
+        self._write(json.dumps({"op": "error", "id": run_id, "error": error}))
+
+    def serve(self) -> None:
+        """Handle the connection until the client closes it; cancels its runs when it goes away."""
+        writer = threading.Thread(target=self._write_frames, name="websocket-writer", daemon=True)
+        writer.start()
+        websocket_stats.record_connection(1)
+        self._write(json.dumps({
+            "op": "hello",
+            "frames": {code: [event_type, *names] for code, (event_type, names) in FRAMES.items()},
+            "credit": WS_RUN_CREDIT,
+            "max_runs": WS_MAX_RUNS,
+        }))
+        try:
+            while (message := self._ws.receive()) is not None:
+                self._handle(message)
+        except ProtocolError as e:
+            self._ws.close(e.close_code, str(e))
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            websocket_stats.record_connection(-1)
+            with self._lock:
+                runs = list(self._runs.values())
+                self._runs.clear()
+            for run in runs:
+                if run.future is not None:
+                    run.future.cancel()
+            self._outbox.put(None)
+            writer.join(timeout=5)
+            self._ws.close(CLOSE_GOING_AWAY)
+
+    def _handle(self, message: str | bytes) -> None:
+        try:
+            data = json.loads(message)
+            op, run_id = data["op"], data.get("id")
+        except (ValueError, TypeError, KeyError):
+            self._error(None, "Expected a JSON object with an 'op'")
+            return
+        if not isinstance(run_id, str) or not run_id:
+            self._error(run_id, "Missing run id")
+        elif op == "ask":
+            self._ask(run_id, data)
+        elif op == "cancel":
+            with self._lock:
+                run = self._runs.get(run_id)
+            if run is not None and run.future is not None:
+                # _run_agent doesn't catch CancelledError; the future's ended() callback
+                # (in _ask) sends the cancelled "done" event.
+                run.future.cancel()
+                websocket_stats.record_cancel()
+        elif op == "credit":
+            with self._lock:
+                run = self._runs.get(run_id)
+            credit = data.get("n")
+            if not isinstance(credit, int) or credit < 0:
+                self._error(run_id, "Credit must be a non-negative integer")
+            elif run is not None:
+                run.grant(credit)
+        else:
+            self._error(run_id, f"Unknown op '{op}'")
+
+    def _ask(self, run_id: str, data: dict) -> None:
+        question = data.get("question")
+        question = question.strip() if isinstance(question, str) else ""
+        if not question:
+            self._error(run_id, "No question provided.")
+            return
+        with self._lock:
+            if run_id in self._runs:
+                self._error(run_id, f"Run '{run_id}' is already running")
+                return
+            if WS_MAX_RUNS > 0 and len(self._runs) >= WS_MAX_RUNS:
+                self._error(run_id, f"Too many concurrent runs on this connection (max {WS_MAX_RUNS})")
+                return
+            credit = data.get("credit")
+            run = self._runs[run_id] = _Run(
+                run_id, credit if isinstance(credit, int) and credit > 0 else WS_RUN_CREDIT, self._write
+            )
+
+        def send(obj: dict) -> None:
+            run.send(obj)
+            if obj.get("type") == "done":
+                with self._lock:
+                    self._runs.pop(run_id, None)
+
+        def ended(future) -> None:
+            # Sends "done" for a cancelled run (the agent run never does) and for one that
+            # failed outside the agent.
+            if run.done:
+                return
+            if future.cancelled():
+                send({"type": "done", "success": False, "error": "Cancelled", "cancelled": True, "ended_at": time.time()})
+            else:
+                error = future.exception()
+                send({"type": "done", "success": False, "error": str(error or "Run ended without an answer"), "ended_at": time.time()})
+
+        try:
+            run.future = self._start_run(question, bool(data.get("profile")), send, run.paced)
+        except Exception as e:
+            with self._lock:
+                self._runs.pop(run_id, None)
+            self._error(run_id, str(e))
+            return
+        run.future.add_done_callback(ended)
+        websocket_stats.record_run()
+
+
+class WebSocketStats:
+    """Thread-safe counters for /ws connections and runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = 0
+        self._counts = {"connections": 0, "runs": 0, "cancelled": 0, "credit_waits": 0, "frames_sent": 0, "bytes_sent": 0}
+
+    def record_connection(self, delta: int) -> None:
+        with self._lock:
+            self._open += delta
+            if delta > 0:
+                self._counts["connections"] += 1
+
+    def record_run(self) -> None:
+        with self._lock:
+            self._counts["runs"] += 1
+
+    def record_cancel(self) -> None:
+        with self._lock:
+            self._counts["cancelled"] += 1
+
+    def record_credit_wait(self) -> None:
+        with self._lock:
+            self._counts["credit_waits"] += 1
+
+    def record_frame(self, size: int) -> None:
+        with self._lock:
+            self._counts["frames_sent"] += 1
+            self._counts["bytes_sent"] += size
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"enabled": WS_ENABLED, "open_connections": self._open, **self._counts}
+
+
+websocket_stats = WebSocketStats()
+
+metrics.register("websocket", websocket_stats.snapshot)